@@ -5,6 +5,14 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Serve this with an ASGI server (e.g. ``uvicorn DjangoProject1.asgi:application``)
+so quiz submissions are acknowledged right away and written in batches by
+Quiz_App.submissions; under WSGI they are written synchronously instead.
+
+The deadline scheduler that auto-submits timed quizzes (Quiz_App.deadlines)
+runs on the same event loop. It starts on the lifespan startup event, or
+with the first request on servers that don't send lifespan events.
 """
 
 import os
@@ -13,4 +21,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject1.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from Quiz_App.deadlines import deadline_scheduler  # noqa: E402  (needs the app registry)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                deadline_scheduler.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await deadline_scheduler.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    deadline_scheduler.start()
+    await django_application(scope, receive, send)
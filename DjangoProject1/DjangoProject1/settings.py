@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,7 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Quiz_App.instrumentation.InstrumentationMiddleware',  # first, so it times the rest of the stack
     'django.middleware.security.SecurityMiddleware',
+    'Quiz_App.middleware.StaticAssetMiddleware',  # collected static files, before any session work
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,9 +54,15 @@ MIDDLEWARE = [
     'Quiz_App.middleware.LoginRequiredMiddleware',
 ]
 
+# Extra pages anonymous users may open (URL names), and path prefixes that
+# LoginRequiredMiddleware skips without loading the session (e.g. '/api/public/').
+LOGIN_EXEMPT_URL_NAMES = []
+LOGIN_EXEMPT_PATH_PREFIXES = []
+
 AUTHENTICATION_BACKENDS = [
-    'Quiz_App.backends.EmailOrUsernameModelBackend',  # Your custom backend
-    'django.contrib.auth.backends.ModelBackend',  # Default backend
+    # Handles usernames and emails and extends ModelBackend for permissions;
+    # listing ModelBackend again would hash the password twice on every failed login.
+    'Quiz_App.backends.EmailOrUsernameModelBackend',
 ]
 
 
@@ -61,7 +70,8 @@ ROOT_URLCONF = 'DjangoProject1.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'Quiz_App.instrumentation.InstrumentedTemplates',  # DjangoTemplates, timed per request
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'Quiz_App/templates'],  # This should be pointing to the correct path
         'APP_DIRS': True,
         'OPTIONS': {
@@ -90,6 +100,71 @@ DATABASES = {
     }
 }
 
+# Select with DJANGO_DB_PROFILE=production. WAL lets readers run while a
+# write is in progress, IMMEDIATE transactions take the write lock up front
+# (so a read-then-write never deadlocks into "database is locked"), writers
+# wait up to 5 s for the lock, and connections are kept between requests.
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'development')
+
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-20000;'  # 20 MB page cache per connection
+        'PRAGMA busy_timeout=5000;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+
+# Caches and sessions
+# Sessions live in the 'sessions' cache and are written to the database in
+# bulk (see Quiz_App/sessions.py). The file-based cache is shared by all
+# worker processes on the machine; a single-process dev server could use
+# LocMemCache instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'sessions',
+        'TIMEOUT': None,  # the session store passes each session's own expiry
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+SESSION_ENGINE = 'Quiz_App.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_WRITE_BEHIND_INTERVAL = 30  # seconds between bulk writes to the database
+SESSION_WRITE_BEHIND_BATCH = 500  # or flush as soon as this many sessions are waiting
+
+# Rendered classroom cards (Quiz_App/card_cache.py). Invalidation only reaches
+# the workers sharing this cache, so point it at a shared backend when running
+# more than one process.
+CLASSROOM_CARD_CACHE_ALIAS = 'default'
+
+# Anti-cheating telemetry (Quiz_App/telemetry.py) is buffered per process
+TELEMETRY_FLUSH_INTERVAL = 5  # seconds between bulk writes of buffered events
+TELEMETRY_FLUSH_BATCH = 2000  # or flush as soon as this many events are waiting
+
+# Per-view latency, query and template timing (Quiz_App/instrumentation.py),
+# shown at /ops/performance/ and by `manage.py hot_paths`
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_SLOW_MS = 500  # requests at least this slow go to the slow log, with their SQL
+INSTRUMENTATION_RING_SIZE = 1000  # recent requests kept per view
+INSTRUMENTATION_DIR = BASE_DIR / '.cache' / 'instrumentation'  # one snapshot file per worker process
+INSTRUMENTATION_DUMP_INTERVAL = 10  # seconds between snapshots
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,7 +203,21 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / "Quiz_App/images",
+    BASE_DIR / "static",  # vendored third-party libraries (manage.py vendor_static)
 ]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# collectstatic builds the bundles in Quiz_App/assets.py, fingerprints every
+# file and writes .gz/.br variants; StaticAssetMiddleware serves the result
+# with far-future cache headers when DEBUG is off.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'Quiz_App.storage.BundledManifestStorage',
+    },
+}
 
 
 # Default primary key field type
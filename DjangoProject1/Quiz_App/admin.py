@@ -1,15 +1,84 @@
-from django.contrib import admin
+import hashlib
+import io
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
 from django.contrib.auth.models import User
-from .models import Profile, Classroom
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from .forms import ProvisionAccountsForm
+from .grading import grade_quiz
+from .models import Profile, Classroom, Quiz, Question, Choice
+from .provisioning import provision_accounts
+
+
+# COUNT(*) over tens of thousands of rows on every changelist page is the
+# slowest part of the admin; the total is cached for a minute per query.
+class CachedCountPaginator(Paginator):
+    count_timeout = 60
+
+    @cached_property
+    def count(self):
+        sql, params = self.object_list.query.sql_with_params()
+        key = 'admin:count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.count_timeout)
+        return count
+
+
+# Teachers listed from the indexed Profile.role column instead of every user
+class TeacherFilter(admin.SimpleListFilter):
+    title = 'teacher'
+    parameter_name = 'teacher'
+
+    def lookups(self, request, model_admin):
+        return User.objects.filter(profile__role='teacher').order_by('username').values_list('id', 'username')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(teacher_id=self.value())
+        return queryset
+
+
+class RoleFilter(admin.SimpleListFilter):
+    title = 'role'
+    parameter_name = 'role'
+
+    def lookups(self, request, model_admin):
+        return Profile.ROLE_CHOICES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(profile__role=self.value())
+        return queryset
+
 
 @admin.register(Classroom)
 class ClassroomAdmin(admin.ModelAdmin):
     list_display = ('classroom_display', 'teacher_display', 'class_name', 'section', 'subject', 'room', 'class_code', 'created_at', 'enrolled_students')  # Include 'enrolled_students'
+    list_filter = (TeacherFilter,)
+    search_fields = ('class_code', 'class_name')
+    raw_id_fields = ('teacher',)  # a <select> of every user doesn't scale
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Enrollment counts come from one annotated query, not a roster per row
+        return super().get_queryset(request).annotate(
+            enrolled_count=Count('enrollments', filter=Q(enrollments__status='active'))
+        )
 
     def teacher_display(self, obj):
         # Custom format: user<ID>Id
-        return f"user{obj.teacher.id}Id"
+        return f"user{obj.teacher_id}Id"
     teacher_display.short_description = 'Teacher'  # Optional: To change the column name in the admin list view
 
     def classroom_display(self, obj):
@@ -18,9 +87,40 @@ class ClassroomAdmin(admin.ModelAdmin):
     classroom_display.short_description = 'Classroom ID'  # Optional: To change the column name in admin
 
     def enrolled_students(self, obj):
-        # Return a comma-separated list of user IDs (user<ID>Id format)
-        return ", ".join([f"user{student.id}Id" for student in obj.students.all()])
+        return obj.enrolled_count
     enrolled_students.short_description = 'Enrolled Students'
+    enrolled_students.admin_order_field = 'enrolled_count'
+
+# Inline for Question
+class QuestionInline(admin.TabularInline):
+    model = Question
+    extra = 0
+
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ('title', 'classroom', 'created_at', 'due_at', 'is_published')
+    list_select_related = ('classroom',)
+    inlines = [QuestionInline]
+    actions = ['regrade_attempts']
+
+    @admin.action(description='Re-grade submitted attempts')
+    def regrade_attempts(self, request, queryset):
+        graded = sum(grade_quiz(quiz) for quiz in queryset)
+        self.message_user(request, f"Re-graded {graded} attempts.")
+
+
+# Inline for Choice
+class ChoiceInline(admin.TabularInline):
+    model = Choice
+    extra = 0
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_display = ('text', 'quiz', 'order', 'points')
+    list_select_related = ('quiz',)
+    inlines = [ChoiceInline]
 
 # Inline for Profile
 class ProfileInline(admin.StackedInline):
@@ -32,6 +132,10 @@ class ProfileInline(admin.StackedInline):
 class UserAdmin(DefaultUserAdmin):
     inlines = [ProfileInline]
     list_display = ('formatted_id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'get_role')
+    list_filter = DefaultUserAdmin.list_filter + (RoleFilter,)
+    list_select_related = ('profile',)  # role without a query per row
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
     def formatted_id(self, obj):
         return f"user{obj.id}Id"  # Format the ID as "user1Id", "user2Id", etc.
@@ -40,6 +144,41 @@ class UserAdmin(DefaultUserAdmin):
     def get_role(self, obj):
         return obj.profile.role if hasattr(obj, 'profile') else None
     get_role.short_description = 'Role'
+    get_role.admin_order_field = 'profile__role'
+
+    # "Provision accounts" on the changelist (templates/admin/auth/user/change_list.html).
+    # Committed chunks survive a timeout; uploading the file again resumes.
+    def get_urls(self):
+        return [
+            path('provision/', self.admin_site.admin_view(self.provision_view), name='auth_user_provision'),
+        ] + super().get_urls()
+
+    def provision_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ProvisionAccountsForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            accounts = io.TextIOWrapper(form.cleaned_data['accounts'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = provision_accounts(accounts)
+            except (UnicodeDecodeError, ValueError) as error:
+                self.message_user(request, f"Can't read the file: {error}", messages.ERROR)
+            else:
+                self.message_user(request, f"Created {report['created']} accounts; {report['existing']} already "
+                                           f"existed.")
+                for problem in report['problems'][:20]:
+                    self.message_user(request, f"Row {problem['row']} ({problem['value']}): {problem['error']}",
+                                      messages.WARNING)
+                if len(report['problems']) > 20:
+                    self.message_user(request, f"...and {len(report['problems']) - 20} more problems.",
+                                      messages.WARNING)
+                return redirect('admin:auth_user_changelist')
+        return TemplateResponse(request, 'admin/auth/user/provision.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Provision accounts',
+        })
 
 # Re-register UserAdmin
 admin.site.unregister(User)
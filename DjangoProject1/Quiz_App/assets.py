@@ -0,0 +1,96 @@
+# Static asset bundles and the vendored third-party files they are built from.
+import posixpath
+import re
+
+# Third-party files served from STATICFILES_DIRS instead of CDNs, with the
+# URL each one was fetched from (see the vendor_static command).
+VENDOR_FILES = {
+    'vendor/bootstrap/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.5/font/bootstrap-icons.min.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.5/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.10.5/font/fonts/bootstrap-icons.woff',
+    'vendor/sweetalert2/sweetalert2.min.css':
+        'https://cdn.jsdelivr.net/npm/sweetalert2@11.6.8/dist/sweetalert2.min.css',
+    'vendor/sweetalert2/sweetalert2.min.js':
+        'https://cdn.jsdelivr.net/npm/sweetalert2@11.6.8/dist/sweetalert2.min.js',
+}
+
+# Bundle name -> source files, concatenated in order by collectstatic. Each
+# vendor library is its own bundle, so a page links only the ones it uses and
+# browsers cache each of them once for every page.
+BUNDLES = {
+    'bootstrap.css': ['vendor/bootstrap/bootstrap.min.css'],
+    'bootstrap.js': ['vendor/bootstrap/bootstrap.bundle.min.js'],
+    'bootstrap-icons.css': ['vendor/bootstrap-icons/bootstrap-icons.min.css'],
+    'sweetalert2.css': ['vendor/sweetalert2/sweetalert2.min.css'],
+    'sweetalert2.js': ['vendor/sweetalert2/sweetalert2.min.js'],
+    'home.css': ['Quiz_App/css/home.css'],
+    'landing.css': ['Quiz_App/css/landing.css'],
+    'landing.js': ['Quiz_App/js/landing.js'],
+    'login.css': ['Quiz_App/css/login.css'],
+    'profile.css': ['Quiz_App/css/profile.css'],
+    'signup.css': ['Quiz_App/css/signup.css'],
+    'telemetry.js': ['Quiz_App/js/telemetry.js'],
+}
+BUNDLE_DIR = 'bundles'
+
+SOURCE_MAP_RE = re.compile(r'^\s*(/\*#|//#) sourceMappingURL=.*$', re.M)
+CSS_URL_RE = re.compile(r'''url\((["']?)(?!data:|https?:|//|/|#)([^"')]+)\1\)''')
+
+
+def bundle_path(name):
+    return f'{BUNDLE_DIR}/{name}'
+
+
+def strip_source_maps(text):
+    # Maps aren't shipped, and the manifest storage fails on missing ones
+    return SOURCE_MAP_RE.sub('', text)
+
+
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    # Deliberately conservative: drops indentation, blank lines and full-line
+    # comments but keeps line breaks, so automatic semicolons still work.
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def rebase_css_urls(css, source, target):
+    # Relative url()s in a source must still resolve from the bundle's location
+    source_dir, target_dir = posixpath.dirname(source), posixpath.dirname(target)
+
+    def rebase(match):
+        path = posixpath.normpath(posixpath.join(source_dir, match.group(2)))
+        return f'url({match.group(1)}{posixpath.relpath(path, target_dir)}{match.group(1)})'
+    return CSS_URL_RE.sub(rebase, css)
+
+
+def build_bundle(name, read):
+    """Concatenate and minify the sources of a bundle.
+
+    ``read`` returns the text of a static file by name. Sources that are
+    already minified (``*.min.*``) are only stripped of source map comments.
+    """
+    is_css = name.endswith('.css')
+    parts = []
+    for source in BUNDLES[name]:
+        text = strip_source_maps(read(source))
+        if is_css:
+            text = rebase_css_urls(text, source, bundle_path(name))
+        if '.min.' not in source:
+            text = minify_css(text) if is_css else minify_js(text)
+        parts.append(text.strip())
+    return ('\n' if is_css else ';\n').join(parts) + '\n'
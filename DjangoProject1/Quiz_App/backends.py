@@ -1,19 +1,56 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
 
 User = get_user_model()
 
+# Identifiers that matched no account are remembered for a short while so a
+# burst of retries doesn't hit the database again; see forget_unknown_login().
+UNKNOWN_LOGIN_TIMEOUT = 60
+
+
+def unknown_login_key(identifier):
+    return f'auth:unknown:{identifier.lower()}'
+
+
+def forget_unknown_login(*identifiers):
+    cache.delete_many([unknown_login_key(i) for i in identifiers if i])
+
+
 class EmailOrUsernameModelBackend(ModelBackend):
+    def get_user_by_identifier(self, identifier):
+        key = unknown_login_key(identifier)
+        if cache.get(key):
+            return None
+
+        # One query against the LOWER(username) / LOWER(email) indexes
+        lowered = identifier.lower()
+        candidates = list(
+            User.objects.annotate(username_lower=Lower('username'), email_lower=Lower('email'))
+            .filter(Q(username_lower=lowered) | Q(email_lower=lowered))[:5]
+        )
+        if not candidates:
+            cache.set(key, True, UNKNOWN_LOGIN_TIMEOUT)
+            return None
+        # Prefer an exact username, then an email, then a case-insensitive username
+        candidates.sort(key=lambda user: (
+            user.username != identifier,
+            user.email_lower != lowered,
+            user.pk,
+        ))
+        return candidates[0]
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
             return None
-        try:
-            user = User.objects.get(email=username)  # Check if the username is an email
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(username=username)  # Fall back to username
-            except User.DoesNotExist:
-                return None
+        user = self.get_user_by_identifier(username)
+        if user is None:
+            # Run the hasher once anyway so unknown accounts take as long as
+            # wrong passwords (the stock ModelBackend does the same).
+            User().set_password(password)
+            return None
 
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
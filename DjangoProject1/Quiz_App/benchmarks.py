@@ -0,0 +1,57 @@
+# Helpers shared by the bench_* management commands.
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from . import sessions, telemetry
+
+
+@contextmanager
+def isolated_database(verbosity=0, name=None):
+    # Benchmarks seed a lot of rows; run them against a throwaway test database
+    # so the development db.sqlite3 is never touched. Pass a file ``name`` when
+    # several threads write at once; SQLite's default in-memory test database
+    # is a shared-cache one that locks whole tables.
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        # Deferred writes belong to the throwaway database, not db.sqlite3
+        sessions._pending.clear()
+        telemetry._buffer.clear()
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    # samples are durations in seconds; the summary is in milliseconds
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
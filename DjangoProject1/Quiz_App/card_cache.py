@@ -0,0 +1,69 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+from .models import Classroom, Enrollment
+
+# Rendered classroom cards are cached per user under a class-list version.
+# Anything that changes what a user's cards show bumps their version (see
+# signals.py), which orphans the old fragment instead of deleting it.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    # Any backend works; with several workers use a shared one (e.g. file-based)
+    return caches[getattr(settings, 'CLASSROOM_CARD_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f'cards:version:{user_id}'
+
+
+def class_list_version(user_id):
+    return _cache().get_or_set(_version_key(user_id), lambda: uuid.uuid4().hex[:12], CARD_CACHE_TIMEOUT)
+
+
+def invalidate_class_lists(user_ids):
+    # A fresh random version can't collide with a fragment cached earlier
+    _cache().set_many({_version_key(user_id): uuid.uuid4().hex[:12] for user_id in set(user_ids)},
+                   CARD_CACHE_TIMEOUT)
+
+
+def invalidate_classroom(classroom_id, teacher_id=None):
+    # The teacher and everyone enrolled see this classroom's card
+    user_ids = list(Enrollment.objects.filter(classroom_id=classroom_id).values_list('student_id', flat=True))
+    if teacher_id is not None:
+        user_ids.append(teacher_id)
+    invalidate_class_lists(user_ids)
+
+
+def card_queryset(user, role):
+    if role == 'teacher':
+        return Classroom.objects.filter(teacher=user).order_by('created_at')
+    if role == 'student':
+        # Join the teacher in so the cards don't query it one by one
+        return (Classroom.objects
+                .filter(enrollments__student=user, enrollments__status='active')
+                .select_related('teacher')
+                .only('id', 'class_name', 'section', 'subject', 'room', 'class_code',
+                      'teacher__first_name', 'teacher__last_name')
+                .order_by('created_at'))
+    return Classroom.objects.none()
+
+
+def render_classroom_cards(user, role):
+    """Return (html, number of classrooms) for the user's classroom cards."""
+    key = f'cards:{user.pk}:{role}:{class_list_version(user.pk)}'
+    cached = _cache().get(key)
+    if cached is not None:
+        stats['hits'] += 1
+        return cached
+    stats['misses'] += 1
+    classrooms = list(card_queryset(user, role))
+    html = render_to_string('Quiz_App/_classroom_cards.html', {'classrooms': classrooms, 'role': role})
+    _cache().set(key, (html, len(classrooms)), CARD_CACHE_TIMEOUT)
+    return html, len(classrooms)
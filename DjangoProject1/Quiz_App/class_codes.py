@@ -0,0 +1,108 @@
+import secrets
+import threading
+from collections import deque
+
+from django.db import IntegrityError, transaction
+
+# Upper-case letters and digits without the look-alikes (0/O, 1/I/L) so codes
+# read out loud in a classroom are not mistyped. Codes are stored upper-case,
+# which makes the unique index on Classroom.class_code case-insensitive in
+# practice: whatever the student types is normalized before the lookup.
+CODE_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 7
+
+# How many free codes are kept ready in memory, and how low the pool may get
+# before it is topped up again.
+POOL_SIZE = 256
+POOL_LOW_WATER = 32
+
+
+def normalize_class_code(code):
+    # Class codes are matched case-insensitively by storing them upper-case
+    return (code or '').strip().upper()
+
+
+def generate_class_code(length=CODE_LENGTH):
+    return ''.join(secrets.choice(CODE_ALPHABET) for _ in range(length))
+
+
+class ClassCodeAllocator:
+    """Hands out class codes that are known to be free.
+
+    Codes are generated in batches and checked against the database with a
+    single ``IN`` query, so allocating a code never loops over the table.
+    The unique index on ``Classroom.class_code`` is still the final guard
+    against two processes picking the same code at the same time.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, low_water=POOL_LOW_WATER):
+        self.pool_size = pool_size
+        self.low_water = low_water
+        self._pool = deque()
+        self._lock = threading.Lock()
+
+    def _generate_free_codes(self, count):
+        from .models import Classroom
+
+        candidates = set()
+        while len(candidates) < count:
+            candidates.add(generate_class_code())
+        taken = set(
+            Classroom.objects.filter(class_code__in=candidates).values_list('class_code', flat=True)
+        )
+        return [code for code in candidates if code not in taken and code not in self._pool]
+
+    def _refill(self, needed=0):
+        target = max(self.pool_size, needed)
+        while len(self._pool) < target:
+            self._pool.extend(self._generate_free_codes(target - len(self._pool)))
+
+    def allocate(self):
+        with self._lock:
+            if len(self._pool) <= self.low_water:
+                self._refill()
+            return self._pool.popleft()
+
+    def allocate_many(self, count):
+        with self._lock:
+            if len(self._pool) < count + self.low_water:
+                self._refill(count + self.low_water)
+            return [self._pool.popleft() for _ in range(count)]
+
+    def clear(self):
+        with self._lock:
+            self._pool.clear()
+
+
+allocator = ClassCodeAllocator()
+
+
+def create_classroom(**fields):
+    from .models import Classroom
+
+    # A pooled code can only collide with a code another process created since
+    # the pool was filled; fall back to a single fresh code in that case.
+    try:
+        with transaction.atomic():
+            return Classroom.objects.create(class_code=allocator.allocate(), **fields)
+    except IntegrityError:
+        allocator.clear()
+        return Classroom.objects.create(class_code=allocator.allocate(), **fields)
+
+
+def bulk_create_classrooms(teacher, rows, batch_size=500):
+    # rows is an iterable of dicts with class_name / section / subject / room
+    from .card_cache import invalidate_class_lists
+    from .models import Classroom
+
+    rows = list(rows)
+    codes = allocator.allocate_many(len(rows))
+    classrooms = [
+        Classroom(teacher=teacher, class_code=code, **row)
+        for code, row in zip(codes, rows)
+    ]
+    with transaction.atomic():
+        created = Classroom.objects.bulk_create(classrooms, batch_size=batch_size)
+        # bulk_create() sends no post_save
+        transaction.on_commit(lambda: invalidate_class_lists([teacher.pk]))
+    return created
@@ -0,0 +1,174 @@
+"""Server-side auto-submit for timed quizzes.
+
+The scheduler keeps a min-heap of (deadline, attempt id) for the open timed
+attempts and sleeps until the earliest one is due, so there is no polling
+and nothing is compared on ordinary requests. Due attempts are closed and
+graded in batches. The heap lives in memory; it is rebuilt from the
+database (the partial attempt_open_deadline index) every time the scheduler
+starts.
+
+DjangoProject1/asgi.py starts the scheduler with the ASGI app. With several
+worker processes every worker rebuilds the same heap; that is harmless,
+because closing an attempt is a guarded update that only one writer can
+win. Under WSGI nothing runs the scheduler, and schedule() is a no-op.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .grading import grade_quiz
+from .models import Attempt, Quiz
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500  # attempts closed per transaction
+REBUILD_CHUNK_SIZE = 5000
+METRICS_WINDOW = 1000  # batches whose lag and size are remembered
+
+
+def attempt_deadline(quiz, started_at):
+    """The time limit from the start, capped by the quiz's due date."""
+    deadlines = [quiz.due_at] if quiz.due_at else []
+    if quiz.time_limit_minutes:
+        deadlines.append(started_at + timedelta(minutes=quiz.time_limit_minutes))
+    return min(deadlines) if deadlines else None
+
+
+def auto_submit(attempt_ids):
+    """Close the given attempts if they are still open, and grade them.
+
+    Returns the ids actually closed; attempts the student submitted in the
+    meantime are left alone.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = Attempt.objects.filter(pk__in=attempt_ids, submitted_at__isnull=True, deadline__lte=now)
+        closing = dict(due.values_list('id', 'quiz_id'))
+        # Guarded like write_submissions: a submission that won the race is kept
+        Attempt.objects.filter(pk__in=closing, submitted_at__isnull=True).update(submitted_at=now)
+    quizzes = defaultdict(list)
+    for attempt_id, quiz_id in closing.items():
+        quizzes[quiz_id].append(attempt_id)
+    for quiz_id, ids in quizzes.items():
+        grade_quiz(Quiz(pk=quiz_id), attempts=ids)
+    return list(closing)
+
+
+class DeadlineScheduler:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.heap = []  # (deadline timestamp, attempt id)
+        self.lag = deque(maxlen=METRICS_WINDOW)  # seconds the oldest attempt of each batch was late
+        self.batch_sizes = deque(maxlen=METRICS_WINDOW)
+        self.batches = 0
+        self.submitted = 0
+        self._lock = threading.Lock()  # schedule() is called from sync views' threads
+        self._wakeup = None
+        self._task = None
+        self._loop = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, attempt_id, deadline):
+        if deadline is None or not self.running:
+            return
+        entry = (deadline.timestamp(), attempt_id)
+        with self._lock:
+            heapq.heappush(self.heap, entry)
+            earliest = self.heap[0] is entry
+        if earliest:
+            # Sleeping until a later deadline; wake up and sleep less
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        # Called from the event loop the app runs on; restarts a dead task
+        if not self.running:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def rebuild(self):
+        heap = [(deadline.timestamp(), attempt_id) for attempt_id, deadline in
+                Attempt.objects.filter(submitted_at__isnull=True, deadline__isnull=False)
+                .values_list('id', 'deadline').iterator(REBUILD_CHUNK_SIZE)]
+        heapq.heapify(heap)
+        with self._lock:
+            # Keep anything scheduled while the database was being read
+            self.heap = list(heapq.merge(heap, self.heap))
+        logger.info("Deadline scheduler loaded %d open timed attempts", len(heap))
+        return len(heap)
+
+    def pop_due(self, now):
+        with self._lock:
+            due = []
+            while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self.heap))
+            return due
+
+    def next_deadline(self):
+        with self._lock:
+            return self.heap[0][0] if self.heap else None
+
+    async def _run(self):
+        await sync_to_async(self.rebuild)()
+        while True:
+            self._wakeup.clear()
+            earliest = self.next_deadline()
+            if earliest is None or earliest > time.time():
+                timeout = None if earliest is None else earliest - time.time()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            due = self.pop_due(now)
+            try:
+                closed = await sync_to_async(auto_submit)([attempt_id for _, attempt_id in due])
+            except Exception:
+                logger.exception("Failed to auto-submit %d attempts", len(due))
+                with self._lock:
+                    for entry in due:
+                        heapq.heappush(self.heap, entry)
+                await asyncio.sleep(1)  # don't spin on a broken database
+                continue
+            self.lag.append(now - due[0][0])
+            self.batch_sizes.append(len(closed))
+            self.batches += 1
+            self.submitted += len(closed)
+            logger.debug("Auto-submitted %d of %d due attempts, %.3f s late", len(closed), len(due), now - due[0][0])
+
+    def metrics(self):
+        lag = sorted(self.lag)
+        return {
+            'running': self.running,
+            'pending': len(self.heap),
+            'submitted': self.submitted,
+            'batches': self.batches,
+            'lag_p50_ms': lag[len(lag) // 2] * 1000 if lag else None,
+            'lag_max_ms': lag[-1] * 1000 if lag else None,
+            'mean_batch_size': sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else None,
+        }
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -0,0 +1,127 @@
+import csv
+import itertools
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .card_cache import invalidate_class_lists
+from .models import Enrollment, touch_classrooms
+
+
+def enroll_student(classroom, student):
+    # One INSERT guarded by the unique constraint; returns False when the
+    # student is already enrolled, so concurrent joins can't double-enroll.
+    try:
+        with transaction.atomic():
+            Enrollment.objects.create(classroom=classroom, student=student)
+        return True
+    except IntegrityError:
+        # Rejoining a class the student dropped reactivates the enrollment;
+        # update() sends no signals, so drop the cached cards here
+        reactivated = Enrollment.objects.filter(
+            classroom=classroom, student=student, status='dropped'
+        ).update(status='active', joined_at=timezone.now()) > 0
+        if reactivated:
+            touch_classrooms([classroom.pk])
+            transaction.on_commit(lambda: invalidate_class_lists([student.pk]))
+        return reactivated
+
+
+ROSTER_BATCH_SIZE = 1000
+ROSTER_HEADERS = {'username', 'email', 'user', 'student', 'username_or_email'}
+
+
+def _roster_rows(text_stream):
+    # Yields (row number, identifier) from a CSV or TSV stream, one line at a time
+    first_line = text_stream.readline()
+    if not first_line:
+        return
+    delimiter = '\t' if '\t' in first_line else ','
+    lines = itertools.chain([first_line], text_stream)
+    for row_number, row in enumerate(csv.reader(lines, delimiter=delimiter), start=1):
+        value = row[0].strip() if row else ''
+        if row_number == 1 and value.lower() in ROSTER_HEADERS:
+            continue
+        yield row_number, value
+
+
+def _enroll_batch(classroom, batch, seen, report):
+    usernames = {value for _, value in batch if '@' not in value}
+    emails = {value.lower() for _, value in batch if '@' in value}
+    users = (User.objects
+             .annotate(email_lower=Lower('email'))
+             .filter(Q(username__in=usernames) | Q(email_lower__in=emails))
+             .values_list('id', 'username', 'email_lower', 'profile__role'))
+    by_username, by_email = {}, {}
+    for user in users:
+        by_username[user[1]] = user
+        by_email[user[2]] = user
+
+    user_ids = [user[0] for user in by_username.values()]
+    already_enrolled = set(
+        Enrollment.objects.filter(classroom=classroom, student_id__in=user_ids, status='active')
+        .values_list('student_id', flat=True)
+    )
+
+    new_enrollments = []
+    for row_number, value in batch:
+        user = by_email.get(value.lower()) if '@' in value else by_username.get(value)
+        if user is None:
+            report['problems'].append({'row': row_number, 'value': value, 'error': 'No such user.'})
+        elif user[3] != 'student':
+            report['problems'].append({'row': row_number, 'value': value, 'error': 'User is not a student.'})
+        elif user[0] in seen:
+            report['problems'].append({'row': row_number, 'value': value, 'error': 'Listed more than once.'})
+        elif user[0] in already_enrolled:
+            seen.add(user[0])
+            report['already_enrolled'] += 1
+        else:
+            seen.add(user[0])
+            new_enrollments.append(Enrollment(classroom=classroom, student_id=user[0]))
+
+    # Dropped students already have a row; reactivate those instead of
+    # inserting. Active rows found here were added since the check above.
+    rows = dict(
+        Enrollment.objects.filter(classroom=classroom, student_id__in=[e.student_id for e in new_enrollments])
+        .values_list('student_id', 'status')
+    ) if new_enrollments else {}
+    dropped = [student_id for student_id, status in rows.items() if status == 'dropped']
+    reactivated = Enrollment.objects.filter(classroom=classroom, student_id__in=dropped, status='dropped').update(
+        status='active', joined_at=timezone.now()) if dropped else 0
+    inserted = [e for e in new_enrollments if e.student_id not in rows]
+    Enrollment.objects.bulk_create(inserted, ignore_conflicts=True)
+    report['enrolled'] += reactivated + len(inserted)
+    report['already_enrolled'] += len(rows) - reactivated
+    # Neither update() nor bulk_create() send signals
+    if new_enrollments:
+        touch_classrooms([classroom.pk])
+        student_ids = [e.student_id for e in new_enrollments]
+        transaction.on_commit(lambda: invalidate_class_lists(student_ids))
+
+
+def import_roster(classroom, text_stream, batch_size=ROSTER_BATCH_SIZE):
+    """Enroll every student listed in a CSV/TSV roster.
+
+    The first column of each row is a username or an email address. The file
+    is read as a stream and users are resolved one batch at a time, so memory
+    stays flat however long the roster is. Returns a report with the number of
+    new enrollments and a list of per-row problems.
+    """
+    report = {'enrolled': 0, 'already_enrolled': 0, 'problems': []}
+    seen = set()
+    batch = []
+    with transaction.atomic():
+        for row_number, value in _roster_rows(text_stream):
+            if not value:
+                report['problems'].append({'row': row_number, 'value': value, 'error': 'Empty row.'})
+                continue
+            batch.append((row_number, value))
+            if len(batch) >= batch_size:
+                _enroll_batch(classroom, batch, seen, report)
+                batch = []
+        if batch:
+            _enroll_batch(classroom, batch, seen, report)
+    return report
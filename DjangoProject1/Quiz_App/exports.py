@@ -0,0 +1,194 @@
+import csv
+import itertools
+import zipfile
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max
+
+from .models import Attempt, Enrollment, Quiz
+
+# Rows fetched per round trip by the server-side iterators
+CHUNK_SIZE = 2000
+
+
+# Row generators yield a header row and then one list per data row, reading
+# the database in chunks, so an export never holds more than a chunk in memory.
+
+def roster_rows(classroom):
+    yield ['Username', 'First name', 'Last name', 'Email', 'Joined', 'Status']
+    enrollments = (Enrollment.objects.filter(classroom=classroom)
+                   .order_by('student_id')
+                   .values_list('student__username', 'student__first_name', 'student__last_name',
+                                'student__email', 'joined_at', 'status'))
+    for username, first_name, last_name, email, joined_at, status in enrollments.iterator(CHUNK_SIZE):
+        yield [username, first_name, last_name, email, joined_at.isoformat(), status]
+
+
+def gradebook_rows(classroom):
+    """One row per enrolled student, one column per quiz (best score)."""
+    quizzes = list(Quiz.objects.filter(classroom=classroom).order_by('created_at', 'id').values_list('id', 'title'))
+    column = {quiz_id: index for index, (quiz_id, _) in enumerate(quizzes)}
+    yield ['Username', 'First name', 'Last name'] + [title for _, title in quizzes]
+
+    students = (Enrollment.objects.filter(classroom=classroom, status='active')
+                .order_by('student_id')
+                .values_list('student_id', 'student__username', 'student__first_name', 'student__last_name'))
+    scores = (Attempt.objects.filter(quiz__classroom=classroom, score__isnull=False)
+              .values('student_id', 'quiz_id')
+              .annotate(best=Max('score'))
+              .order_by('student_id')
+              .values_list('student_id', 'quiz_id', 'best'))
+
+    # Both streams are sorted by student id; walk them side by side
+    score_iter = scores.iterator(CHUNK_SIZE)
+    pending = next(score_iter, None)
+    for student_id, username, first_name, last_name in students.iterator(CHUNK_SIZE):
+        row = [''] * len(quizzes)
+        while pending is not None and pending[0] <= student_id:
+            if pending[0] == student_id:
+                row[column[pending[1]]] = pending[2]
+            pending = next(score_iter, None)
+        yield [username, first_name, last_name] + row
+
+
+def term_rows():
+    """Every enrollment in every classroom, for whole-term admin exports."""
+    yield ['Class code', 'Class name', 'Section', 'Teacher', 'Student', 'Joined', 'Status']
+    enrollments = (Enrollment.objects.order_by('classroom_id', 'student_id')
+                   .values_list('classroom__class_code', 'classroom__class_name', 'classroom__section',
+                                'classroom__teacher__username', 'student__username', 'joined_at', 'status'))
+    for code, name, section, teacher, student, joined_at, status in enrollments.iterator(CHUNK_SIZE):
+        yield [code, name, section or '', teacher, student, joined_at.isoformat(), status]
+
+
+# Spreadsheet apps run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _neutralize(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    # File-like object whose write() hands the data straight back
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_neutralize(value) for value in row])
+
+
+class _ChunkBuffer:
+    # Write-only, unseekable sink for zipfile; the generator drains it
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(_neutralize(value)))}</t></is></c>'
+
+
+def xlsx_stream(rows, rows_per_chunk=500):
+    """Stream a single-sheet XLSX workbook.
+
+    The zip is written to an unseekable buffer (entries use data
+    descriptors) and cells are inline strings, so nothing has to be
+    buffered until the end, unlike a shared-strings workbook.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        yield buffer.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            for count, row in enumerate(rows, start=1):
+                sheet.write(('<row>' + ''.join(_xlsx_cell(v) for v in row) + '</row>').encode())
+                if count % rows_per_chunk == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def _next_chunks(chunks, count):
+    return list(itertools.islice(chunks, count))
+
+
+async def async_stream(chunks, per_call=100):
+    """Hand a writer's chunks to an ASGI response.
+
+    Django would buffer a sync iterator whole under ASGI. The chunks are
+    still produced by the sync ORM, ``per_call`` at a time in the sync
+    thread, so the database cursor always stays on one thread.
+    """
+    try:
+        while batch := await sync_to_async(_next_chunks)(chunks, per_call):
+            for chunk in batch:
+                yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+# Writers turn rows into chunks of the output file
+FORMATS = {
+    'csv': (csv_stream, 'text/csv'),
+    'xlsx': (xlsx_stream, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -2,8 +2,33 @@ from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from .models import Profile
 
+# auth_user's unique username and case-insensitive unique email index (migration
+# 0019) are the real checks; a clash comes back as an IntegrityError naming one
+UNIQUE_ERRORS = {
+    'username': "This username is already taken. Please choose a different one.",
+    'email': "This email address is already in use. Please use a different email.",
+}
+# The unique indexes behind them: SQLite names the column or the index in its
+# message, PostgreSQL reports the constraint name
+UNIQUE_CONSTRAINTS = {
+    'auth_user.username': 'username',
+    'auth_user_username_key': 'username',
+    'quiz_auth_user_email_lower_unique': 'email',  # migration 0019
+}
+
+
+def add_unique_error(form, error):
+    constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+    for name, field in UNIQUE_CONSTRAINTS.items():
+        if name == constraint or (constraint is None and name in str(error)):
+            form.add_error(field, UNIQUE_ERRORS[field])
+            return
+    raise error
+
+
 class SignupForm(forms.ModelForm):
     first_name = forms.CharField(
         max_length=30,
@@ -43,17 +68,9 @@ class SignupForm(forms.ModelForm):
         model = User
         fields = ['first_name', 'last_name', 'username', 'email', 'password']
 
-    def clean_username(self):
-        username = self.cleaned_data.get('username')
-        if User.objects.filter(username=username).exists():
-            raise ValidationError("This username is already taken. Please choose a different one.")
-        return username
-
-    def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
-            raise ValidationError("This email address is already in use. Please use a different email.")
-        return email
+    def validate_unique(self):
+        # No exists() queries; save() lets the unique indexes decide, which also covers races
+        pass
 
     def clean(self):
         cleaned_data = super().clean()
@@ -67,14 +84,16 @@ class SignupForm(forms.ModelForm):
 
     def save(self, commit=True):
         user = super().save(commit=False)
-        user.set_password(self.cleaned_data['password'])  # Hash the password
+        user.set_password(self.cleaned_data['password'])  # Hash the password, before the transaction opens
         if commit:
-            user.save()
-            # Save the Profile with the selected role
-            role = self.cleaned_data['role']
-            Profile.objects.create(user=user, role=role)
-            user_id = user.id  # Access the primary key of the user
-            print("User ID:", user_id)  # You can log it or use it as needed
+            # The user and their profile are created together or not at all;
+            # a taken username or email becomes a form error (check form.errors)
+            try:
+                with transaction.atomic():
+                    user.save()
+                    Profile.objects.create(user=user, role=self.cleaned_data['role'])
+            except IntegrityError as error:
+                add_unique_error(self, error)
         return user
 
 
@@ -104,6 +123,16 @@ class ProfileForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control', 'id': 'email'}),
         }
 
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        try:
+            with transaction.atomic():
+                return super().save()
+        except IntegrityError as error:
+            add_unique_error(self, error)  # e.g. another account's email
+            return self.instance
+
 # Django Form for Creating Class
 class CreateClassForm(forms.Form):
     class_name = forms.CharField(label='Class Name', max_length=100, required=True, widget=forms.TextInput(attrs={
@@ -124,6 +153,21 @@ class CreateClassForm(forms.Form):
     }))
 
 
+# Roster upload for enrolling a whole section at once
+class RosterImportForm(forms.Form):
+    roster = forms.FileField(
+        label='Roster (CSV or TSV of usernames or emails)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.tsv,.txt'})
+    )
+
+
+class ProvisionAccountsForm(forms.Form):
+    accounts = forms.FileField(
+        label='Accounts (CSV with username, email, role and optionally first_name, last_name, password)',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv'})
+    )
+
+
 class PasswordChangeForm(forms.Form):
     current_password = forms.CharField(
         widget=forms.PasswordInput(attrs={'class': 'form-control', 'id': 'currentPassword'}),
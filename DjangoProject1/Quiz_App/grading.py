@@ -0,0 +1,112 @@
+from collections import namedtuple
+
+import numpy as np
+from django.db import connection, transaction
+
+from .models import Attempt, Choice, Question, Response
+from .stats import lock_stats, record_grades, to_percent
+
+GRADING_BATCH_SIZE = 500
+
+
+# Sorted question ids with their points, and the quiz's sorted choice ids
+# with the question each belongs to and whether it is correct
+AnswerKey = namedtuple('AnswerKey', 'question_ids points choice_ids choice_questions correct')
+
+
+def _positions(sorted_ids, ids):
+    # Position of every id in a sorted id vector, and whether it is there at all
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == ids
+
+
+def build_answer_key(quiz):
+    """Return the AnswerKey of a quiz.
+
+    A question may have several correct choices; any of them scores, but
+    only as the answer to its own question.
+    """
+    questions = np.array(
+        list(Question.objects.filter(quiz=quiz).order_by('id').values_list('id', 'points')),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    choices = np.array(
+        list(Choice.objects.filter(question__quiz=quiz).order_by('id').values_list('id', 'question_id', 'is_correct')),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    return AnswerKey(questions[:, 0], questions[:, 1].astype(np.float64), choices[:, 0], choices[:, 1],
+                     choices[:, 2].astype(bool))
+
+
+def score_attempts(responses, attempt_ids, key):
+    """Score every attempt in one vectorized pass.
+
+    ``responses`` is an (n, 3) array of (attempt id, question id, choice id)
+    rows. A response scores its question's points when the choice is a
+    correct choice of that same question; responses naming a question or
+    choice outside the quiz score nothing. Returns the scores aligned with
+    the sorted ``attempt_ids``.
+    """
+    if not len(responses):
+        return np.zeros(len(attempt_ids))
+    rows, known_attempt = _positions(attempt_ids, responses[:, 0])
+    cols, known_question = _positions(key.question_ids, responses[:, 1])
+    choices, known_choice = _positions(key.choice_ids, responses[:, 2])
+    hits = (known_attempt & known_question & known_choice
+            & (key.choice_questions[choices] == responses[:, 1]) & key.correct[choices])
+    # One response per attempt and question (unique_response), so nothing is counted twice
+    return np.bincount(rows[hits], weights=key.points[cols[hits]], minlength=len(attempt_ids))
+
+
+def grade_quiz(quiz, attempts=None):
+    """(Re-)grade submitted attempts of a quiz and store their scores.
+
+    Grades every submitted attempt unless ``attempts`` narrows it down, which
+    is how a single submission is graded. Returns the number of attempts
+    graded.
+    """
+    key = build_answer_key(quiz)
+
+    attempt_qs = Attempt.objects.filter(quiz=quiz, submitted_at__isnull=False)
+    if attempts is not None:
+        attempt_qs = attempt_qs.filter(pk__in=[getattr(a, 'pk', a) for a in attempts])
+
+    # Old scores, new scores and statistics all in one transaction, with the
+    # statistics locked first: a concurrent grader sees this one's scores as old
+    with transaction.atomic():
+        quiz_row, classroom_row = lock_stats(quiz.pk)
+        previous = list(attempt_qs.order_by('id').values_list('id', 'student_id', 'number', 'score', 'max_score'))
+        if not previous:
+            return 0
+        attempt_ids = np.array([row[0] for row in previous], dtype=np.int64)
+
+        response_qs = Response.objects.filter(attempt__in=attempt_qs, choice__isnull=False)
+        responses = np.array(
+            list(response_qs.values_list('attempt_id', 'question_id', 'choice_id')),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        scores = score_attempts(responses, attempt_ids, key)
+
+        max_score = float(key.points.sum())
+        save_scores(attempt_ids, scores, max_score)
+
+        # Each attempt whose score changed swaps its old score for the new one
+        record_grades(quiz_row, classroom_row, [
+            (attempt_id, student_id, number, to_percent(old_score, old_max), to_percent(float(score), max_score))
+            for (attempt_id, student_id, number, old_score, old_max), score in zip(previous, scores)
+            if (old_score, old_max) != (float(score), max_score)
+        ])
+    return len(attempt_ids)
+
+
+def save_scores(attempt_ids, scores, max_score):
+    # One prepared UPDATE run with executemany; bulk_update() would build a
+    # CASE expression per row, which costs more than the grading itself.
+    table = connection.ops.quote_name(Attempt._meta.db_table)
+    sql = f'UPDATE {table} SET score = %s, max_score = %s WHERE id = %s'
+    params = [(float(score), max_score, int(attempt_id)) for attempt_id, score in zip(attempt_ids, scores)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(params), GRADING_BATCH_SIZE):
+            cursor.executemany(sql, params[start:start + GRADING_BATCH_SIZE])
@@ -0,0 +1,56 @@
+"""Password hashing spread over worker processes.
+
+PBKDF2 is CPU-bound and holds the GIL, so hashing thousands of passwords
+(provisioning.py) only speeds up across processes. Workers are spawned
+rather than forked, so they don't inherit the parent's threads or database
+connections, and they use the parent's current hasher class (so
+override_settings(PASSWORD_HASHERS=...) reaches them). This module imports
+no models; the workers never set Django up.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.utils.module_loading import import_string
+
+_hasher = None
+
+
+def _start_worker(hasher_path):
+    global _hasher
+    _hasher = import_string(hasher_path)()
+
+
+def _hash(password):
+    return _hasher.encode(password, _hasher.salt())
+
+
+class PasswordHashPool:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        hasher = type(get_hasher())
+        # One worker needs no pool; hash in this process
+        self.executor = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_start_worker,
+            initargs=(f'{hasher.__module__}.{hasher.__qualname__}',),
+        ) if self.workers > 1 else None
+
+    def hash(self, passwords):
+        """Hashes in input order; a blank password becomes an unusable one."""
+        todo = [password for password in passwords if password]
+        if self.executor is None:
+            hashed = iter([make_password(password) for password in todo])
+        else:
+            hashed = self.executor.map(_hash, todo, chunksize=max(1, len(todo) // (self.workers * 4)))
+        return [next(hashed) if password else make_password(None) for password in passwords]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,322 @@
+"""Always-on per-view latency, query and template timing.
+
+InstrumentationMiddleware records every request under its resolved URL name:
+a latency histogram, and the latency, query count, query time and template
+render time of recent requests in a bounded ring buffer. Requests slower
+than ``INSTRUMENTATION_SLOW_MS`` also go into a bounded slow-request log,
+together with their SQL. Parameters are left out, since they may hold
+passwords or tokens.
+
+Queries are counted by a wrapper installed on every database connection.
+Templates are timed by the InstrumentedTemplates backend (see TEMPLATES in
+settings.py). Both find the request they belong to through a context
+variable, so sync views run in threads under ASGI are counted too.
+
+Everything is kept in memory per process. A daemon thread writes a JSON
+snapshot to ``INSTRUMENTATION_DIR`` every ``INSTRUMENTATION_DUMP_INTERVAL``
+seconds. collect() merges the snapshots of all worker processes for the
+staff page (/ops/performance/) and ``manage.py hot_paths``.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+HISTOGRAM_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_SQL_PER_REQUEST = 50
+SLOW_LOG_SIZE = 100
+UNRESOLVED = '<unresolved>'
+
+_current = ContextVar('instrumentation_request', default=None)
+
+
+class RequestRecord:
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'sql')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.sql = []  # (statement, seconds), the first MAX_SQL_PER_REQUEST only
+
+
+@contextmanager
+def recording():
+    # Count queries and template time outside a request, e.g. in a benchmark
+    record = RequestRecord()
+    token = _current.set(record)
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        record.queries += 1
+        record.db_time += elapsed
+        if len(record.sql) < MAX_SQL_PER_REQUEST:
+            record.sql.append((sql, elapsed))
+
+
+def _install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder():
+    # New connections get the wrapper as they open; this thread's existing ones now
+    connection_created.connect(_install, dispatch_uid='quiz_app_instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+class TimedTemplate:
+    # Wraps a backend template; nested render_to_string() calls aren't counted twice
+    def __init__(self, template):
+        self._wrapped = template
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        record = _current.get()
+        if record is None:
+            return self._wrapped.render(context, request)
+        record.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self._wrapped.render(context, request)
+        finally:
+            record.template_depth -= 1
+            if not record.template_depth:
+                record.template_time += time.perf_counter() - start
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class ViewStats:
+    __slots__ = ('count', 'errors', 'total', 'histogram', 'samples')
+
+    def __init__(self, ring_size):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.samples = deque(maxlen=ring_size)  # (latency, queries, db time, template time)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+        self.started_at = time.time()
+
+    def add(self, name, request, status, latency, record):
+        with self.lock:
+            stats = self.views.get(name)
+            if stats is None:
+                stats = self.views[name] = ViewStats(getattr(settings, 'INSTRUMENTATION_RING_SIZE', 1000))
+            stats.count += 1
+            stats.errors += status >= 500
+            stats.total += latency
+            stats.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, latency * 1000)] += 1
+            stats.samples.append((latency, record.queries, record.db_time, record.template_time))
+        if latency * 1000 >= getattr(settings, 'INSTRUMENTATION_SLOW_MS', 500):
+            self.slow.append({
+                'view': name, 'method': request.method, 'path': request.path, 'status': status,
+                'at': time.time(), 'ms': latency * 1000, 'queries': record.queries,
+                'db_ms': record.db_time * 1000, 'template_ms': record.template_time * 1000,
+                'sql': [[sql, elapsed * 1000] for sql, elapsed in record.sql],
+            })
+
+    def snapshot(self):
+        with self.lock:
+            views = {
+                name: {
+                    'count': stats.count, 'errors': stats.errors, 'total_ms': stats.total * 1000,
+                    'histogram': list(stats.histogram),
+                    'samples': [[latency * 1000, queries, db * 1000, template * 1000]
+                                for latency, queries, db, template in stats.samples],
+                }
+                for name, stats in self.views.items()
+            }
+            slow = list(self.slow)
+        return {'pid': os.getpid(), 'started_at': self.started_at, 'generated_at': time.time(),
+                'views': views, 'slow': slow}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.slow.clear()
+            self.started_at = time.time()
+
+
+registry = Registry()
+
+
+def snapshot_dir():
+    return getattr(settings, 'INSTRUMENTATION_DIR', None)
+
+
+def dump():
+    directory = snapshot_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as snapshot:
+        json.dump(registry.snapshot(), snapshot)
+    os.replace(path + '.tmp', path)  # readers never see half a file
+
+
+_dumper = None
+
+
+def _start_dumper():
+    global _dumper
+    interval = getattr(settings, 'INSTRUMENTATION_DUMP_INTERVAL', 10)
+    if _dumper is not None or not snapshot_dir() or not interval:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                dump()
+            except OSError:
+                pass  # e.g. a full disk; the next round tries again
+
+    _dumper = threading.Thread(target=run, name='instrumentation-dump', daemon=True)
+    _dumper.start()
+
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def collect(max_age=3600):
+    """Merge this process's numbers with the other workers' snapshots.
+
+    Returns (rows, slow requests). Rows are per view and sorted by total
+    time, the hottest path first; snapshots older than ``max_age`` seconds
+    (dead workers) are ignored.
+    """
+    snapshots = {os.getpid(): registry.snapshot()}
+    directory = snapshot_dir()
+    if directory and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as snapshot:
+                    data = json.load(snapshot)
+            except (OSError, ValueError):
+                continue
+            if data['pid'] not in snapshots and time.time() - data['generated_at'] <= max_age:
+                snapshots[data['pid']] = data
+
+    merged = {}
+    for data in snapshots.values():
+        for name, view in data['views'].items():
+            row = merged.setdefault(name, {'view': name, 'count': 0, 'errors': 0, 'total_ms': 0.0,
+                                           'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1), 'samples': []})
+            row['count'] += view['count']
+            row['errors'] += view['errors']
+            row['total_ms'] += view['total_ms']
+            row['histogram'] = [a + b for a, b in zip(row['histogram'], view['histogram'])]
+            row['samples'] += view['samples']
+
+    rows = []
+    for row in merged.values():
+        samples = row.pop('samples')
+        latencies = sorted(sample[0] for sample in samples)
+        row.update({
+            'mean_ms': row['total_ms'] / row['count'],
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99),
+            'queries': sum(sample[1] for sample in samples) / len(samples),
+            'db_ms': sum(sample[2] for sample in samples) / len(samples),
+            'template_ms': sum(sample[3] for sample in samples) / len(samples),
+        })
+        rows.append(row)
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    slow = sorted((entry for data in snapshots.values() for entry in data['slow']),
+                  key=lambda entry: entry['at'], reverse=True)[:SLOW_LOG_SIZE]
+    return rows, slow
+
+
+class InstrumentationMiddleware:
+    """Time each request and file it under its URL name.
+
+    Goes first in MIDDLEWARE so the other middleware is included. Streaming
+    responses are timed up to their first byte.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_query_recorder()
+        _start_dumper()
+
+    def finish(self, request, response, start, record):
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match is not None else UNRESOLVED
+        registry.add(name, request, response.status_code, time.perf_counter() - start, record)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, start, record)
+        return response
+
+    async def __acall__(self, request):
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, start, record)
+        return response
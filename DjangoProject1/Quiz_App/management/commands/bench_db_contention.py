@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE classroom (id INTEGER PRIMARY KEY, class_code TEXT UNIQUE);
+CREATE TABLE enrollment (
+    id INTEGER PRIMARY KEY,
+    classroom_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    UNIQUE (classroom_id, student_id)
+);
+"""
+
+
+def connect(path, options):
+    # Mirrors what Django's sqlite3 backend does with DATABASES OPTIONS
+    conn = sqlite3.connect(path, timeout=options.get('timeout', 5), isolation_level=None)
+    for pragma in options.get('init_command', '').split(';'):
+        if pragma.strip():
+            conn.execute(pragma)
+    return conn
+
+
+def worker(path, options, worker_id, writes, results):
+    conn = connect(path, options)
+    begin = f"BEGIN {options['transaction_mode']}" if options.get('transaction_mode') else 'BEGIN'
+    done = errors = 0
+    for n in range(writes):
+        # Shaped like join_class: read the classroom, then insert the enrollment
+        try:
+            conn.execute(begin)
+            conn.execute('SELECT id FROM classroom WHERE class_code = ?', (f'CODE{n % 50}',)).fetchone()
+            conn.execute('INSERT OR IGNORE INTO enrollment (classroom_id, student_id) VALUES (?, ?)',
+                         (n % 50, worker_id * writes + n))
+            conn.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            # "database is locked": the request would have failed with a 500
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            errors += 1
+    results.put((done, errors))
+
+
+class Command(BaseCommand):
+    help = "Compare write throughput of the default and production SQLite profiles under multi-process contention."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=500, help="Transactions per process.")
+
+    def run_profile(self, options, processes, writes):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            setup = connect(path, options)
+            setup.executescript(SCHEMA)
+            setup.executemany('INSERT INTO classroom (class_code) VALUES (?)', [(f'CODE{n}',) for n in range(50)])
+            setup.close()
+
+            results = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=worker, args=(path, options, i, writes, results))
+                       for i in range(processes)]
+            start = time.perf_counter()
+            for process in workers:
+                process.start()
+            totals = [results.get() for _ in workers]
+            for process in workers:
+                process.join()
+            elapsed = time.perf_counter() - start
+        done = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return done / elapsed, errors
+
+    def handle(self, *args, **options):
+        profiles = {
+            'development': {},
+            'production': settings.SQLITE_PRODUCTION_OPTIONS,
+        }
+        for name, profile in profiles.items():
+            throughput, errors = self.run_profile(profile, options['processes'], options['writes'])
+            self.stdout.write(f"{name:>12}: {throughput:8.0f} writes/s, {errors} 'database is locked' failures")
@@ -0,0 +1,53 @@
+import asyncio
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Quiz_App.benchmarks import isolated_database
+from Quiz_App.class_codes import create_classroom
+from Quiz_App.deadlines import DeadlineScheduler
+from Quiz_App.models import Attempt, Question, Quiz
+
+
+class Command(BaseCommand):
+    help = "Let the deadline scheduler auto-submit a section's worth of timed attempts and report its lag."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=5000)
+        parser.add_argument('--spread', type=float, default=5.0,
+                            help="Seconds over which the deadlines fall due.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with isolated_database():
+            quiz = Quiz.objects.create(
+                classroom=create_classroom(teacher=User.objects.create(username='bench_teacher'), class_name='Bench'),
+                title='Timed quiz', time_limit_minutes=30)
+            Question.objects.bulk_create([Question(quiz=quiz, text=f'Q{n}') for n in range(20)])
+            students = User.objects.bulk_create(
+                [User(username=f'bench_student{n}') for n in range(options['attempts'])], batch_size=1000)
+            start = timezone.now() + timedelta(seconds=1)
+            # Loaded by the scheduler's rebuild, as after a restart
+            Attempt.objects.bulk_create(
+                [Attempt(quiz=quiz, student=s, deadline=start + timedelta(seconds=rng.uniform(0, options['spread'])))
+                 for s in students], batch_size=1000)
+
+            scheduler = asyncio.run(self.run(scheduler=DeadlineScheduler(), total=len(students),
+                                             timeout=options['spread'] + 60))
+            metrics = scheduler.metrics()
+            self.stdout.write(f"auto-submitted {metrics['submitted']} of {len(students)} attempts "
+                              f"in {metrics['batches']} batches (mean size {metrics['mean_batch_size'] or 0:.1f})")
+            self.stdout.write(f"lag: p50 {metrics['lag_p50_ms'] or 0:.1f} ms, max {metrics['lag_max_ms'] or 0:.1f} ms")
+            self.stdout.write(f"still open: {Attempt.objects.filter(submitted_at__isnull=True).count()}")
+
+    async def run(self, scheduler, total, timeout):
+        scheduler.start()
+        deadline = time.monotonic() + timeout
+        while scheduler.submitted < total and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler
@@ -0,0 +1,210 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Quiz_App.benchmarks import isolated_database, summarize
+from Quiz_App.class_codes import bulk_create_classrooms
+from Quiz_App.models import Classroom, Enrollment, Profile
+from Quiz_App.utils import QueryCounter
+
+PASSWORD = 'load-test-password'
+FLOWS = ('signup', 'login', 'join_class', 'create_class', 'landing_page')
+SUBJECTS = ['Biology', 'Chemistry', 'Physics', 'History', 'Literature', 'Algebra']
+# A failed signup or login re-renders its form with a 200; only the redirect means it worked
+EXPECTED_STATUS = {'signup': 302, 'login': 302}
+
+
+class Command(BaseCommand):
+    help = ("Seed teachers, students, classrooms and enrollments, replay the signup, login, join_class, "
+            "create_class and landing_page flows from concurrent clients, and save the numbers as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=50)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--classrooms', type=int, default=200)
+        parser.add_argument('--enrollments', type=int, default=5, help="Classes each student is enrolled in.")
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent clients, one thread each.")
+        parser.add_argument('--requests', type=int, default=50, help="Requests per worker per flow.")
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+        parser.add_argument('--fast-hashing', action='store_true',
+                            help="Use a cheap password hasher, to measure everything but PBKDF2.")
+        parser.add_argument('--output', default='bench_flows.json')
+        parser.add_argument('--compare', help="An earlier --output file to compare against.")
+
+    def handle(self, *args, **options):
+        if options['workers'] > min(options['students'], options['teachers']):
+            raise CommandError("Every worker needs its own teacher and student; lower --workers.")
+        baseline = self.load(options['compare']) if options['compare'] else None
+        hashers = (['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hashing']
+                   else settings.PASSWORD_HASHERS)
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(PASSWORD_HASHERS=hashers), \
+                isolated_database(name=os.path.join(tmp, 'bench.sqlite3')):
+            start = time.perf_counter()
+            users = self.seed(options)
+            self.stdout.write(f"seeded in {time.perf_counter() - start:.1f} s")
+            flows = {flow: self.replay(flow, users, options) for flow in options['flows']}
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'settings': {
+                **{key: options[key] for key in ('teachers', 'students', 'classrooms', 'enrollments',
+                                                 'workers', 'requests')},
+                'db_profile': settings.DB_PROFILE,
+                'password_hasher': get_hasher().algorithm if not options['fast_hashing'] else 'md5',
+            },
+            'flows': flows,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+
+        self.stdout.write(f"{'flow':>13} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                          f"{'queries':>8} {'errors':>6}")
+        for flow, result in flows.items():
+            self.stdout.write(
+                f"{flow:>13} {result['throughput_rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['queries_mean']:>8.1f} {result['errors']:>6}")
+            if baseline and flow in baseline['flows']:
+                before = baseline['flows'][flow]
+                self.stdout.write(
+                    f"{'':>13} {self.change(before['throughput_rps'], result['throughput_rps']):>8} "
+                    f"{self.change(before['p50_ms'], result['p50_ms']):>8} "
+                    f"{self.change(before['p95_ms'], result['p95_ms']):>8} "
+                    f"{self.change(before['p99_ms'], result['p99_ms']):>8} "
+                    f"{result['queries_mean'] - before['queries_mean']:>+8.1f}")
+        self.stdout.write(f"results saved to {options['output']}")
+
+    def load(self, path):
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Can't read {path}: {error}")
+
+    def change(self, before, after):
+        return f"{(after - before) / before * 100:+.0f}%" if before else 'n/a'
+
+    def seed(self, options):
+        rng = random.Random(42)
+        password = make_password(PASSWORD)  # hashed once; every seeded account shares it
+        teachers = User.objects.bulk_create(
+            [User(username=f'load_teacher{n}', email=f'load_teacher{n}@example.com', password=password)
+             for n in range(options['teachers'])], batch_size=1000)
+        students = User.objects.bulk_create(
+            [User(username=f'load_student{n}', email=f'load_student{n}@example.com', password=password)
+             for n in range(options['students'])], batch_size=1000)
+        Profile.objects.bulk_create([Profile(user=u, role='teacher') for u in teachers]
+                                    + [Profile(user=u, role='student') for u in students], batch_size=1000)
+
+        classrooms = []
+        for n, teacher in enumerate(teachers):
+            count = options['classrooms'] // len(teachers) + (n < options['classrooms'] % len(teachers))
+            classrooms += bulk_create_classrooms(teacher, [
+                {'class_name': f'Class {n}-{c}', 'section': 'A', 'subject': rng.choice(SUBJECTS), 'room': '101'}
+                for c in range(count)])
+        Enrollment.objects.bulk_create(
+            [Enrollment(classroom=classroom, student=student)
+             for student in students
+             for classroom in rng.sample(classrooms, min(options['enrollments'], len(classrooms)))],
+            batch_size=2000)
+        return {
+            'teachers': teachers,
+            'students': students,
+            'codes': list(Classroom.objects.values_list('class_code', flat=True)),
+        }
+
+    def requests_for(self, flow, worker, users, options):
+        # (method, url name, form data) of each request one worker sends
+        rng = random.Random(worker)
+        count = options['requests']
+        if flow == 'signup':
+            return [('post', 'signup', {
+                'first_name': 'Load', 'last_name': 'Test', 'username': f'load_new{worker}_{n}',
+                'email': f'load_new{worker}_{n}@example.com', 'role': rng.choice(['student', 'teacher']),
+                'password': PASSWORD, 'reenter_password': PASSWORD}) for n in range(count)]
+        if flow == 'login':
+            return [('post', 'login', {'username': rng.choice(users['students']).username, 'password': PASSWORD})
+                    for _ in range(count)]
+        if flow == 'join_class':
+            return [('post', 'join_class', {'class_code': rng.choice(users['codes'])}) for _ in range(count)]
+        if flow == 'create_class':
+            return [('post', 'create_class', {'class_name': f'Load {worker}-{n}', 'section': 'B',
+                                              'subject': rng.choice(SUBJECTS), 'room': '202'})
+                    for n in range(count)]
+        return [('get', 'landing', None)] * count
+
+    def login_as(self, flow, worker, users):
+        # Teachers create classes, students join them; landing pages alternate
+        if flow == 'create_class' or (flow == 'landing_page' and worker % 2):
+            return users['teachers'][worker]
+        if flow in ('join_class', 'landing_page'):
+            return users['students'][worker]
+        return None
+
+    def replay(self, flow, users, options):
+        samples, queries, errors = [], [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['workers'])
+
+        def work(worker):
+            client = Client()
+            user = self.login_as(flow, worker, users)
+            if user is not None:
+                client.force_login(user)
+            plan = self.requests_for(flow, worker, users, options)
+            mine, counts, failed = [], [], 0
+            barrier.wait()
+            try:
+                for method, name, data in plan:
+                    if flow in ('signup', 'login'):
+                        client.cookies.clear()  # a fresh visitor each time
+                    counter = QueryCounter()
+                    start = time.perf_counter()
+                    with connection.execute_wrapper(counter):
+                        try:
+                            response = getattr(client, method)(reverse(name), data)
+                            if flow in EXPECTED_STATUS:
+                                failed += response.status_code != EXPECTED_STATUS[flow]
+                            else:
+                                failed += response.status_code >= 400
+                        except Exception:
+                            failed += 1  # e.g. "database is locked"
+                    mine.append(time.perf_counter() - start)
+                    counts.append(counter.count)
+            finally:
+                connection.close()
+            with lock:
+                samples.extend(mine)
+                queries.extend(counts)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(options['workers'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        stats = summarize(samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(errors),
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+            **{key: stats[key] for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')},
+            'queries_mean': sum(queries) / len(queries) if queries else 0.0,
+            'queries_max': max(queries, default=0),
+        }
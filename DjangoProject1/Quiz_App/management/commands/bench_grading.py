@@ -0,0 +1,49 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Quiz_App.benchmarks import isolated_database, time_call
+from Quiz_App.class_codes import create_classroom
+from Quiz_App.grading import grade_quiz
+from Quiz_App.models import Attempt, Choice, Question, Quiz, Response
+
+
+class Command(BaseCommand):
+    help = "Time a full re-grade of one quiz (attempts x questions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=1000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--choices', type=int, default=4)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            quiz = self.seed(options['attempts'], options['questions'], options['choices'])
+            elapsed, graded = time_call(grade_quiz, quiz)
+            self.stdout.write(
+                f"Graded {graded} attempts x {options['questions']} questions in {elapsed * 1000:.1f} ms"
+            )
+
+    def seed(self, n_attempts, n_questions, n_choices):
+        teacher = User.objects.create(username='bench_teacher')
+        classroom = create_classroom(teacher=teacher, class_name='Bench')
+        quiz = Quiz.objects.create(classroom=classroom, title='Bench quiz')
+        questions = Question.objects.bulk_create(
+            [Question(quiz=quiz, text=f'Q{n}', order=n) for n in range(n_questions)])
+        choices = Choice.objects.bulk_create(
+            [Choice(question=q, text=f'C{c}', is_correct=(c == 0), order=c)
+             for q in questions for c in range(n_choices)], batch_size=1000)
+        by_question = [choices[i * n_choices:(i + 1) * n_choices] for i in range(n_questions)]
+
+        students = User.objects.bulk_create(
+            [User(username=f'bench_student{n}') for n in range(n_attempts)], batch_size=1000)
+        now = timezone.now()
+        attempts = Attempt.objects.bulk_create(
+            [Attempt(quiz=quiz, student=s, submitted_at=now) for s in students], batch_size=1000)
+        Response.objects.bulk_create(
+            [Response(attempt=a, question=q, choice=random.choice(options))
+             for a in attempts for q, options in zip(questions, by_question)],
+            batch_size=2000)
+        return quiz
@@ -0,0 +1,51 @@
+import timeit
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from Quiz_App import instrumentation
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request, per-query and per-template overhead of the always-on instrumentation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=100000, help="Calls timed per scenario.")
+
+    @override_settings(INSTRUMENTATION_DIR=None)  # keep the fake requests out of the hot paths
+    def handle(self, *args, **options):
+        number = options['number']
+        response = HttpResponse()
+        middleware = instrumentation.InstrumentationMiddleware(lambda request: response)
+        request = RequestFactory().get('/landing/')
+        request.resolver_match = resolve('/landing/')
+        baseline = self.best(lambda: response, number=number)
+        elapsed = self.best(lambda: middleware(request), number=number) - baseline
+        self.report('middleware', elapsed, number)
+
+        # Query and render times vary far more than the wrappers cost; time them around no-ops
+        def execute(sql, params, many, context):
+            return None
+
+        with instrumentation.recording():
+            plain = self.best(lambda: execute('SELECT 1', None, False, {}), number=number)
+            recorded = self.best(lambda: instrumentation.record_query(execute, 'SELECT 1', None, False, {}),
+                                 number=number)
+        self.report('query', recorded - plain, number)
+
+        plain = SimpleNamespace(render=lambda context=None, request=None: '')
+        template = instrumentation.TimedTemplate(plain)
+        plain_time = self.best(lambda: plain.render({}), number=number)
+        with instrumentation.recording():
+            recorded = self.best(lambda: template.render({}), number=number)
+        self.report('template', recorded - plain_time, number)
+        instrumentation.registry.reset()
+
+    def best(self, call, number):
+        return min(timeit.repeat(call, number=number, repeat=5))
+
+    def report(self, label, elapsed, number):
+        self.stdout.write(f"{label:>10}: {elapsed / number * 1e9:8.0f} ns/call")
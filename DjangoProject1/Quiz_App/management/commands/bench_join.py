@@ -0,0 +1,42 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Quiz_App.benchmarks import isolated_database, summarize, time_call
+from Quiz_App.class_codes import bulk_create_classrooms
+from Quiz_App.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Measure class code lookup latency as the number of classrooms grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help="Comma-separated classroom counts to measure at.")
+        parser.add_argument('--lookups', type=int, default=2000,
+                            help="Number of join lookups timed at each size.")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        with isolated_database():
+            teacher = User.objects.create_user(username='bench_teacher', password='unused')
+            created = 0
+            for size in sizes:
+                rows = [
+                    {'class_name': f'Class {n}', 'section': 'A', 'subject': 'Bench', 'room': '101'}
+                    for n in range(created, size)
+                ]
+                bulk_create_classrooms(teacher, rows)
+                created = size
+
+                codes = list(Classroom.objects.values_list('class_code', flat=True))
+                samples = []
+                for code in random.choices(codes, k=options['lookups']):
+                    elapsed, _ = time_call(Classroom.objects.get, class_code=code)
+                    samples.append(elapsed)
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{size:>8} classrooms: p50 {stats['p50_ms']:.3f} ms, "
+                    f"p99 {stats['p99_ms']:.3f} ms"
+                )
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Quiz_App import card_cache
+from Quiz_App.benchmarks import isolated_database, summarize, time_call
+from Quiz_App.class_codes import bulk_create_classrooms
+from Quiz_App.models import Enrollment, Profile
+
+
+class Command(BaseCommand):
+    help = "Compare landing page latency with cold and warm classroom card caches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classrooms', type=int, default=50,
+                            help="Classrooms the benchmark student is enrolled in.")
+        parser.add_argument('--requests', type=int, default=300,
+                            help="Landing page requests timed per mode.")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            teacher = User.objects.create_user(username='bench_teacher', first_name='Ada', last_name='Lovelace')
+            Profile.objects.create(user=teacher, role='teacher')
+            student = User.objects.create_user(username='bench_student')
+            Profile.objects.create(user=student, role='student')
+            rows = [{'class_name': f'Class {n}', 'section': 'A', 'subject': 'Bench', 'room': '101'}
+                    for n in range(options['classrooms'])]
+            classrooms = bulk_create_classrooms(teacher, rows)
+            Enrollment.objects.bulk_create([Enrollment(classroom=c, student=student) for c in classrooms])
+
+            client = Client()
+            client.force_login(student)
+            url = reverse('landing')
+            for mode in ('cold', 'warm'):
+                card_cache.invalidate_class_lists([student.pk])
+                client.get(url)  # warm-up; also fills the cache for the warm run
+                card_cache.stats.update(hits=0, misses=0)
+                samples, queries = [], 0
+                for _ in range(options['requests']):
+                    if mode == 'cold':
+                        card_cache.invalidate_class_lists([student.pk])
+                    with CaptureQueriesContext(connection) as captured:
+                        elapsed, _ = time_call(client.get, url)
+                    samples.append(elapsed)
+                    queries += len(captured)
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{mode}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+                    f"{queries / options['requests']:.1f} queries/request, "
+                    f"{card_cache.stats['hits']} hits / {card_cache.stats['misses']} misses"
+                )
@@ -0,0 +1,38 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from Quiz_App.middleware import LoginRequiredMiddleware
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of LoginRequiredMiddleware."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200000,
+                            help="Requests timed per scenario.")
+
+    def handle(self, *args, **options):
+        response = HttpResponse()
+        middleware = LoginRequiredMiddleware(lambda request: response)
+        factory = RequestFactory()
+
+        def anonymous(path):
+            request = factory.get(path)
+            request.user = AnonymousUser()
+            return request
+
+        scenarios = {
+            'static file': anonymous('/static/BulSULogo.png'),
+            'health check': anonymous('/health/'),
+            'public page': anonymous('/login/'),
+            'redirect to login': anonymous('/landing/'),
+        }
+        number = options['number']
+        baseline = timeit.timeit(lambda: response, number=number)
+        for label, request in scenarios.items():
+            elapsed = timeit.timeit(lambda: middleware(request), number=number) - baseline
+            self.stdout.write(f"{label:>18}: {elapsed / number * 1e9:8.0f} ns/request")
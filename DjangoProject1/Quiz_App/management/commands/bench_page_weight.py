@@ -0,0 +1,64 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from Quiz_App.benchmarks import isolated_database
+from Quiz_App.models import Profile
+
+ASSET_RE = re.compile(r'<(?:link[^>]+href|script[^>]+src|img[^>]+src)="([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = "Count the requests and bytes a first (cold cache) visit to a page downloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', default='/landing/', help="Path of the page to weigh.")
+
+    def size(self, url):
+        # (identity, gzip, brotli) sizes of a local file; collected files first
+        name = url[len(settings.STATIC_URL):].split('?')[0]
+        path = os.path.join(settings.STATIC_ROOT, name)
+        if not os.path.exists(path):
+            path = finders.find(name)
+        if not path or not os.path.exists(path):
+            return None
+        sizes = [os.path.getsize(path)]
+        for suffix in ('.gz', '.br'):
+            sizes.append(os.path.getsize(path + suffix) if os.path.exists(path + suffix) else sizes[0])
+        return sizes
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            user = User.objects.create_user(username='bench_student')
+            Profile.objects.create(user=user, role='student')
+            client = Client()
+            client.force_login(user)
+            html = client.get(options['page']).content
+
+        external, missing, local = [], [], 0
+        totals = [len(html)] * 3
+        for url in dict.fromkeys(ASSET_RE.findall(html.decode())):
+            if not url.startswith(settings.STATIC_URL):
+                external.append(url)
+                continue
+            sizes = self.size(url)
+            if sizes is None:
+                missing.append(url)
+                continue
+            local += 1
+            totals = [total + size for total, size in zip(totals, sizes)]
+            self.stdout.write(f"{sizes[0]:>9}  {url}")
+
+        for url in external:
+            self.stdout.write(f"{'external':>9}  {url}")
+        for url in missing:
+            self.stdout.write(f"{'missing':>9}  {url}")
+        self.stdout.write(
+            f"{1 + local + len(missing) + len(external)} requests ({len(external)} external); local bytes: "
+            f"{totals[0]} identity, {totals[1]} gzip, {totals[2]} brotli"
+        )
@@ -0,0 +1,46 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Quiz_App.benchmarks import isolated_database, summarize, time_call
+from Quiz_App.class_codes import create_classroom
+from Quiz_App.models import Choice, Question, Quiz
+from Quiz_App.randomization import start_attempt, unpermute
+
+
+class Command(BaseCommand):
+    help = "Time shuffled attempt starts, resumes, and un-permuting a batch of positional answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--choices', type=int, default=4)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with isolated_database():
+            quiz = Quiz.objects.create(
+                classroom=create_classroom(teacher=User.objects.create(username='bench_teacher'), class_name='Bench'),
+                title='Bench quiz')
+            questions = Question.objects.bulk_create(
+                [Question(quiz=quiz, text=f'Q{n}', order=n) for n in range(options['questions'])])
+            Choice.objects.bulk_create(
+                [Choice(question=q, text=f'C{c}', order=c) for q in questions for c in range(options['choices'])],
+                batch_size=1000)
+            students = User.objects.bulk_create(
+                [User(username=f'bench_student{n}') for n in range(options['students'])], batch_size=1000)
+
+            starts = [time_call(start_attempt, quiz, student) for student in students]
+            resumes = [time_call(start_attempt, quiz, student)[0] for student in students]
+            attempts = [attempt for _, attempt in starts]
+            size = len(attempts[0].question_order) + len(attempts[0].choice_order)
+
+            positions = [[rng.randrange(-1, options['choices']) for _ in questions] for _ in attempts]
+            elapsed, _ = time_call(unpermute, [(a.question_order, a.choice_order) for a in attempts], positions)
+
+            for label, samples in (('start', [t for t, _ in starts]), ('resume', resumes)):
+                stats = summarize(samples)
+                self.stdout.write(f"{label:>6}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms")
+            self.stdout.write(f"stored order: {size} bytes per attempt")
+            self.stdout.write(f"un-permuted {len(attempts)} x {options['questions']} answers in {elapsed * 1000:.1f} ms")
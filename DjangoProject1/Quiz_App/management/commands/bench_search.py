@@ -0,0 +1,62 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Quiz_App.benchmarks import isolated_database, summarize, time_call
+from Quiz_App.class_codes import bulk_create_classrooms
+from Quiz_App.models import Question, Quiz
+from Quiz_App.search import reindex, search_questions
+
+SUBJECTS = ['Biology', 'Chemistry', 'Physics', 'History', 'Literature',
+            'Algebra', 'Geometry', 'Economics', 'Geography', 'Programming']
+
+
+class Command(BaseCommand):
+    help = "Time question bank searches (plain, prefix and filtered) over a seeded index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100000)
+        parser.add_argument('--searches', type=int, default=500,
+                            help="Searches timed per query kind.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        # A Zipf-ish vocabulary of random words: a few very common ones and a
+        # long tail. (Numbered words like 'cell1', 'cell10', 'cell100' would
+        # make every prefix expand to hundreds of terms, unlike real text.)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        vocabulary = list(dict.fromkeys(
+            ''.join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(5000)))
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+        with isolated_database():
+            teachers = User.objects.bulk_create([User(username=f'bench_teacher{n}') for n in range(20)])
+            classrooms = []
+            for n, teacher in enumerate(teachers):
+                classrooms += bulk_create_classrooms(teacher, [
+                    {'class_name': f'Class {n}-{c}', 'subject': SUBJECTS[(n + c) % len(SUBJECTS)]}
+                    for c in range(10)])
+            quizzes = Quiz.objects.bulk_create(
+                [Quiz(classroom=rng.choice(classrooms), title=f'Quiz {n}', is_published=rng.random() < 0.8)
+                 for n in range(2000)])
+            Question.objects.bulk_create(
+                [Question(quiz=rng.choice(quizzes), text=' '.join(rng.choices(vocabulary, weights, k=12)))
+                 for _ in range(options['questions'])],
+                batch_size=2000)
+
+            elapsed, indexed = time_call(reindex)
+            self.stdout.write(f"reindex: {indexed} questions in {elapsed:.2f} s")
+
+            kinds = {
+                'common word': lambda: search_questions(rng.choice(vocabulary[:20])),
+                'rare word': lambda: search_questions(rng.choice(vocabulary[1000:])),
+                'two words': lambda: search_questions(' '.join(rng.choices(vocabulary[:200], k=2))),
+                'prefix': lambda: search_questions(rng.choice(vocabulary[:500])[:4]),
+                'subject filter': lambda: search_questions(rng.choice(vocabulary[:50]), subject=rng.choice(SUBJECTS)),
+                'teacher filter': lambda: search_questions(rng.choice(vocabulary[:50]), teacher=rng.choice(teachers)),
+                'as a teacher': lambda: search_questions(rng.choice(vocabulary[:50]), viewer=rng.choice(teachers)),
+            }
+            for kind, search in kinds.items():
+                stats = summarize([time_call(search)[0] for _ in range(options['searches'])])
+                self.stdout.write(f"{kind:>15}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms")
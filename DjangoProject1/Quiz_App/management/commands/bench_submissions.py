@@ -0,0 +1,85 @@
+import asyncio
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from django.urls import reverse
+
+from Quiz_App.benchmarks import isolated_database, summarize
+from Quiz_App.class_codes import create_classroom
+from Quiz_App.models import Attempt, Choice, Question, Quiz
+from Quiz_App.submissions import submission_queue
+
+
+class Command(BaseCommand):
+    help = "Fire simultaneous quiz submissions through the ASGI handler and report latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--questions', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            attempts, answers = self.seed(options['students'], options['questions'])
+            start = time.perf_counter()
+            latencies, statuses = asyncio.run(self.burst(attempts, answers))
+            elapsed = time.perf_counter() - start
+            stats = summarize(latencies)
+            submitted = Attempt.objects.filter(submitted_at__isnull=False).count()
+            self.stdout.write(
+                f"{len(latencies)} submissions: p50 {stats['p50_ms']:.1f} ms, "
+                f"p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms"
+            )
+            self.stdout.write(
+                f"{submitted} attempts stored in {submission_queue.batches_written} batches "
+                f"({elapsed:.1f} s including logins); "
+                f"retries answered as duplicates: {statuses.count('duplicate')}"
+            )
+
+    def seed(self, n_students, n_questions):
+        teacher = User.objects.create(username='bench_teacher')
+        classroom = create_classroom(teacher=teacher, class_name='Bench')
+        quiz = Quiz.objects.create(classroom=classroom, title='Timed quiz')
+        questions = Question.objects.bulk_create(
+            [Question(quiz=quiz, text=f'Q{n}', order=n) for n in range(n_questions)])
+        choices = Choice.objects.bulk_create(
+            [Choice(question=q, text='A', is_correct=True) for q in questions])
+        answers = {str(q.pk): c.pk for q, c in zip(questions, choices)}
+        students = User.objects.bulk_create(
+            [User(username=f'bench_student{n}') for n in range(n_students)])
+        attempts = Attempt.objects.bulk_create(
+            [Attempt(quiz=quiz, student=s) for s in students])
+        return attempts, answers
+
+    async def submit(self, attempt, answers, token, client):
+        start = time.perf_counter()
+        response = await client.post(
+            reverse('submit_attempt', args=[attempt.pk]),
+            {'token': token, 'answers': answers},
+            content_type='application/json',
+        )
+        return time.perf_counter() - start, response.json()['status']
+
+    async def burst(self, attempts, answers):
+        tokens = [uuid.uuid4().hex for _ in attempts]
+        # Log every student in first so only the submissions are timed
+        clients = []
+        for attempt in attempts:
+            client = AsyncClient()
+            await client.aforce_login(await sync_to_async(User.objects.get)(pk=attempt.student_id))
+            clients.append(client)
+
+        results = await asyncio.gather(*(
+            self.submit(attempt, answers, token, client)
+            for attempt, token, client in zip(attempts, tokens, clients)
+        ))
+        # Every client retries once, as a flaky network would
+        retries = await asyncio.gather(*(
+            self.submit(attempt, answers, token, client)
+            for attempt, token, client in zip(attempts, tokens, clients)
+        ))
+        await submission_queue.drain()
+        return [r[0] for r in results], [r[1] for r in retries]
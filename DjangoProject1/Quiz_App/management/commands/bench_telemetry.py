@@ -0,0 +1,61 @@
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from Quiz_App import telemetry
+from Quiz_App.benchmarks import isolated_database, summarize, time_call
+from Quiz_App.class_codes import create_classroom
+from Quiz_App.models import Attempt, AttemptEvent, AttemptSuspicion, Quiz
+
+
+class Command(BaseCommand):
+    help = "Ingest simulated anti-cheating beacons for a section and time buffering and bulk flushes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--beacons', type=int, default=20, help="Beacons per student.")
+        parser.add_argument('--events', type=int, default=10, help="Events per beacon.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with isolated_database():
+            teacher = User.objects.create(username='bench_teacher')
+            quiz = Quiz.objects.create(classroom=create_classroom(teacher=teacher, class_name='Bench'), title='Q')
+            students = User.objects.bulk_create(
+                [User(username=f'bench_student{n}') for n in range(options['students'])])
+            attempts = Attempt.objects.bulk_create([Attempt(quiz=quiz, student=s) for s in students])
+
+            now_ms = timezone.now().timestamp() * 1000
+            beacons = [
+                (attempt.student_id, attempt.pk, json.dumps({
+                    't': now_ms, 'e': [[rng.randint(1, 5), n * 100] for n in range(options['events'])]}))
+                for _ in range(options['beacons']) for attempt in attempts
+            ]
+
+            # What each request pays: parse and append, with flushing left to the timer
+            record_times, flush_times = [], []
+            with override_settings(TELEMETRY_FLUSH_INTERVAL=3600, TELEMETRY_FLUSH_BATCH=10 ** 9):
+                telemetry.flush()
+                start = time.perf_counter()
+                for n, (student_id, attempt_id, raw) in enumerate(beacons, start=1):
+                    record_times.append(time_call(
+                        lambda: telemetry.record(student_id, attempt_id, telemetry.parse_batch(raw, timezone.now())))[0])
+                    # Flush in the same chunks the default TELEMETRY_FLUSH_BATCH would
+                    if n * options['events'] % 2000 < options['events']:
+                        flush_times.append(time_call(telemetry.flush)[0])
+                flush_times.append(time_call(telemetry.flush)[0])
+                elapsed = time.perf_counter() - start
+
+            events = AttemptEvent.objects.count()
+            stats, flushes = summarize(record_times), summarize(flush_times)
+            self.stdout.write(f"{len(beacons)} beacons, {events} events in {elapsed:.2f} s "
+                              f"({events / elapsed:,.0f} events/s)")
+            self.stdout.write(f"per beacon: p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms")
+            self.stdout.write(f"{flushes['count']} flushes: p50 {flushes['p50_ms']:.1f} ms, "
+                              f"p99 {flushes['p99_ms']:.1f} ms")
+            self.stdout.write(f"summary rows: {AttemptSuspicion.objects.count()}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Quiz_App.stats import check, rebuild
+
+
+class Command(BaseCommand):
+    help = "Verify the stored score statistics against the graded attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Rebuild the statistics if any are wrong.")
+
+    def handle(self, *args, **options):
+        problems = check()
+        if not problems:
+            self.stdout.write("Score statistics are consistent.")
+            return
+        for kind, object_id in problems:
+            self.stdout.write(f"Out of date: {kind} {object_id}")
+        if options['fix']:
+            rebuild()
+            self.stdout.write("Rebuilt score statistics.")
+        else:
+            raise CommandError(f"{len(problems)} statistics rows are out of date; rerun with --fix.")
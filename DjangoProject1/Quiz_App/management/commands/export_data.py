@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Quiz_App.exports import FORMATS, gradebook_rows, roster_rows, term_rows
+from Quiz_App.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Export a gradebook, a roster or the whole term's enrollments as CSV or XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['gradebook', 'roster', 'term'])
+        parser.add_argument('--classroom', help="Class code (gradebook and roster exports).")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="File to write; defaults to stdout.")
+
+    def handle(self, *args, **options):
+        if options['kind'] == 'term':
+            rows = term_rows()
+        else:
+            if not options['classroom']:
+                raise CommandError("--classroom is required for gradebook and roster exports.")
+            try:
+                classroom = Classroom.objects.get(class_code=options['classroom'].upper())
+            except Classroom.DoesNotExist:
+                raise CommandError(f"No classroom with code {options['classroom']}.")
+            rows = (gradebook_rows if options['kind'] == 'gradebook' else roster_rows)(classroom)
+
+        writer, _ = FORMATS[options['format']]
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in writer(rows):
+                output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from Quiz_App import instrumentation
+
+
+class Command(BaseCommand):
+    help = "Show the views that take the most total time, from the workers' instrumentation snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--max-age', type=int, default=3600,
+                            help="Ignore snapshots older than this many seconds (stopped workers).")
+        parser.add_argument('--slow', action='store_true', help="Also list the slow requests and their SQL.")
+        parser.add_argument('--reset', action='store_true', help="Delete the snapshots and start over.")
+
+    def handle(self, *args, **options):
+        directory = instrumentation.snapshot_dir()
+        if options['reset']:
+            removed = 0
+            if directory and os.path.isdir(directory):
+                for filename in os.listdir(directory):
+                    if filename.endswith('.json'):
+                        os.remove(os.path.join(directory, filename))
+                        removed += 1
+            self.stdout.write(f"Removed {removed} snapshots.")
+            return
+
+        rows, slow = instrumentation.collect(max_age=options['max_age'])
+        if not rows:
+            self.stdout.write(f"No requests recorded yet in {directory}.")
+            return
+        self.stdout.write(f"{'view':<28} {'count':>7} {'5xx':>4} {'total s':>8} {'p50 ms':>7} {'p95 ms':>7} "
+                          f"{'p99 ms':>7} {'queries':>7} {'db ms':>7} {'tpl ms':>7}")
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f"{row['view'][:28]:<28} {row['count']:>7} {row['errors']:>4} {row['total_ms'] / 1000:>8.1f} "
+                f"{row['p50_ms']:>7.1f} {row['p95_ms']:>7.1f} {row['p99_ms']:>7.1f} {row['queries']:>7.1f} "
+                f"{row['db_ms']:>7.1f} {row['template_ms']:>7.1f}")
+        if options['slow']:
+            for entry in slow:
+                self.stdout.write(f"\n{entry['method']} {entry['path']} ({entry['view']}) {entry['status']}: "
+                                  f"{entry['ms']:.0f} ms, {entry['queries']} queries, {entry['db_ms']:.0f} ms in SQL")
+                for sql, ms in entry['sql']:
+                    self.stdout.write(f"  {ms:8.2f} ms  {sql}")
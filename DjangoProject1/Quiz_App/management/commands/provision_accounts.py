@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Quiz_App.provisioning import PROVISION_CHUNK_SIZE, provision_accounts
+
+
+class Command(BaseCommand):
+    help = ("Create accounts from a CSV with username, email and role columns (optional: first_name, last_name, "
+            "password). Existing usernames are skipped, so rerunning after a failure resumes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--workers', type=int, help="Hashing processes; defaults to one per core.")
+        parser.add_argument('--chunk-size', type=int, default=PROVISION_CHUNK_SIZE,
+                            help="Accounts hashed and inserted per transaction.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(report):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{report['rows']} rows: {report['created']} created, {report['existing']} existing, "
+                              f"{len(report['problems'])} problems ({report['created'] / elapsed:.1f} accounts/s)")
+
+        try:
+            with open(options['csv_file'], encoding='utf-8-sig', newline='') as accounts:
+                report = provision_accounts(accounts, workers=options['workers'],
+                                            chunk_size=options['chunk_size'], progress=progress)
+        except (OSError, UnicodeDecodeError, ValueError) as error:
+            raise CommandError(str(error))
+        for problem in report['problems']:
+            self.stdout.write(f"row {problem['row']} ({problem['value']}): {problem['error']}")
+        self.stdout.write(f"Created {report['created']} accounts in {time.perf_counter() - start:.1f} s.")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Quiz_App.sessions import PURGE_CHUNK_SIZE, SessionStore
+
+
+class Command(BaseCommand):
+    # Deferred sessions live in the web workers, which flush them themselves
+    help = "Delete expired sessions from the database in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PURGE_CHUNK_SIZE,
+                            help="Rows deleted per DELETE statement.")
+
+    def handle(self, *args, **options):
+        deleted = SessionStore.clear_expired(chunk_size=options['chunk_size'])
+        self.stdout.write(f"Deleted {deleted} expired sessions.")
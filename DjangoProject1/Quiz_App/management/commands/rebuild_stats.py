@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Quiz_App.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute all quiz and classroom score statistics from the graded attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Attempts read per round trip.")
+
+    def handle(self, *args, **options):
+        quizzes, classrooms = rebuild(options['batch_size'])
+        self.stdout.write(f"Rebuilt statistics for {quizzes} quizzes and {classrooms} classrooms.")
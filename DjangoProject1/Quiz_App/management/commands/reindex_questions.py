@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Quiz_App.search import REINDEX_BATCH_SIZE, reindex
+
+
+class Command(BaseCommand):
+    help = "Rebuild the question bank full-text index from the Question table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REINDEX_BATCH_SIZE,
+                            help="Questions indexed per transaction.")
+
+    def handle(self, *args, **options):
+        indexed = reindex(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} questions."))
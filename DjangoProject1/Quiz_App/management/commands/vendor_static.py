@@ -0,0 +1,33 @@
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Quiz_App.assets import VENDOR_FILES, strip_source_maps
+
+
+class Command(BaseCommand):
+    help = "Download the pinned third-party static files into static/vendor/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Download files that are already present again.")
+
+    def handle(self, *args, **options):
+        root = settings.BASE_DIR / 'static'
+        for name, url in VENDOR_FILES.items():
+            target = root / name
+            if target.exists() and not options['force']:
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    data = response.read()
+            except OSError as exc:
+                raise CommandError(f"Could not download {url}: {exc}")
+            if name.endswith(('.css', '.js')):
+                data = strip_source_maps(data.decode('utf-8')).encode('utf-8')
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            self.stdout.write(f"{name} ({len(data)} bytes)")
+        self.stdout.write(self.style.SUCCESS(
+            "Vendor files are up to date; commit them and run collectstatic."))
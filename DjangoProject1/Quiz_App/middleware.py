@@ -1,17 +1,132 @@
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# URL names anonymous users may open. Extend with LOGIN_EXEMPT_URL_NAMES.
+PUBLIC_URL_NAMES = ('login', 'signup')
+
+# Path prefixes that skip the middleware entirely: no session or user is
+# loaded for them. Extend with LOGIN_EXEMPT_PATH_PREFIXES.
+EXEMPT_PATH_PREFIXES = ('/admin/login/', '/health/')
+
 
 class LoginRequiredMiddleware:
+    # Runs natively under ASGI too, so async views don't pay for a thread hop
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Resolve everything once at startup instead of on every request
+        names = PUBLIC_URL_NAMES + tuple(getattr(settings, 'LOGIN_EXEMPT_URL_NAMES', ()))
+        self.login_path = reverse('login')
+        self.landing_path = reverse('landing')
+        self.public_paths = frozenset(reverse(name) for name in names)
+        prefixes = EXEMPT_PATH_PREFIXES + tuple(getattr(settings, 'LOGIN_EXEMPT_PATH_PREFIXES', ()))
+        if settings.STATIC_URL:
+            prefixes += (settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL,)
+        # str.startswith() takes a tuple and checks every prefix in C
+        self.exempt_prefixes = tuple(sorted(set(prefixes)))
+
+    def check(self, request, user):
+        # Returns a redirect, or None to let the request through
+        if user.is_authenticated:
+            if request.path == self.login_path and request.session.get('has_logged_in'):
+                return redirect(self.landing_path)
+        elif request.path not in self.public_paths:
+            return redirect(self.login_path)
+        return None
 
     def __call__(self, request):
-        if request.user.is_authenticated:
-            if request.path == reverse('login') and request.session.get('has_logged_in'):
-                return redirect('landing')
-        else:
-            if request.path not in [reverse('login'), reverse('signup')]:
-                return redirect('login')
-
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith(self.exempt_prefixes):
+            return self.get_response(request)
+        return self.check(request, request.user) or self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path.startswith(self.exempt_prefixes):
+            return await self.get_response(request)
+        user = await request.auser()
+        if user.is_authenticated and request.path == self.login_path:
+            # Only the login page reads the session here; load it off the loop
+            return await sync_to_async(self.check)(request, user) or await self.get_response(request)
+        return self.check(request, user) or await self.get_response(request)
+
+
+# Pre-compressed variants written by collectstatic, best first
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+
+
+class StaticAssetMiddleware:
+    """Serve collected static files without a separate web server.
+
+    Files are indexed once at startup. Content-hashed names from the
+    manifest are cached for a year; a .br or .gz variant is sent when the
+    client accepts it. Only active with DEBUG off and a collected STATIC_ROOT.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        root = settings.STATIC_ROOT
+        if settings.DEBUG or not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                self.files[self.prefix + os.path.relpath(path, root).replace(os.sep, '/')] = path
+        hashed_names = getattr(staticfiles_storage, 'hashed_files', {}).values()
+        self.immutable = frozenset(self.prefix + name for name in hashed_names)
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        path = self.files.get(request.path)
+        if path is None:
+            return None
+        served, encoding = path, None
+        accepted = request.headers.get('Accept-Encoding', '')
+        for name, suffix in STATIC_ENCODINGS:
+            if name in accepted and request.path + suffix in self.files:
+                served, encoding = self.files[request.path + suffix], name
+                break
+
+        immutable = request.path in self.immutable
+        mtime = os.stat(served).st_mtime
+        if not immutable and not was_modified_since(request.headers.get('If-Modified-Since'), mtime):
+            return HttpResponseNotModified()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = FileResponse(open(served, 'rb'), content_type=content_type, filename=os.path.basename(path))
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(mtime)
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL
         return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
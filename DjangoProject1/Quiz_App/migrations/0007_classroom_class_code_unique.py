@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def normalize_class_codes(apps, schema_editor):
+    # Existing codes were mixed-case and never checked for collisions. Store
+    # them upper-case and give any duplicate or empty code a fresh one so the
+    # unique index can be created.
+    from Quiz_App.class_codes import generate_class_code
+
+    Classroom = apps.get_model('Quiz_App', 'Classroom')
+    classrooms = list(Classroom.objects.order_by('id').only('id', 'class_code'))
+    existing = {(c.class_code or '').strip().upper() for c in classrooms}
+    seen = set()
+    for classroom in classrooms:
+        code = (classroom.class_code or '').strip().upper()
+        if not code or code in seen:
+            code = generate_class_code()
+            while code in existing or code in seen:
+                code = generate_class_code()
+        seen.add(code)
+        if code != classroom.class_code:
+            Classroom.objects.filter(pk=classroom.pk).update(class_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0006_classroom_students'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_class_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='classroom',
+            name='class_code',
+            field=models.CharField(max_length=7, unique=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_enrollments(apps, schema_editor):
+    # Move the rows of the implicit classroom/student table into Enrollment
+    Classroom = apps.get_model('Quiz_App', 'Classroom')
+    Enrollment = apps.get_model('Quiz_App', 'Enrollment')
+    Through = Classroom.students.through
+    Enrollment.objects.bulk_create(
+        [Enrollment(classroom_id=row.classroom_id, student_id=row.user_id)
+         for row in Through.objects.all().iterator()],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0007_classroom_class_code_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('dropped', 'Dropped')], default='active', max_length=10)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='Quiz_App.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'status'], name='enrollment_student_status')],
+                'constraints': [models.UniqueConstraint(fields=('classroom', 'student'), name='unique_enrollment')],
+            },
+        ),
+        migrations.RunPython(copy_enrollments, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='classroom',
+            name='students',
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='classrooms', through='Quiz_App.Enrollment', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+# auth_user belongs to django.contrib.auth, so the case-insensitive lookup
+# indexes used by EmailOrUsernameModelBackend are created with plain SQL. They
+# must run after the last auth migration: on SQLite those rebuild auth_user
+# and would drop any index they don't know about.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0008_enrollment'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS quiz_auth_user_username_lower ON auth_user (LOWER(username));',
+            'DROP INDEX IF EXISTS quiz_auth_user_username_lower;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS quiz_auth_user_email_lower ON auth_user (LOWER(email));',
+            'DROP INDEX IF EXISTS quiz_auth_user_email_lower;',
+        ),
+    ]
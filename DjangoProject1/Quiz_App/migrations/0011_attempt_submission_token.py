@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0010_quiz_question_choice_attempt_response'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='submission_token',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
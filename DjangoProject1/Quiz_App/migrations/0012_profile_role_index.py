@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0011_attempt_submission_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='role',
+            field=models.CharField(blank=True, choices=[('student', 'Student'), ('teacher', 'Teacher')], db_index=True, max_length=10, null=True),
+        ),
+    ]
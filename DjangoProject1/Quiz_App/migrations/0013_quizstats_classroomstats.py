@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0012_profile_role_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassroomStats',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('top', models.JSONField(default=list)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='Quiz_App.classroom')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('top', models.JSONField(default=list)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='Quiz_App.quiz')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
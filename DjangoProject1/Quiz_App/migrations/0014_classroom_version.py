@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0013_quizstats_classroomstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+# Full-text index over question text (see Quiz_App/search.py). The rowid is
+# the question id; subject, teacher and classroom filters join back to the
+# regular tables, so moving a classroom never touches the index. Existing
+# questions are indexed here; later changes arrive through signals.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0014_classroom_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS quiz_question_fts USING fts5("
+            "text, tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3 4');",
+            'DROP TABLE IF EXISTS quiz_question_fts;',
+        ),
+        migrations.RunSQL(
+            'INSERT INTO quiz_question_fts (rowid, text) SELECT id, text FROM "Quiz_App_question";',
+            migrations.RunSQL.noop,
+        ),
+    ]
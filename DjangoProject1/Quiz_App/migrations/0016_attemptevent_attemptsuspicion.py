@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0015_question_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptSuspicion',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='suspicion', serialize=False, to='Quiz_App.attempt')),
+                ('tab_hidden', models.PositiveIntegerField(default=0)),
+                ('focus_lost', models.PositiveIntegerField(default=0)),
+                ('copies', models.PositiveIntegerField(default=0)),
+                ('pastes', models.PositiveIntegerField(default=0)),
+                ('fullscreen_exits', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('first_event_at', models.DateTimeField()),
+                ('last_event_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttemptEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Tab hidden'), (2, 'Focus lost'), (3, 'Copy'), (4, 'Paste'), (5, 'Fullscreen exit')])),
+                ('occurred_at', models.DateTimeField()),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='Quiz_App.attempt')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['attempt', 'occurred_at'], name='event_attempt_time')],
+            },
+        ),
+    ]
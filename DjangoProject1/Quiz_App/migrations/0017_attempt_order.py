@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0016_attemptevent_attemptsuspicion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='choice_order',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='question_order',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
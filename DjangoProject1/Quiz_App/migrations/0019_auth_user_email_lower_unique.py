@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Signup relies on the database for uniqueness (see SignupForm.save), so
+# emails get a case-insensitive unique index. Blank emails (accounts made
+# with createsuperuser or by scripts) stay allowed. 0009's plain LOWER(email)
+# index is kept: the login lookup doesn't repeat the WHERE clause, so SQLite
+# can't use this partial index for it.
+
+
+def check_duplicate_emails(apps, schema_editor):
+    # Merging accounts needs a person to decide; say which ones instead of
+    # failing on the index with a bare IntegrityError
+    User = apps.get_model('auth', 'User')
+    duplicates = (User.objects.exclude(email='').annotate(email_lower=Lower('email'))
+                  .values('email_lower').annotate(count=Count('id')).filter(count__gt=1)
+                  .values_list('email_lower', flat=True))
+    problems = []
+    for email in duplicates:
+        users = User.objects.filter(email__iexact=email).order_by('id').values_list('id', 'username')
+        problems.append(f"  {email}: " + ', '.join(f"{username} (id {pk})" for pk, username in users))
+    if problems:
+        raise RuntimeError(
+            "These accounts share an email address (ignoring case). Change or blank the "
+            "extra ones, then migrate again:\n" + '\n'.join(problems))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz_App', '0018_attempt_deadline'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX IF NOT EXISTS quiz_auth_user_email_lower_unique "
+            "ON auth_user (LOWER(email)) WHERE email != '';",
+            'DROP INDEX IF EXISTS quiz_auth_user_email_lower_unique;',
+        ),
+    ]
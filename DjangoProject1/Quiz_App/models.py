@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -8,7 +10,7 @@ class Profile(models.Model):
     ]
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
-    role = models.CharField(max_length=10, choices=ROLE_CHOICES, blank=True, null=True)
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, blank=True, null=True, db_index=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
@@ -21,8 +23,235 @@ class Classroom(models.Model):
     subject = models.CharField(max_length=100, blank=True, null=True)
     room = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    class_code = models.CharField(max_length=7, null=False, blank=True)  # Class code for joining
-    students = models.ManyToManyField(User, related_name='classrooms', blank=True)  # Add this line
+    class_code = models.CharField(max_length=7, unique=True)  # Class code for joining, stored upper-case
+    students = models.ManyToManyField(User, through='Enrollment', related_name='classrooms', blank=True)
+    # Bumped whenever the classroom, its roster or its quizzes change; the
+    # API derives ETags from it (see touch_classrooms and signals.py)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
-        return f"{self.class_name} - {self.section}"
\ No newline at end of file
+        return f"{self.class_name} - {self.section}"
+
+
+def touch_classrooms(classroom_ids):
+    # One UPDATE for any number of classrooms; runs in the caller's transaction
+    Classroom.objects.filter(pk__in=classroom_ids).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class Enrollment(models.Model):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('dropped', 'Dropped'),
+    ]
+
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='enrollments')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
+    joined_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+
+    class Meta:
+        constraints = [
+            # One row per student per class; also the index used for membership checks
+            models.UniqueConstraint(fields=['classroom', 'student'], name='unique_enrollment'),
+        ]
+        indexes = [
+            # A student's class list on the landing page
+            models.Index(fields=['student', 'status'], name='enrollment_student_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} in {self.classroom.class_name} ({self.status})"
+
+
+class Quiz(models.Model):
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='quizzes')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    due_at = models.DateTimeField(blank=True, null=True)
+    time_limit_minutes = models.PositiveIntegerField(blank=True, null=True)
+    is_published = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # A classroom's quiz list, newest first
+            models.Index(fields=['classroom', '-created_at'], name='quiz_classroom_created'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Question(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
+    text = models.TextField()
+    order = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        ordering = ['order', 'id']
+        indexes = [
+            models.Index(fields=['quiz', 'order'], name='question_quiz_order'),
+        ]
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class Choice(models.Model):
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='choices')
+    text = models.CharField(max_length=500)
+    is_correct = models.BooleanField(default=False)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order', 'id']
+        indexes = [
+            # Builds the answer key of a quiz without touching wrong choices
+            models.Index(fields=['question', 'is_correct'], name='choice_question_correct'),
+        ]
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class Attempt(models.Model):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
+    number = models.PositiveIntegerField(default=1)  # 1 for the first attempt, 2 for a retake, ...
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(blank=True, null=True)
+    # When a timed attempt is auto-submitted (Quiz_App.deadlines); null if untimed
+    deadline = models.DateTimeField(blank=True, null=True)
+    score = models.FloatField(blank=True, null=True)
+    max_score = models.FloatField(blank=True, null=True)
+    # Client-generated token of the submission that closed this attempt;
+    # unique, so a retried submission can never be counted twice.
+    submission_token = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    # What this student sees, fixed when the attempt starts (Quiz_App.randomization):
+    # packed int64 (question id, choice count) pairs in display order, and the
+    # choice ids of those questions in display order.
+    question_order = models.BinaryField(blank=True, null=True)
+    choice_order = models.BinaryField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'student', 'number'], name='unique_attempt_number'),
+        ]
+        indexes = [
+            # Submitted attempts of a quiz, which is what grading reads
+            models.Index(fields=['quiz', 'submitted_at'], name='attempt_quiz_submitted'),
+            # Open timed attempts, which the deadline scheduler reloads on startup
+            models.Index(fields=['deadline'], condition=models.Q(submitted_at__isnull=True),
+                         name='attempt_open_deadline'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.quiz.title} #{self.number}"
+
+
+class Response(models.Model):
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='responses')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='responses')
+    choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, blank=True, null=True)  # null when left blank
+    answered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='unique_response'),
+        ]
+
+    def __str__(self):
+        return f"{self.attempt} - Q{self.question_id}"
+
+
+class ScoreStats(models.Model):
+    # Running aggregates of graded attempt scores, as percentages of the
+    # quiz's max score. Kept up to date by Quiz_App.stats on every grading.
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)  # sum of squares, for the variance
+    histogram = models.JSONField(default=list)  # attempts per 10% bucket
+    top = models.JSONField(default=list)  # best [percent, attempt id, student id], highest first
+    completed = models.PositiveIntegerField(default=0)  # first attempts graded
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        if not self.count:
+            return None
+        variance = max(self.total_sq / self.count - (self.total / self.count) ** 2, 0.0)
+        return variance ** 0.5
+
+
+class QuizStats(ScoreStats):
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    def __str__(self):
+        return f"Stats for {self.quiz_id}"
+
+
+class ClassroomStats(ScoreStats):
+    classroom = models.OneToOneField(Classroom, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+
+    def __str__(self):
+        return f"Stats for {self.classroom_id}"
+
+
+class AttemptEvent(models.Model):
+    # Raw anti-cheating telemetry from the browser, appended in bulk by
+    # Quiz_App.telemetry. Kinds are small integers to keep beacons compact.
+    TAB_HIDDEN, FOCUS_LOST, COPY, PASTE, FULLSCREEN_EXIT = range(1, 6)
+    KIND_CHOICES = [
+        (TAB_HIDDEN, 'Tab hidden'),
+        (FOCUS_LOST, 'Focus lost'),
+        (COPY, 'Copy'),
+        (PASTE, 'Paste'),
+        (FULLSCREEN_EXIT, 'Fullscreen exit'),
+    ]
+
+    attempt = models.ForeignKey(Attempt, on_delete=models.CASCADE, related_name='events')
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    occurred_at = models.DateTimeField()  # client clock, never later than when it arrived
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['attempt', 'occurred_at'], name='event_attempt_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.attempt_id} - {self.get_kind_display()}"
+
+
+class AttemptSuspicion(models.Model):
+    # Per-attempt event counters, rolled up as events are flushed, so review
+    # screens read one row per attempt instead of the raw events.
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, primary_key=True, related_name='suspicion')
+    tab_hidden = models.PositiveIntegerField(default=0)
+    focus_lost = models.PositiveIntegerField(default=0)
+    copies = models.PositiveIntegerField(default=0)
+    pastes = models.PositiveIntegerField(default=0)
+    fullscreen_exits = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    first_event_at = models.DateTimeField()
+    last_event_at = models.DateTimeField()
+
+    # AttemptEvent kind -> counter field
+    COUNTERS = {
+        AttemptEvent.TAB_HIDDEN: 'tab_hidden',
+        AttemptEvent.FOCUS_LOST: 'focus_lost',
+        AttemptEvent.COPY: 'copies',
+        AttemptEvent.PASTE: 'pastes',
+        AttemptEvent.FULLSCREEN_EXIT: 'fullscreen_exits',
+    }
+
+    def __str__(self):
+        return f"Suspicion for {self.attempt_id}"
@@ -0,0 +1,145 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .backends import forget_unknown_login
+from .hashing import PasswordHashPool
+from .models import Profile
+
+PROVISION_CHUNK_SIZE = 500
+PROVISION_ATTEMPTS = 3  # per chunk, when signups take its names while it is written
+ACCOUNT_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'role', 'password')
+ROLES = dict(Profile.ROLE_CHOICES)
+
+
+def _account_rows(text_stream):
+    # Yields (row number, row) with the known columns, stripped; the header names them
+    reader = csv.DictReader(text_stream)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = {'username', 'email', 'role'} - set(reader.fieldnames)
+    if missing:
+        raise ValueError(f"The CSV is missing the {', '.join(sorted(missing))} column(s).")
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, {column: (row.get(column) or '').strip() for column in ACCOUNT_COLUMNS}
+
+
+def _row_error(row):
+    try:
+        User.username_validator(row['username'])
+        validate_email(row['email'])
+    except ValidationError as error:
+        return error.messages[0]
+    if len(row['username']) > 150 or len(row['first_name']) > 150 or len(row['last_name']) > 150:
+        return 'Names are limited to 150 characters.'
+    if row['role'].lower() not in ROLES:
+        return f"Role must be one of: {', '.join(ROLES)}."
+    return None
+
+
+def _taken(rows):
+    # Lower-cased usernames and emails of these rows that are in use already
+    usernames = {row['username'].lower() for _, row in rows}
+    emails = {row['email'].lower() for _, row in rows}
+    existing = (User.objects
+                .annotate(username_lower=Lower('username'), email_lower=Lower('email'))
+                .filter(Q(username_lower__in=usernames) | Q(email_lower__in=emails))
+                .values_list('username_lower', 'email_lower'))
+    taken_usernames, taken_emails = set(), set()
+    for username, email in existing:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def _provision_chunk(chunk, pool, seen, report):
+    new = []
+    for row_number, row in chunk:
+        username, email = row['username'].lower(), row['email'].lower()
+        if username in seen or email in seen:
+            report['problems'].append({'row': row_number, 'value': row['username'], 'error': 'Listed more than once.'})
+            continue
+        seen.update((username, email))
+        new.append((row_number, row))
+
+    passwords = {}
+    for attempt in range(PROVISION_ATTEMPTS):
+        taken_usernames, taken_emails = _taken(new)
+        available = []
+        for row_number, row in new:
+            if row['username'].lower() in taken_usernames:
+                report['existing'] += 1  # created by an earlier run, or signed up already
+            elif row['email'].lower() in taken_emails:
+                report['problems'].append({'row': row_number, 'value': row['username'],
+                                           'error': 'Email address already in use.'})
+            else:
+                available.append((row_number, row))
+        new = available
+        if not new:
+            return
+
+        # The expensive part, on every core; nothing is written until it's done
+        unhashed = [row_number for row_number, _ in new if row_number not in passwords]
+        rows = dict(new)
+        passwords.update(zip(unhashed, pool.hash([rows[row_number]['password'] for row_number in unhashed])))
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=row['username'], email=row['email'], first_name=row['first_name'],
+                         last_name=row['last_name'], password=passwords[row_number])
+                    for row_number, row in new
+                ])
+                Profile.objects.bulk_create([Profile(user=user, role=row['role'].lower())
+                                             for user, (_, row) in zip(users, new)])
+                # bulk_create() sends no post_save; see clear_unknown_login_cache
+                identifiers = [value for _, row in new for value in (row['username'], row['email'])]
+                transaction.on_commit(lambda: forget_unknown_login(*identifiers))
+        except IntegrityError:
+            continue  # someone signed up with one of these names meanwhile; check again without them
+        report['created'] += len(new)
+        return
+    for row_number, row in new:
+        report['problems'].append({'row': row_number, 'value': row['username'],
+                                   'error': 'Could not be created; run the import again.'})
+
+
+def provision_accounts(text_stream, workers=None, chunk_size=PROVISION_CHUNK_SIZE, progress=None):
+    """Create the accounts listed in a CSV of users.
+
+    The header names the columns: username, email and role (student or
+    teacher) are required; first_name, last_name and password are optional,
+    and a blank password leaves the account unusable until it is reset.
+    Passwords are hashed across ``workers`` processes (every core by
+    default) and each chunk of users and profiles is inserted in its own
+    transaction. Accounts whose username already exists are skipped, so
+    re-running the same file after a failure resumes where it stopped.
+    ``progress`` is called with the report after every chunk.
+    """
+    report = {'rows': 0, 'created': 0, 'existing': 0, 'problems': []}
+    seen = set()
+    chunk = []
+    with PasswordHashPool(workers) as pool:
+        for row_number, row in _account_rows(text_stream):
+            report['rows'] += 1
+            error = _row_error(row)
+            if error:
+                report['problems'].append({'row': row_number, 'value': row['username'], 'error': error})
+                continue
+            chunk.append((row_number, row))
+            if len(chunk) >= chunk_size:
+                _provision_chunk(chunk, pool, seen, report)
+                chunk = []
+                if progress:
+                    progress(report)
+        if chunk:
+            _provision_chunk(chunk, pool, seen, report)
+            if progress:
+                progress(report)
+    report['problems'].sort(key=lambda problem: problem['row'])
+    return report
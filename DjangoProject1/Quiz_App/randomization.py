@@ -0,0 +1,123 @@
+"""Per-student question and choice order.
+
+Every attempt gets its own order, drawn from a generator seeded by (quiz,
+student, attempt number), so the same attempt always shuffles the same way.
+The order is computed once, when the attempt starts, and packed onto the
+attempt as two int64 arrays (see Attempt.question_order); reloading or
+resuming the quiz just reads them back with np.frombuffer.
+
+The quiz page may submit answers as display positions instead of choice
+ids; unpermute() maps a whole batch of them back to choice ids at once.
+"""
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .deadlines import attempt_deadline, deadline_scheduler
+from .models import Attempt, Question
+
+ORDER_DTYPE = np.dtype('<i8')
+BLANK = -1  # position of an unanswered question
+
+
+def attempt_rng(quiz_id, student_id, number):
+    return np.random.default_rng([quiz_id, student_id, number])
+
+
+def shuffle(quiz_id, student_id, number):
+    """Return the packed (question_order, choice_order) of an attempt."""
+    rows = np.array(
+        [(question_id, choice_id or 0) for question_id, choice_id in
+         Question.objects.filter(quiz_id=quiz_id).order_by('order', 'id', 'choices__order', 'choices__id')
+         .values_list('id', 'choices__id')],
+        dtype=ORDER_DTYPE,
+    ).reshape(-1, 2)
+    if not len(rows):
+        return b'', b''
+    # Rows come grouped by question; a question without choices is one row with choice 0
+    starts = np.flatnonzero(np.diff(rows[:, 0], prepend=-1))
+    question_ids = rows[starts, 0]
+    counts = np.add.reduceat(rows[:, 1] != 0, starts).astype(ORDER_DTYPE)
+
+    rng = attempt_rng(quiz_id, student_id, number)
+    display = rng.permutation(len(question_ids))
+    rank = np.empty_like(display)
+    rank[display] = np.arange(len(display))
+    # Sort the choices by their question's display rank, then randomly within each question
+    group = np.repeat(np.arange(len(starts)), np.diff(starts, append=len(rows)))
+    choices = rows[np.lexsort((rng.random(len(rows)), rank[group])), 1]
+
+    question_order = np.column_stack([question_ids[display], counts[display]])
+    return question_order.astype(ORDER_DTYPE).tobytes(), choices[choices != 0].tobytes()
+
+
+def display_order(attempt):
+    """Return [(question id, [choice ids])] in the order the student sees them."""
+    questions = np.frombuffer(attempt.question_order or b'', ORDER_DTYPE).reshape(-1, 2)
+    choices = np.frombuffer(attempt.choice_order or b'', ORDER_DTYPE)
+    groups = np.split(choices, np.cumsum(questions[:, 1])[:-1]) if len(questions) else []
+    return [(question_id, group.tolist()) for question_id, group in zip(questions[:, 0].tolist(), groups)]
+
+
+def start_attempt(quiz, student):
+    """Resume the student's open attempt at a quiz, or start the next one.
+
+    A timed quiz's new attempt gets its deadline and is handed to the
+    deadline scheduler.
+    """
+    attempts = Attempt.objects.filter(quiz=quiz, student=student)
+    current = attempts.filter(submitted_at__isnull=True).order_by('-number').first()
+    if current is not None:
+        return current
+    number = (attempts.aggregate(last=Max('number'))['last'] or 0) + 1
+    student_id = getattr(student, 'pk', student)
+    question_order, choice_order = shuffle(quiz.pk, student_id, number)
+    try:
+        with transaction.atomic():
+            attempt = Attempt.objects.create(
+                quiz_id=quiz.pk, student_id=student_id, number=number,
+                deadline=attempt_deadline(quiz, timezone.now()),
+                question_order=question_order, choice_order=choice_order)
+            transaction.on_commit(lambda: deadline_scheduler.schedule(attempt.pk, attempt.deadline))
+            return attempt
+    except IntegrityError:
+        # Started at the same moment in another tab; both get the same attempt
+        return attempts.get(number=number)
+
+
+def unpermute(layouts, positions):
+    """Map display positions back to choice ids for a batch of attempts.
+
+    ``layouts`` holds the (question_order, choice_order) of each attempt and
+    ``positions`` the chosen position for each displayed question, BLANK
+    (or out of range) when unanswered. Returns one {question id: choice id
+    or None} dict per attempt.
+    """
+    questions = [np.frombuffer(order or b'', ORDER_DTYPE).reshape(-1, 2) for order, _ in layouts]
+    sizes = [len(q) for q in questions]
+    chosen = np.full(sum(sizes), BLANK, dtype=ORDER_DTYPE)
+    start = 0
+    for size, picked in zip(sizes, positions):
+        picked = np.asarray(picked, dtype=ORDER_DTYPE)[:size]
+        chosen[start:start + len(picked)] = picked
+        start += size
+
+    questions = np.concatenate(questions) if questions else np.empty((0, 2), ORDER_DTYPE)
+    counts = questions[:, 1]
+    choices = np.concatenate([np.frombuffer(order or b'', ORDER_DTYPE) for _, order in layouts]
+                             + [np.empty(0, ORDER_DTYPE)])
+    # The choice arrays are concatenated in the same order as the questions,
+    # so one running offset per question indexes into all of them at once
+    valid = (chosen >= 0) & (chosen < counts)
+    index = np.cumsum(counts) - counts + np.where(valid, chosen, 0)
+    choice_ids = np.zeros(len(chosen), dtype=ORDER_DTYPE)
+    choice_ids[valid] = choices[index[valid]]
+
+    question_ids, choice_ids = questions[:, 0].tolist(), choice_ids.tolist()
+    answers, start = [], 0
+    for size in sizes:
+        answers.append({question_id: choice_id or None for question_id, choice_id in
+                        zip(question_ids[start:start + size], choice_ids[start:start + size])})
+        start += size
+    return answers
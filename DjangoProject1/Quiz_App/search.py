@@ -0,0 +1,135 @@
+"""Question bank search backed by an SQLite FTS5 index.
+
+``quiz_question_fts`` (migration 0015) holds one row per question, keyed by
+the question id. signals.py keeps it in step with Question saves and
+deletes; bulk inserts bypass signals, so call ``index_questions`` for them or
+run ``manage.py reindex_questions``.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Question, Quiz
+
+FTS_TABLE = 'quiz_question_fts'
+REINDEX_BATCH_SIZE = 5000
+SEARCH_LIMIT = 20
+# Only the newest matches are ranked: bm25 over every question containing a
+# common word costs 100+ ms, over a few hundred candidates a few ms.
+SEARCH_CANDIDATES = 500
+
+# snippet() marks matches with these private-use characters; the text is
+# escaped first and only then are they turned into <mark> tags
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+# Words only: the user's input never reaches FTS5's query syntax unquoted
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def match_expression(query):
+    # 'cell photosyn' -> '"cell" AND "photosyn"*': only the word being typed
+    # is prefix-matched, and only once it has two letters
+    terms = TERM_RE.findall(query)
+    quoted = [f'"{term}"' for term in terms]
+    if terms and len(terms[-1]) >= 2:
+        quoted[-1] += '*'
+    return ' AND '.join(quoted)
+
+
+def highlight(snippet):
+    # Question text is whatever a teacher typed; only the <mark> tags are HTML
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def index_questions(questions):
+    """Add or replace the index rows of (id, text) pairs."""
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk, _ in questions])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)', questions)
+
+
+def unindex_questions(question_ids):
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in question_ids])
+
+
+def reindex(batch_size=REINDEX_BATCH_SIZE):
+    """Rebuild the whole index, one transaction per batch of questions."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed, last_id = 0, 0
+    while True:
+        batch = list(Question.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'text')[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)', batch)
+        indexed += len(batch)
+        last_id = batch[-1][0]
+    with connection.cursor() as cursor:
+        # Merge the b-tree segments left by the batches into one
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def search_questions(query, subject=None, teacher=None, classroom=None, viewer=None, limit=SEARCH_LIMIT):
+    """Return the best matching questions, most relevant first.
+
+    Each result is a dict with the question id and text, a snippet (escaped
+    HTML with the matches in <mark> tags), and its quiz and classroom. ``subject`` is matched
+    case-insensitively; ``teacher`` and ``classroom`` are ids or instances.
+    With a ``viewer``, only their own quizzes and published ones are searched.
+    Relevance is judged among the newest SEARCH_CANDIDATES matches, so very
+    broad queries favour recent questions.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    sql = [f"SELECT id FROM (SELECT {FTS_TABLE}.rowid AS id, rank FROM {FTS_TABLE}"]
+    params = []
+    if subject or teacher is not None or classroom is not None or viewer is not None:
+        # The filters become one quiz-id subquery, which SQLite builds once;
+        # each candidate then costs one primary-key probe of the question
+        # table instead of three joins
+        quizzes = Quiz.objects.all()
+        if subject:
+            quizzes = quizzes.filter(classroom__subject__iexact=subject)
+        if teacher is not None:
+            quizzes = quizzes.filter(classroom__teacher=teacher)
+        if classroom is not None:
+            quizzes = quizzes.filter(classroom=classroom)
+        if viewer is not None:
+            quizzes = quizzes.filter(Q(classroom__teacher=viewer) | Q(is_published=True))
+        quiz_sql, quiz_params = quizzes.values('pk').query.sql_with_params()
+        question = connection.ops.quote_name(Question._meta.db_table)
+        sql.append(f"JOIN {question} q ON q.id = {FTS_TABLE}.rowid AND q.quiz_id IN ({quiz_sql})")
+        params += quiz_params
+
+    # Pass 1: rank the newest SEARCH_CANDIDATES matches that pass the filters
+    sql.append(f"WHERE {FTS_TABLE} MATCH %s")
+    params.append(expression)
+    # rank is bm25(); lower is better
+    sql.append(f'ORDER BY {FTS_TABLE}.rowid DESC LIMIT %s) ORDER BY rank LIMIT %s')
+    params += [SEARCH_CANDIDATES, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+        # Pass 2: snippets for the page of results. A rowid IN (...) lookup
+        # re-runs the match once per row, so scan the id range instead.
+        cursor.execute(
+            f"SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, '…', 12) FROM {FTS_TABLE}"
+            f" WHERE {FTS_TABLE} MATCH %s AND rowid BETWEEN %s AND %s"
+            f" AND +rowid IN ({', '.join(['%s'] * len(ids))})",
+            [MARK_START, MARK_END, expression, min(ids), max(ids), *ids])
+        snippets = {pk: highlight(snippet) for pk, snippet in cursor.fetchall()}
+
+    details = Question.objects.filter(pk__in=ids).values_list(
+        'pk', 'text', 'quiz_id', 'quiz__title', 'quiz__classroom_id',
+        'quiz__classroom__class_name', 'quiz__classroom__subject')
+    rows = {pk: (pk, text, snippets.get(pk, escape(text)), *rest) for pk, text, *rest in details}
+    keys = ('id', 'text', 'snippet', 'quiz_id', 'quiz_title', 'classroom_id', 'class_name', 'subject')
+    return [dict(zip(keys, rows[pk])) for pk in ids if pk in rows]
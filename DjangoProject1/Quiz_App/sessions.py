@@ -0,0 +1,167 @@
+"""Cache-first session store with write-behind to the database.
+
+Sessions are read from and written to the ``SESSION_CACHE_ALIAS`` cache.
+Database writes are deferred and flushed in bulk, every
+``SESSION_WRITE_BEHIND_INTERVAL`` seconds or once
+``SESSION_WRITE_BEHIND_BATCH`` sessions are waiting, so logins and page
+views no longer take the SQLite write lock one row at a time. A save that
+doesn't change the session is skipped altogether.
+
+With more than one worker process, point the session cache at a shared
+backend (the file-based cache in settings.py) so every worker sees the
+sessions that have not been flushed yet. Deferred writes are per process,
+so a deleted session (a logout) leaves a tombstone in that shared cache;
+every worker checks it before serving or flushing its own deferred copy.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK_SIZE = 1000
+
+# session key -> (encoded data, expire date) of sessions not yet in the database
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def flush_pending():
+    """Write every deferred session to the database in one bulk upsert."""
+    global _last_flush
+    with _pending_lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    # Sessions deleted by another worker meanwhile must not come back
+    for key in deleted_sessions(batch):
+        del batch[key]
+    if not batch:
+        return 0
+    try:
+        with transaction.atomic():
+            Session.objects.bulk_create(
+                [Session(session_key=key, session_data=data, expire_date=expire_date)
+                 for key, (data, expire_date) in batch.items()],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['session_key'],
+                update_fields=['session_data', 'expire_date'],
+            )
+    except Exception:
+        # Put the batch back (newer writes win) and try again next time
+        with _pending_lock:
+            for key, value in batch.items():
+                _pending.setdefault(key, value)
+        logger.exception("Failed to flush %d sessions", len(batch))
+        return 0
+    return len(batch)
+
+
+def _tombstone_key(session_key):
+    return f'{SessionStore.cache_key_prefix}.deleted.{session_key}'
+
+
+def deleted_sessions(session_keys):
+    # The keys among these that some worker has deleted (see SessionStore.delete)
+    cache = caches[settings.SESSION_CACHE_ALIAS]
+    found = cache.get_many([_tombstone_key(key) for key in session_keys])
+    return [key for key in session_keys if _tombstone_key(key) in found]
+
+
+def _maybe_flush():
+    interval = getattr(settings, 'SESSION_WRITE_BEHIND_INTERVAL', 30)
+    batch = getattr(settings, 'SESSION_WRITE_BEHIND_BATCH', 500)
+    if len(_pending) >= batch or time.monotonic() - _last_flush >= interval:
+        flush_pending()
+
+
+atexit.register(flush_pending)
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'quiz_app.sessions'
+
+    def load(self):
+        pending = _pending.get(self._session_key) if self._session_key else None
+        if pending and deleted_sessions([self._session_key]):
+            with _pending_lock:
+                _pending.pop(self._session_key, None)
+            pending = None
+        if pending and pending[1] > timezone.now():
+            data = self.decode(pending[0])
+        else:
+            data = super().load()
+        self._loaded_data = dict(data)
+        return data
+
+    def exists(self, session_key):
+        return session_key in _pending or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if not must_create and data == getattr(self, '_loaded_data', None):
+            return  # nothing changed since the session was loaded
+
+        expiry_age = self.get_expiry_age()
+        if must_create:
+            # Session keys are 32 random characters; cache.add() is enough to
+            # catch the (practically impossible) collision without a DB insert.
+            if self.session_key in _pending or not self._cache.add(self.cache_key, data, expiry_age):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, expiry_age)
+        self._loaded_data = dict(data)
+
+        with _pending_lock:
+            _pending[self.session_key] = (self.encode(data), self.get_expiry_date())
+        _maybe_flush()
+
+    def delete(self, session_key=None):
+        key = session_key if session_key is not None else self.session_key
+        with _pending_lock:
+            _pending.pop(key, None)
+        if key is not None:
+            # Other workers may hold a deferred copy; no session outlives the cookie age
+            self._cache.set(_tombstone_key(key), True, settings.SESSION_COOKIE_AGE)
+        super().delete(session_key)
+
+    # The async API runs the same code in a thread
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    def clear_expired(cls, chunk_size=PURGE_CHUNK_SIZE):
+        # Delete expired rows a chunk at a time so the write lock is only ever
+        # held briefly, instead of one DELETE over the whole table.
+        deleted = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=timezone.now())
+                .values_list('session_key', flat=True)[:chunk_size]
+            )
+            if not keys:
+                return deleted
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
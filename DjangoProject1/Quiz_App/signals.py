@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .backends import forget_unknown_login
+from .card_cache import invalidate_class_lists, invalidate_classroom
+from .models import Classroom, Enrollment, Question, Quiz, touch_classrooms
+from .search import index_questions, unindex_questions
+
+
+@receiver(post_save, sender=User)
+def clear_unknown_login_cache(sender, instance, **kwargs):
+    # A new or renamed account must be able to log in straight away
+    forget_unknown_login(instance.username, instance.email)
+
+
+# Classroom cards are cached per user (card_cache.py). Invalidation waits for
+# the commit, so a request can't re-cache the old list under the new version.
+# The API's ETags come from Classroom.version, bumped in the same transaction.
+
+@receiver(pre_save, sender=Classroom)
+def bump_classroom_version(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.version += 1
+        instance.updated_at = timezone.now()
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def classroom_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_classroom(instance.pk, instance.teacher_id))
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    touch_classrooms([instance.classroom_id])
+    transaction.on_commit(lambda: invalidate_class_lists([instance.student_id]))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    touch_classrooms([instance.classroom_id])
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # classroom.students.add() and friends bulk insert without post_save
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        pk_set = set(instance.classrooms.values_list('pk', flat=True) if reverse
+                     else instance.enrollments.values_list('student_id', flat=True))
+    if reverse:
+        touch_classrooms(pk_set)
+        transaction.on_commit(lambda: invalidate_class_lists([instance.pk]))
+    else:
+        touch_classrooms([instance.pk])
+        transaction.on_commit(lambda: invalidate_class_lists(pk_set))
+
+
+# Student cards show the teacher's name and rosters show the students'; any
+# other save (a login, a password change, an admin flag) leaves them alone
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def note_rename(sender, instance, update_fields=None, **kwargs):
+    instance._renamed = False
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(NAME_FIELDS)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*NAME_FIELDS).first()
+    instance._renamed = previous is not None and previous != tuple(getattr(instance, name) for name in NAME_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, **kwargs):
+    if created or not getattr(instance, '_renamed', False):
+        return
+    instance._renamed = False
+    user_ids = list(Enrollment.objects.filter(classroom__teacher=instance).values_list('student_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_class_lists(user_ids))
+    touch_classrooms(Classroom.objects.filter(Q(teacher=instance) | Q(enrollments__student=instance)).values('pk'))
+
+
+# Question bank search index (search.py); same transaction as the question
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        index_questions([(instance.pk, instance.text)])
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    unindex_questions([instance.pk])
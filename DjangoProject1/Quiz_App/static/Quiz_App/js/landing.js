@@ -0,0 +1,138 @@
+const sidebar = document.getElementById('sidebar');
+const mainContent = document.getElementById('main-content');
+const menuToggle = document.getElementById('menu-toggle');
+
+menuToggle.addEventListener('click', () => {
+    sidebar.classList.toggle('collapsed');
+    sidebar.classList.toggle('expanded');
+    mainContent.classList.toggle('collapsed');
+    mainContent.classList.toggle('expanded');
+});
+
+
+// Initialize tooltips
+document.addEventListener('DOMContentLoaded', () => {
+    const tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    tooltipTriggerList.forEach((tooltipTriggerEl) => {
+        new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+    // Handle tab switching in the account modal
+    const tabLinks = document.querySelectorAll('.profile-sidebar a[data-bs-toggle="tab"]');
+
+    tabLinks.forEach(tabLink => {
+        tabLink.addEventListener('click', event => {
+            event.preventDefault();
+
+            // Remove active class from all sidebar links
+            tabLinks.forEach(link => link.classList.remove('active'));
+
+            // Add active class to the clicked link
+            tabLink.classList.add('active');
+
+            // Switch the tab content (only the modal's, not the classroom tabs)
+            const target = document.querySelector(tabLink.getAttribute('href'));
+            const activeTabs = document.querySelectorAll('#menu-modal .tab-pane.active');
+            activeTabs.forEach(tab => tab.classList.remove('active', 'show'));
+            target.classList.add('active', 'show');
+        });
+    });
+});
+
+let currentClassroomId = null;
+
+function openClassroom(id, section, className, subject, code) {
+    currentClassroomId = id;
+
+    // Hide classroom cards
+    document.getElementById('classroom-cards').style.display = 'none';
+
+    // Show classroom details
+    const classroomDetails = document.getElementById('classroom-details');
+    classroomDetails.style.display = 'block';
+
+    // Update classroom details dynamically
+    document.getElementById('class-name').textContent = `${className} (${subject})`;
+    document.getElementById('class-section').textContent = `Section: ${section}`;
+    document.getElementById('class-join-code').textContent = `Class Code: ${code}`;
+
+    // Tabs are loaded lazily; forget what was loaded for the previous class
+    document.querySelectorAll('#classroomTabContent .tab-pane').forEach(pane => {
+        pane.querySelector('.tab-body').innerHTML = '';
+        delete pane.dataset.loaded;
+    });
+    loadTab(document.querySelector('#classroomTabContent .tab-pane.active'));
+}
+
+function tabUrl(tab) {
+    const template = document.getElementById('classroomTabContent').dataset.url;
+    return template.replace('/0/', `/${currentClassroomId}/`).replace('/quizzes/', `/${tab}/`);
+}
+
+function loadTab(pane) {
+    if (!pane || pane.dataset.loaded) {
+        return;
+    }
+    pane.dataset.loaded = 'true';
+    appendPage(pane.querySelector('.tab-body'), tabUrl(pane.dataset.tab));
+}
+
+function appendPage(container, url) {
+    // Each response is one page of rows plus, if there is more, a "Load more" button
+    fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+        .then(response => response.ok ? response.text() : Promise.reject(response.status))
+        .then(html => container.insertAdjacentHTML('beforeend', html))
+        .catch(() => container.insertAdjacentHTML('beforeend', '<p class="text-danger">Could not load this tab.</p>'));
+}
+
+document.querySelectorAll('#classroomTabs button[data-bs-toggle="tab"]').forEach(button => {
+    button.addEventListener('shown.bs.tab', () => loadTab(document.querySelector(button.dataset.bsTarget)));
+});
+
+document.getElementById('classroomTabContent')?.addEventListener('click', event => {
+    const button = event.target.closest('.load-more');
+    if (button) {
+        const container = button.parentElement;
+        button.remove();
+        appendPage(container, button.dataset.url);
+    }
+});
+
+const importRosterForm = document.getElementById('import-roster-form');
+if (importRosterForm) {
+    importRosterForm.addEventListener('submit', event => {
+        event.preventDefault();
+        const url = importRosterForm.dataset.url.replace('/0/', `/${currentClassroomId}/`);
+        fetch(url, {method: 'POST', body: new FormData(importRosterForm)})
+            .then(response => response.json())
+            .then(report => {
+                if (report.error) {
+                    Swal.fire({icon: 'error', text: report.error});
+                    return;
+                }
+                // Show the first few problem rows; the rest are summarized
+                const problems = report.problems.slice(0, 20)
+                    .map(p => `Row ${p.row} (${p.value || 'blank'}): ${p.error}`).join('<br>');
+                const more = report.problems.length > 20 ? `<br>...and ${report.problems.length - 20} more` : '';
+                Swal.fire({
+                    icon: report.problems.length ? 'warning' : 'success',
+                    title: `${report.enrolled} students enrolled`,
+                    html: `${report.already_enrolled} already enrolled.<br>${problems}${more}`,
+                });
+                // The roster changed; reload the People tab next time it is shown
+                const people = document.getElementById('people');
+                people.querySelector('.tab-body').innerHTML = '';
+                delete people.dataset.loaded;
+            });
+    });
+}
+
+function showClassroomCards() {
+    // Show classroom cards
+    document.getElementById('classroom-cards').style.display = 'flex';
+
+    // Hide classroom details
+    document.getElementById('classroom-details').style.display = 'none';
+}
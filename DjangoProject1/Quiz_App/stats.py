@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import Attempt, ClassroomStats, Quiz, QuizStats
+
+BUCKETS = 10  # fixed 10%-wide histogram buckets; 100% falls in the last one
+TOP_K = 10
+
+
+def to_percent(score, max_score):
+    if score is None:
+        return None
+    return 100.0 * score / max_score if max_score else 0.0
+
+
+def bucket(percent):
+    return min(int(percent // (100 / BUCKETS)), BUCKETS - 1)
+
+
+class Aggregate:
+    # In-memory mirror of a ScoreStats row; every update is O(1) apart from
+    # the top-K list, which is at most TOP_K long.
+    __slots__ = ('count', 'total', 'total_sq', 'histogram', 'top', 'completed', 'top_stale')
+
+    def __init__(self, row=None):
+        self.count = row.count if row else 0
+        self.total = row.total if row else 0.0
+        self.total_sq = row.total_sq if row else 0.0
+        self.histogram = list(row.histogram) if row and row.histogram else [0] * BUCKETS
+        self.top = [list(entry) for entry in row.top] if row else []
+        self.completed = row.completed if row else 0
+        self.top_stale = False
+
+    def add(self, percent, attempt_id, student_id):
+        self.count += 1
+        self.total += percent
+        self.total_sq += percent * percent
+        self.histogram[bucket(percent)] += 1
+        # Ties go to the earlier attempt, so the list doesn't depend on grading order
+        if len(self.top) < TOP_K or (-percent, attempt_id) < (-self.top[-1][0], self.top[-1][1]):
+            self.top.append([percent, attempt_id, student_id])
+            self.top.sort(key=lambda entry: (-entry[0], entry[1]))
+            del self.top[TOP_K:]
+
+    def remove(self, percent, attempt_id):
+        self.count -= 1
+        self.total -= percent
+        self.total_sq -= percent * percent
+        self.histogram[bucket(percent)] -= 1
+        before = len(self.top)
+        self.top = [entry for entry in self.top if entry[1] != attempt_id]
+        # A dropped leader can only be replaced by looking at the attempts again
+        if len(self.top) < before and self.count >= TOP_K:
+            self.top_stale = True
+
+    def store(self, row):
+        row.count, row.total, row.total_sq = self.count, self.total, self.total_sq
+        row.histogram, row.top, row.completed = self.histogram, self.top, self.completed
+        return row
+
+    def as_tuple(self):
+        # For comparisons in check(); floats rounded against summation order
+        return (self.count, round(self.total, 6), round(self.total_sq, 4), self.histogram,
+                [[round(p, 6), a, s] for p, a, s in self.top], self.completed)
+
+
+def _top_attempts(attempts):
+    rows = (attempts.filter(score__isnull=False)
+            .annotate(percent=F('score') * 100.0 / F('max_score'))
+            .order_by('-percent', 'id')
+            .values_list('score', 'max_score', 'id', 'student_id')[:TOP_K])
+    return [[to_percent(score, max_score), attempt_id, student_id]
+            for score, max_score, attempt_id, student_id in rows]
+
+
+def lock_stats(quiz_id):
+    """Lock a quiz's and its classroom's statistics rows; call inside atomic().
+
+    Graders read the old scores only once they hold these, so two of them
+    can't both fold the same change in. select_for_update() locks nothing on
+    SQLite, so the no-op UPDATE comes first: it takes the database write lock
+    before this transaction has read anything.
+    """
+    QuizStats.objects.filter(quiz_id=quiz_id).update(count=F('count'))
+    classroom_id = Quiz.objects.filter(pk=quiz_id).values_list('classroom_id', flat=True).get()
+    quiz_row, _ = QuizStats.objects.select_for_update().get_or_create(quiz_id=quiz_id)
+    classroom_row, _ = ClassroomStats.objects.select_for_update().get_or_create(classroom_id=classroom_id)
+    return quiz_row, classroom_row
+
+
+def record_grades(quiz_row, classroom_row, changes):
+    """Fold re-graded attempts into the locked rows from lock_stats().
+
+    ``changes`` holds (attempt id, student id, attempt number, old percent,
+    new percent) tuples; the old percent is None for a first grading.
+    """
+    if not changes:
+        return
+    quiz_stats, classroom_stats = Aggregate(quiz_row), Aggregate(classroom_row)
+    for attempt_id, student_id, number, old, new in changes:
+        for stats in (quiz_stats, classroom_stats):
+            if old is not None:
+                stats.remove(old, attempt_id)
+            elif number == 1:
+                stats.completed += 1
+            stats.add(new, attempt_id, student_id)
+
+    if quiz_stats.top_stale:
+        quiz_stats.top = _top_attempts(Attempt.objects.filter(quiz_id=quiz_row.quiz_id))
+    if classroom_stats.top_stale:
+        classroom_stats.top = _top_attempts(Attempt.objects.filter(quiz__classroom_id=classroom_row.classroom_id))
+    quiz_stats.store(quiz_row).save()
+    classroom_stats.store(classroom_row).save()
+
+
+def compute_all(batch_size=5000):
+    """Recompute every aggregate from the graded attempts in a single pass."""
+    quizzes, classrooms = {}, {}
+    attempts = (Attempt.objects.filter(score__isnull=False)
+                .order_by('id')
+                .values_list('id', 'student_id', 'number', 'score', 'max_score',
+                             'quiz_id', 'quiz__classroom_id'))
+    for attempt_id, student_id, number, score, max_score, quiz_id, classroom_id in attempts.iterator(batch_size):
+        percent = to_percent(score, max_score)
+        for stats in (quizzes.setdefault(quiz_id, Aggregate()),
+                      classrooms.setdefault(classroom_id, Aggregate())):
+            stats.add(percent, attempt_id, student_id)
+            if number == 1:
+                stats.completed += 1
+    return quizzes, classrooms
+
+
+def rebuild(batch_size=5000):
+    quizzes, classrooms = compute_all(batch_size)
+    with transaction.atomic():
+        QuizStats.objects.all().delete()
+        ClassroomStats.objects.all().delete()
+        QuizStats.objects.bulk_create(
+            [stats.store(QuizStats(quiz_id=quiz_id)) for quiz_id, stats in quizzes.items()],
+            batch_size=500)
+        ClassroomStats.objects.bulk_create(
+            [stats.store(ClassroomStats(classroom_id=classroom_id)) for classroom_id, stats in classrooms.items()],
+            batch_size=500)
+    return len(quizzes), len(classrooms)
+
+
+def check(batch_size=5000):
+    """Compare the stored aggregates with a fresh computation.
+
+    Returns a list of (kind, id) pairs whose stored statistics are wrong or
+    missing.
+    """
+    quizzes, classrooms = compute_all(batch_size)
+    problems = []
+    for kind, model, key, expected in (('quiz', QuizStats, 'quiz_id', quizzes),
+                                       ('classroom', ClassroomStats, 'classroom_id', classrooms)):
+        stored = {getattr(row, key): Aggregate(row) for row in model.objects.all()}
+        for object_id in expected.keys() | stored.keys():
+            empty = Aggregate().as_tuple()
+            want = expected[object_id].as_tuple() if object_id in expected else empty
+            have = stored[object_id].as_tuple() if object_id in stored else empty
+            if want != have:
+                problems.append((kind, object_id))
+    return sorted(problems)
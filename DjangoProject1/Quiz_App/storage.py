@@ -0,0 +1,73 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+
+from .assets import BUNDLES, VENDOR_FILES, build_bundle, bundle_path
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map')
+
+
+class BundledManifestStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also builds bundles and pre-compresses files.
+
+    collectstatic writes every bundle in ``assets.BUNDLES`` before the files
+    are hashed, so bundles get content-hashed names like any other file, then
+    stores ``.gz`` (and ``.br`` when brotli is installed) next to each hashed
+    text file for StaticAssetMiddleware to serve.
+    """
+
+    def stored_name(self, name):
+        # Before the first collectstatic (development, tests) there is no
+        # manifest; link the plain names instead of failing.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def _read_text(self, name):
+        try:
+            with self.open(name) as source:
+                return source.read().decode('utf-8')
+        except FileNotFoundError:
+            raise ImproperlyConfigured(f"Static file {name!r} is missing.")
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Pages link these from STATIC_URL only; a deploy without them would be unstyled
+            missing = sorted(source for source in VENDOR_FILES if not self.exists(source))
+            if missing:
+                raise ImproperlyConfigured(
+                    f"Vendored static files are missing: {', '.join(missing)}. Run 'manage.py vendor_static'.")
+            for name in BUNDLES:
+                path = bundle_path(name)
+                self._replace(path, build_bundle(name, self._read_text).encode('utf-8'))
+                paths[path] = (self, path)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as source:
+            data = source.read()
+        variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(data)))
+        for suffix, compressed in variants:
+            # Not worth a variant when compression barely helps
+            if len(compressed) < len(data) * 0.95:
+                self._replace(name + suffix, compressed)
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from collections import OrderedDict, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .grading import grade_quiz
+from .models import Attempt, Choice, Question, Quiz, Response
+from .randomization import unpermute
+
+logger = logging.getLogger(__name__)
+
+# The writer flushes when this many submissions are waiting, or when the
+# oldest one has waited FLUSH_INTERVAL seconds, whichever comes first.
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.05
+
+# Tokens remembered in memory to answer retries without touching the queue
+RECENT_TOKENS = 10000
+
+
+class Submission:
+    __slots__ = ('attempt_id', 'student_id', 'token', 'answers', 'positions', 'received_at')
+
+    def __init__(self, attempt_id, student_id, token, answers, positions=None):
+        self.attempt_id = attempt_id
+        self.student_id = student_id
+        self.token = token
+        self.answers = answers  # {question id: choice id or None}
+        # Or the chosen display position per displayed question, for attempts
+        # with a shuffled order; mapped to answers when the batch is written
+        self.positions = positions
+        self.received_at = timezone.now()
+
+
+def resolve_positions(submissions):
+    # One query and one vectorized pass for every positional submission in the batch
+    positional = [s for s in submissions if s.positions is not None]
+    if not positional:
+        return
+    layouts = {attempt_id: (question_order, choice_order) for attempt_id, question_order, choice_order in
+               Attempt.objects.filter(pk__in=[s.attempt_id for s in positional])
+               .values_list('id', 'question_order', 'choice_order')}
+    answers = unpermute([layouts.get(s.attempt_id, (None, None)) for s in positional],
+                        [s.positions for s in positional])
+    for submission, submitted in zip(positional, answers):
+        submission.answers = submitted
+
+
+def quiz_choices(quiz_ids):
+    # {quiz id: {question id: set of its choice ids}} for checking submitted answers
+    key = {quiz_id: {} for quiz_id in quiz_ids}
+    for question_id, quiz_id in Question.objects.filter(quiz_id__in=quiz_ids).values_list('id', 'quiz_id'):
+        key[quiz_id][question_id] = set()
+    for choice_id, question_id, quiz_id in Choice.objects.filter(question__quiz_id__in=quiz_ids).values_list(
+            'id', 'question_id', 'question__quiz_id'):
+        key[quiz_id][question_id].add(choice_id)
+    return key
+
+
+def valid_answers(answers, questions):
+    # Answers to questions outside the quiz, or with another question's choice, are dropped
+    return {question_id: choice_id for question_id, choice_id in answers.items()
+            if question_id in questions and (choice_id is None or choice_id in questions[question_id])}
+
+
+def write_submissions(submissions):
+    """Store a batch of submissions in one transaction.
+
+    Only open attempts owned by the submitting student are written; the
+    unique submission token and the ``submitted_at IS NULL`` guard make a
+    replayed submission a no-op. Answers received after the attempt's
+    deadline are discarded and the attempt is closed at the deadline, as
+    auto-submit would have. A submission received in time still wins over
+    an auto-submit that closed the attempt while it waited in the queue.
+    Newly closed attempts are graded per quiz. Returns the ids of the
+    attempts that were closed.
+    """
+    by_attempt = {}
+    for submission in submissions:
+        # First submission for an attempt wins; later ones are retries
+        by_attempt.setdefault(submission.attempt_id, submission)
+
+    resolve_positions(by_attempt.values())
+    tokens = [s.token for s in by_attempt.values()]
+    # Closed by auto_submit (no token, at or after the deadline) rather than by the student
+    auto_submitted = Q(submission_token__isnull=True, submitted_at__gte=F('deadline'))
+    with transaction.atomic():
+        used_tokens = set(
+            Attempt.objects.filter(submission_token__in=tokens).values_list('submission_token', flat=True)
+        )
+        open_attempts = {
+            attempt_id: (student_id, quiz_id, deadline, submitted_at)
+            for attempt_id, student_id, quiz_id, deadline, submitted_at in
+            Attempt.objects.filter(Q(submitted_at__isnull=True) | auto_submitted, pk__in=by_attempt)
+            .values_list('id', 'student_id', 'quiz_id', 'deadline', 'submitted_at')
+        }
+        answer_key = quiz_choices({quiz_id for _, quiz_id, _, _ in open_attempts.values()})
+        accepted = []
+        for attempt_id, submission in by_attempt.items():
+            student_id, quiz_id, deadline, submitted_at = open_attempts.get(attempt_id, (None, None, None, None))
+            if student_id != submission.student_id or submission.token in used_tokens:
+                continue
+            late = deadline is not None and submission.received_at > deadline
+            if submitted_at is not None and late:
+                continue  # auto-submitted, and this came too late to replace it
+            submission.answers = {} if late else valid_answers(submission.answers, answer_key[quiz_id])
+            # Guarded update: only one writer can ever close an attempt
+            guard = Q(submitted_at__isnull=True) | (auto_submitted & Q(deadline__gte=submission.received_at))
+            closed = Attempt.objects.filter(guard, pk=attempt_id).update(
+                submitted_at=deadline if late else submission.received_at, submission_token=submission.token)
+            if closed:
+                accepted.append(submission)
+        if not accepted:
+            return []
+
+        Response.objects.bulk_create(
+            [Response(attempt_id=s.attempt_id, question_id=question_id, choice_id=choice_id)
+             for s in accepted for question_id, choice_id in s.answers.items()],
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['choice'],
+        )
+
+        quizzes = defaultdict(list)
+        for attempt_id, quiz_id in Attempt.objects.filter(
+                pk__in=[s.attempt_id for s in accepted]).values_list('id', 'quiz_id'):
+            quizzes[quiz_id].append(attempt_id)
+    for quiz_id, attempt_ids in quizzes.items():
+        try:
+            grade_quiz(Quiz(pk=quiz_id), attempts=attempt_ids)
+        except Exception:
+            # The submissions are stored; the quiz's "Re-grade" admin action catches up
+            logger.exception("Failed to grade %d submitted attempts of quiz %d", len(attempt_ids), quiz_id)
+    logger.debug("Wrote %d quiz submissions", len(accepted))
+    return [s.attempt_id for s in accepted]
+
+
+class SubmissionQueue:
+    """In-process queue that acknowledges submissions before writing them.
+
+    A single writer task per event loop drains the queue in batches, so a
+    burst of submissions turns into a handful of transactions instead of one
+    write lock per student.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recent_tokens = OrderedDict()  # written and committed
+        self.pending_tokens = set()  # queued, not written yet
+        self.batches_written = 0
+        self._queue = None
+        self._writer = None
+        self._loop = None
+
+    def seen(self, token):
+        return token in self.recent_tokens or token in self.pending_tokens
+
+    def _remember(self, token):
+        self.recent_tokens[token] = None
+        if len(self.recent_tokens) > RECENT_TOKENS:
+            self.recent_tokens.popitem(last=False)
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._writer is None or self._writer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._run())
+
+    async def put(self, submission):
+        # Returns False when the token was already accepted by this process
+        if self.seen(submission.token):
+            return False
+        self.pending_tokens.add(submission.token)
+        self._ensure_writer()
+        await self._queue.put(submission)
+        return True
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _write(self, batch):
+        # One transaction for the batch; if it fails, each submission on its
+        # own, so one bad submission can't take the others down with it
+        try:
+            write_submissions(batch)
+            written = batch
+        except Exception:
+            logger.exception("Failed to write %d quiz submissions; retrying one by one", len(batch))
+            written = []
+            for submission in batch:
+                try:
+                    write_submissions([submission])
+                    written.append(submission)
+                except Exception:
+                    logger.exception("Failed to write the submission for attempt %d", submission.attempt_id)
+        return written
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                written = await sync_to_async(self._write)(batch)
+                self.batches_written += 1
+                # Only committed tokens answer retries; a failed one can be sent again
+                for submission in written:
+                    self._remember(submission.token)
+            finally:
+                for submission in batch:
+                    self.pending_tokens.discard(submission.token)
+                    self._queue.task_done()
+
+    async def drain(self):
+        # Wait until everything queued so far is in the database
+        if self._queue is not None:
+            await self._queue.join()
+
+
+submission_queue = SubmissionQueue()
@@ -0,0 +1,160 @@
+"""Buffered ingestion of anti-cheating telemetry.
+
+The quiz page batches browser events (tab switches, focus loss, copy/paste,
+leaving fullscreen) and sends them with navigator.sendBeacon. The endpoint
+only parses a batch and appends it to an in-memory buffer. The buffer is
+written every ``TELEMETRY_FLUSH_INTERVAL`` seconds or once
+``TELEMETRY_FLUSH_BATCH`` events are waiting. One flush is one bulk insert of
+the raw events and one upsert per attempt that adds to its AttemptSuspicion
+counters.
+
+Events are checked against attempt ownership at flush time, in one query
+for the whole buffer, so the endpoint itself never touches the database.
+A failed flush puts its events back for the next one, up to
+``MAX_FLUSH_ATTEMPTS`` flushes in a row; after that they are dropped and
+logged. The buffer never holds more than ``MAX_BUFFERED_EVENTS``; the oldest
+events go first.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Attempt, AttemptEvent, AttemptSuspicion
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_EVENTS = 200  # per beacon; the client sends far fewer
+MAX_EVENT_AGE = timedelta(days=1)
+MAX_BUFFERED_EVENTS = 100000  # about 50 flush batches
+MAX_FLUSH_ATTEMPTS = 5
+
+# (student id, attempt id, kind, occurred at) of events not yet in the database
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+_failed_flushes = 0  # in a row
+
+
+def parse_batch(raw, received_at):
+    """Decode a compact beacon payload into (kind, occurred at) pairs.
+
+    The payload is ``{"t": epoch ms of the first event, "e": [[kind, ms
+    since t], ...]}``. Unknown kinds are dropped, and times are clamped so a
+    wrong client clock can't put events in the future or far in the past.
+    Raises ValueError on a malformed payload.
+    """
+    try:
+        payload = json.loads(raw)
+        start = datetime.fromtimestamp(payload['t'] / 1000, dt_timezone.utc)
+        events = payload['e'][:MAX_BATCH_EVENTS]
+        parsed = []
+        for kind, offset in events:
+            if kind in AttemptSuspicion.COUNTERS:
+                occurred_at = start + timedelta(milliseconds=offset)
+                parsed.append((kind, min(max(occurred_at, received_at - MAX_EVENT_AGE), received_at)))
+    except (KeyError, TypeError, OverflowError, OSError) as error:
+        raise ValueError(str(error)) from error
+    return parsed
+
+
+def record(student_id, attempt_id, events):
+    with _buffer_lock:
+        _buffer.extend((student_id, attempt_id, kind, occurred_at) for kind, occurred_at in events)
+        _trim_buffer()
+    _maybe_flush()
+
+
+def _trim_buffer():
+    # Called with _buffer_lock held
+    overflow = len(_buffer) - MAX_BUFFERED_EVENTS
+    if overflow > 0:
+        del _buffer[:overflow]
+        logger.warning("Telemetry buffer full; dropped the %d oldest events", overflow)
+
+
+def _maybe_flush():
+    interval = getattr(settings, 'TELEMETRY_FLUSH_INTERVAL', 5)
+    batch = getattr(settings, 'TELEMETRY_FLUSH_BATCH', 2000)
+    if len(_buffer) >= batch or time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def _event_sql():
+    table = connection.ops.quote_name(AttemptEvent._meta.db_table)
+    return f'INSERT INTO {table} (attempt_id, kind, occurred_at) VALUES (%s, %s, %s)'
+
+
+def _rollup_sql():
+    table = connection.ops.quote_name(AttemptSuspicion._meta.db_table)
+    counters = list(AttemptSuspicion.COUNTERS.values()) + ['total']
+    columns = ['attempt_id'] + counters + ['first_event_at', 'last_event_at']
+    # Counters are added to, so concurrent flushes from several workers can't
+    # overwrite each other's counts
+    updates = [f'{name} = {table}.{name} + excluded.{name}' for name in counters] + [
+        f'first_event_at = MIN({table}.first_event_at, excluded.first_event_at)',
+        f'last_event_at = MAX({table}.last_event_at, excluded.last_event_at)',
+    ]
+    return (f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))})'
+            f' ON CONFLICT (attempt_id) DO UPDATE SET {", ".join(updates)}')
+
+
+def rollup(events):
+    # (attempt id, kind, occurred at) rows -> one counter row per attempt
+    counts, first, last = {}, {}, {}
+    for attempt_id, kind, occurred_at in events:
+        counts.setdefault(attempt_id, Counter())[kind] += 1
+        first[attempt_id] = min(first.get(attempt_id, occurred_at), occurred_at)
+        last[attempt_id] = max(last.get(attempt_id, occurred_at), occurred_at)
+    adapt = connection.ops.adapt_datetimefield_value
+    return [
+        (attempt_id, *(kinds[kind] for kind in AttemptSuspicion.COUNTERS), sum(kinds.values()),
+         adapt(first[attempt_id]), adapt(last[attempt_id]))
+        for attempt_id, kinds in counts.items()
+    ]
+
+
+def flush():
+    """Write the buffered events and their counters; returns how many."""
+    global _last_flush, _failed_flushes
+    with _buffer_lock:
+        batch = list(_buffer)
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+
+    adapt = connection.ops.adapt_datetimefield_value
+    try:
+        owners = dict(Attempt.objects.filter(pk__in={event[1] for event in batch}).values_list('id', 'student_id'))
+        events = [(attempt_id, kind, occurred_at)
+                  for student_id, attempt_id, kind, occurred_at in batch if owners.get(attempt_id) == student_id]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # A prepared INSERT run with executemany; bulk_create() would
+            # build a model instance per event first
+            cursor.executemany(_event_sql(), [(attempt_id, kind, adapt(occurred_at))
+                                              for attempt_id, kind, occurred_at in events])
+            cursor.executemany(_rollup_sql(), rollup(events))
+    except Exception:
+        _failed_flushes += 1
+        if _failed_flushes >= MAX_FLUSH_ATTEMPTS:
+            _failed_flushes = 0
+            logger.exception("Dropped %d telemetry events after %d failed flushes", len(batch), MAX_FLUSH_ATTEMPTS)
+            return 0
+        # Put the batch back and try again next time
+        with _buffer_lock:
+            _buffer[:0] = batch
+            _trim_buffer()
+        logger.exception("Failed to flush %d telemetry events", len(batch))
+        return 0
+    _failed_flushes = 0
+    return len(events)
+
+
+atexit.register(flush)
@@ -0,0 +1,28 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from ..assets import BUNDLES, bundle_path
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name, defer=False):
+    """Link a bundle from assets.BUNDLES.
+
+    Once collectstatic has built the bundle it is linked by its hashed name;
+    in development (or before collecting) each source is linked on its own.
+    """
+    path = bundle_path(name)
+    if settings.DEBUG or path not in getattr(staticfiles_storage, 'hashed_files', {}):
+        urls = [static(source) for source in BUNDLES[name]]
+    else:
+        urls = [static(path)]
+    if name.endswith('.css'):
+        tag = '<link rel="stylesheet" href="{}">'
+    else:
+        tag = '<script src="{}" defer></script>' if defer else '<script src="{}"></script>'
+    return format_html_join('\n    ', tag, ((url,) for url in urls))
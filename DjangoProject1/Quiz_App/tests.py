@@ -1,3 +1,1272 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.utils import timezone
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import assets, card_cache
+from .class_codes import CODE_ALPHABET, allocator, bulk_create_classrooms, create_classroom
+from .enrollment import enroll_student, import_roster
+from .forms import SignupForm, add_unique_error
+from . import provisioning
+from .provisioning import provision_accounts
+from . import sessions
+from . import instrumentation, randomization, search, stats, telemetry
+from .deadlines import DeadlineScheduler, attempt_deadline, auto_submit
+from .grading import grade_quiz
+from .middleware import StaticAssetMiddleware
+from .submissions import Submission, SubmissionQueue, submission_queue, write_submissions
+from .models import Attempt, AttemptEvent, AttemptSuspicion, Choice, Classroom, ClassroomStats, Enrollment, Profile, Question, Quiz, QuizStats, Response
+from .utils import QueryCounter, encode_cursor
+from .views import LANDING_QUERY_BUDGET
+
+
+def make_user(username, role, password='pass12345'):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password=password)
+    Profile.objects.create(user=user, role=role)
+    return user
+
+
+def tearDownModule():
+    # Nothing deferred by these tests may be flushed into the real database at exit
+    sessions._pending.clear()
+    telemetry._buffer.clear()
+
+
+class ClassCodeTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+
+    def test_codes_are_unique_and_upper_case(self):
+        rows = [{'class_name': f'Class {n}', 'section': 'A'} for n in range(300)]
+        classrooms = bulk_create_classrooms(self.teacher, rows)
+        codes = {classroom.class_code for classroom in classrooms}
+        self.assertEqual(len(codes), 300)
+        self.assertTrue(all(set(code) <= set(CODE_ALPHABET) for code in codes))
+
+    def test_duplicate_code_is_rejected_by_database(self):
+        classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Classroom.objects.create(teacher=self.teacher, class_name='Copy', class_code=classroom.class_code)
+
+    def test_join_is_case_insensitive(self):
+        classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        student = make_user('student', 'student')
+        self.client.force_login(student)
+        self.client.post(reverse('join_class'), {'class_code': classroom.class_code.lower()})
+        self.assertTrue(classroom.students.filter(pk=student.pk).exists())
+
+
+class LandingPageQueryBudgetTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        cache.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+
+    def enroll(self, count):
+        rows = [{'class_name': f'Class {n}', 'section': 'A'} for n in range(count)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for classroom in bulk_create_classrooms(self.teacher, rows):
+                classroom.students.add(self.student)
+
+    def count_landing_queries(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('landing'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_student_queries_do_not_grow_with_classrooms(self):
+        self.enroll(1)
+        baseline = self.count_landing_queries(self.student)
+        self.enroll(40)
+        self.assertEqual(self.count_landing_queries(self.student), baseline)
+
+    def test_teacher_queries_do_not_grow_with_classrooms(self):
+        baseline = self.count_landing_queries(self.teacher)
+        self.enroll(40)
+        self.assertEqual(self.count_landing_queries(self.teacher), baseline)
+
+    def test_view_stays_within_budget(self):
+        self.enroll(40)
+        self.client.force_login(self.student)
+        counter = QueryCounter()
+        with self.settings(QUERY_BUDGET_STRICT=True), connection.execute_wrapper(counter):
+            response = self.client.get(reverse('landing'))
+        self.assertContains(response, 'Class 39')
+        # session + user lookups happen in middleware, outside the view budget
+        self.assertLessEqual(counter.count, LANDING_QUERY_BUDGET + 2)
+
+
+class ClassroomCardCacheTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        cache.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        enroll_student(self.classroom, self.student)
+
+    def landing(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('landing'))
+
+    def test_second_render_is_served_from_cache(self):
+        self.landing(self.student)
+        hits = card_cache.stats['hits']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.landing(self.student)
+        self.assertContains(response, 'Math')
+        self.assertEqual(card_cache.stats['hits'], hits + 1)
+        self.assertFalse(any('quiz_app_classroom' in q['sql'] for q in queries.captured_queries))
+
+    def test_joining_a_class_invalidates_cards(self):
+        self.landing(self.student)
+        other = create_classroom(teacher=self.teacher, class_name='Physics')
+        with self.captureOnCommitCallbacks(execute=True):
+            enroll_student(other, self.student)
+        self.assertContains(self.landing(self.student), 'Physics')
+
+    def test_renaming_class_invalidates_teacher_and_students(self):
+        self.landing(self.teacher)
+        self.landing(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classroom.class_name = 'Algebra'
+            self.classroom.save()
+        self.assertContains(self.landing(self.teacher), 'Algebra')
+        self.assertContains(self.landing(self.student), 'Algebra')
+
+    def test_roster_import_invalidates_cards(self):
+        other = create_classroom(teacher=self.teacher, class_name='Physics')
+        self.landing(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_roster(other, io.StringIO('username\nstudent\n'))
+        self.assertContains(self.landing(self.student), 'Physics')
+
+
+class ClassroomApiTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        enroll_student(self.classroom, self.student)
+
+    def test_classrooms_are_paged_with_a_cursor(self):
+        bulk_create_classrooms(self.teacher, [{'class_name': f'Class {n}'} for n in range(4)])
+        self.client.force_login(self.teacher)
+        names, cursor = [], ''
+        while cursor is not None:
+            page = self.client.get(reverse('api_classrooms'), {'limit': 2, 'cursor': cursor}).json()
+            names += [row['class_name'] for row in page['results']]
+            cursor = page['next_cursor']
+        self.assertEqual(names, ['Math', 'Class 0', 'Class 1', 'Class 2', 'Class 3'])
+        self.assertEqual(self.client.get(reverse('api_classrooms'), {'cursor': 'bogus'}).status_code, 400)
+
+    def test_cursors_that_do_not_fit_the_ordering_are_rejected(self):
+        self.client.force_login(self.student)
+        url = reverse('api_quizzes', args=[self.classroom.pk])
+        for values in ([1], ['2024-01-01T00:00:00+00:00', 1, 2], [{'a': 1}, 1], [None, 1],
+                       ['not a date', 1], ['2024-01-01T00:00:00+00:00', 2 ** 70], [True, False]):
+            with self.subTest(values=values):
+                self.assertEqual(self.client.get(url, {'cursor': encode_cursor(values)}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': encode_cursor(['2024-01-01T00:00:00+00:00', 1])}).status_code, 200)
+
+    def test_unchanged_roster_poll_is_not_modified(self):
+        self.client.force_login(self.teacher)
+        url = reverse('api_roster', args=[self.classroom.pk])
+        first = self.client.get(url)
+        self.assertEqual([row['username'] for row in first.json()['results']], ['student'])
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+        enroll_student(self.classroom, make_user('second', 'student'))
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.json()['results']), 2)
+
+    def test_only_renames_change_the_roster_etag(self):
+        self.client.force_login(self.teacher)
+        url = reverse('api_roster', args=[self.classroom.pk])
+        etag = self.client.get(url)['ETag']
+        self.student.set_password('another-pass')
+        self.student.save()
+        self.student.is_staff = True
+        self.student.save(update_fields=['is_staff'])
+        self.student.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.student.first_name = 'Ada'
+        self.student.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['results'][0]['first_name'], 'Ada')
+
+    def test_quizzes_are_newest_first_and_drafts_hidden_from_students(self):
+        Quiz.objects.create(classroom=self.classroom, title='Old', is_published=True)
+        Quiz.objects.create(classroom=self.classroom, title='New', is_published=True)
+        Quiz.objects.create(classroom=self.classroom, title='Draft')
+        self.client.force_login(self.student)
+        page = self.client.get(reverse('api_quizzes', args=[self.classroom.pk]), {'limit': 1}).json()
+        self.assertEqual([row['title'] for row in page['results']], ['New'])
+        page = self.client.get(reverse('api_quizzes', args=[self.classroom.pk]), {'cursor': page['next_cursor']}).json()
+        self.assertEqual([row['title'] for row in page['results']], ['Old'])
+
+    def test_outsiders_cannot_read_a_classroom(self):
+        self.client.force_login(make_user('outsider', 'student'))
+        self.assertEqual(self.client.get(reverse('api_roster', args=[self.classroom.pk])).status_code, 404)
+
+
+class ClassroomTabTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        cache.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        enroll_student(self.classroom, self.student)
+
+    def tab(self, name, **params):
+        return self.client.get(reverse('classroom_tab', args=[self.classroom.pk, name]), params)
+
+    def test_landing_page_size_does_not_depend_on_class_content(self):
+        self.client.force_login(self.student)
+        before = len(self.client.get(reverse('landing')).content)
+        Quiz.objects.bulk_create([Quiz(classroom=self.classroom, title=f'Quiz {n}', is_published=True)
+                                  for n in range(30)])
+        self.assertEqual(len(self.client.get(reverse('landing')).content), before)
+
+    def test_quizzes_tab_is_paginated(self):
+        Quiz.objects.bulk_create([Quiz(classroom=self.classroom, title=f'Quiz {n}', is_published=True)
+                                  for n in range(25)])
+        self.client.force_login(self.student)
+        first = self.tab('quizzes')
+        self.assertEqual(first.content.count(b'class="card mb-3"'), 20)
+        next_url = first.context['next_url']
+        second = self.client.get(next_url)
+        self.assertEqual(second.content.count(b'class="card mb-3"'), 5)
+        self.assertNotContains(second, 'load-more')
+
+    def test_grades_tab_shows_the_students_best_score(self):
+        quiz = Quiz.objects.create(classroom=self.classroom, title='Algebra', is_published=True)
+        Attempt.objects.create(quiz=quiz, student=self.student, score=3, max_score=4, submitted_at=timezone.now())
+        Attempt.objects.create(quiz=quiz, student=make_user('other', 'student'), score=4, max_score=4)
+        self.client.force_login(self.student)
+        self.assertContains(self.tab('grades'), '3.0 / 4')
+
+    def test_people_tab_and_access(self):
+        self.client.force_login(self.student)
+        response = self.tab('people')
+        self.assertContains(response, 'teacher')
+        self.assertContains(response, 'student')
+        self.assertEqual(self.tab('secrets').status_code, 404)
+        self.client.force_login(make_user('outsider', 'student'))
+        self.assertEqual(self.tab('people').status_code, 404)
+
+
+class QuestionSearchTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.other = make_user('other', 'teacher')
+        self.biology = create_classroom(teacher=self.teacher, class_name='Bio', subject='Biology')
+        self.history = create_classroom(teacher=self.other, class_name='Hist', subject='History')
+        self.cells = Quiz.objects.create(classroom=self.biology, title='Cells')
+        self.wars = Quiz.objects.create(classroom=self.history, title='Wars')
+
+    def ids(self, query, **filters):
+        return [result['id'] for result in search.search_questions(query, **filters)]
+
+    def test_index_follows_saves_and_deletes(self):
+        question = Question.objects.create(quiz=self.cells, text='What does the mitochondria produce?')
+        self.assertEqual(self.ids('mitochondria'), [question.pk])
+        question.text = 'Where is chlorophyll found?'
+        question.save()
+        self.assertEqual(self.ids('mitochondria'), [])
+        self.assertEqual(self.ids('chlorophyll'), [question.pk])
+        question.delete()
+        self.assertEqual(self.ids('chlorophyll'), [])
+
+    def test_ranking_prefix_and_filters(self):
+        once = Question.objects.create(quiz=self.cells, text='Name one organelle of a plant cell')
+        twice = Question.objects.create(quiz=self.cells, text='Which organelle is the largest organelle?')
+        war = Question.objects.create(quiz=self.wars, text='Which organelle did the treaty name?')
+        self.assertEqual(self.ids('organelle')[0], twice.pk)
+        self.assertEqual(set(self.ids('plant org')), {once.pk})
+        self.assertEqual(self.ids('organelle', subject='history'), [war.pk])
+        self.assertEqual(set(self.ids('organelle', teacher=self.teacher)), {once.pk, twice.pk})
+        self.assertEqual(self.ids('"); DROP TABLE'), [])
+        self.assertIn('<mark>', search.search_questions('treaty')[0]['snippet'])
+        Question.objects.create(quiz=self.wars, text='Which <img src=x onerror=alert(1)> treaty?')
+        snippet = search.search_questions('onerror')[0]['snippet']
+        self.assertEqual(snippet, 'Which &lt;img src=x <mark>onerror</mark>=alert(1)&gt; treaty?')
+
+    def test_reindex_picks_up_bulk_inserts(self):
+        Question.objects.bulk_create([Question(quiz=self.cells, text=f'Enzyme question {n}') for n in range(5)])
+        self.assertEqual(self.ids('enzyme'), [])
+        self.assertEqual(search.reindex(batch_size=2), 5)
+        self.assertEqual(len(self.ids('enzyme')), 5)
+
+    def test_api_is_for_teachers(self):
+        Question.objects.create(quiz=self.cells, text='What is osmosis?')
+        self.client.force_login(make_user('student', 'student'))
+        self.assertEqual(self.client.get(reverse('api_question_search'), {'q': 'osmosis'}).status_code, 403)
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('api_question_search'), {'q': 'osmo', 'subject': 'Biology'})
+        self.assertEqual([r['quiz_title'] for r in response.json()['results']], ['Cells'])
+
+    def test_api_hides_other_teachers_drafts(self):
+        mine = Question.objects.create(quiz=self.cells, text='Draft question on osmosis')
+        theirs = Question.objects.create(quiz=self.wars, text='Draft question on treaties')
+        self.client.force_login(self.teacher)
+        url = reverse('api_question_search')
+        self.assertEqual([r['id'] for r in self.client.get(url, {'q': 'draft'}).json()['results']], [mine.pk])
+        Quiz.objects.filter(pk=self.wars.pk).update(is_published=True)
+        self.assertEqual({r['id'] for r in self.client.get(url, {'q': 'draft'}).json()['results']}, {mine.pk, theirs.pk})
+        self.assertEqual(len(self.client.get(url, {'q': 'draft', 'limit': -5}).json()['results']), 1)
+
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+
+    def test_second_join_is_rejected_without_duplicate(self):
+        self.assertTrue(enroll_student(self.classroom, self.student))
+        self.assertFalse(enroll_student(self.classroom, self.student))
+        self.assertEqual(Enrollment.objects.filter(classroom=self.classroom).count(), 1)
+
+    def test_dropped_student_can_rejoin(self):
+        enroll_student(self.classroom, self.student)
+        Enrollment.objects.update(status='dropped')
+        self.assertTrue(enroll_student(self.classroom, self.student))
+        self.assertEqual(Enrollment.objects.get().status, 'active')
+
+    def test_join_view_does_not_load_roster(self):
+        self.client.force_login(self.student)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('join_class'), {'class_code': self.classroom.class_code})
+        self.assertTrue(self.classroom.students.filter(pk=self.student.pk).exists())
+        # no roster load: the insert itself is the membership check
+        self.assertFalse(any('Quiz_App_enrollment' in q['sql'] and q['sql'].startswith('SELECT')
+                             for q in queries.captured_queries))
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        self.students = [make_user(f'student{n}', 'student') for n in range(5)]
+
+    def test_report_lists_problem_rows(self):
+        enroll_student(self.classroom, self.students[4])
+        roster = io.StringIO(
+            "username\nstudent0\nSTUDENT1@example.com\nnobody\nteacher\n\nstudent0\nstudent4\n"
+        )
+        report = import_roster(self.classroom, roster, batch_size=2)
+        self.assertEqual(report['enrolled'], 2)
+        self.assertEqual(report['already_enrolled'], 1)
+        self.assertEqual(
+            [(p['row'], p['error']) for p in report['problems']],
+            [(4, 'No such user.'), (5, 'User is not a student.'), (6, 'Empty row.'), (7, 'Listed more than once.')],
+        )
+        self.assertEqual(self.classroom.students.count(), 3)
+
+    def test_dropped_students_are_reactivated_and_counted_once(self):
+        enroll_student(self.classroom, self.students[0])
+        Enrollment.objects.filter(student=self.students[0]).update(status='dropped')
+        report = import_roster(self.classroom, io.StringIO("student0\nstudent1\n"))
+        self.assertEqual((report['enrolled'], report['already_enrolled']), (2, 0))
+        self.assertEqual(Enrollment.objects.filter(classroom=self.classroom, status='active').count(), 2)
+
+    def test_rows_added_after_the_check_are_not_counted_as_enrolled(self):
+        # Another request enrolls student1 right after the active-enrollment check
+        inserted = []
+
+        def enroll_concurrently(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not inserted and sql.startswith('SELECT') and 'quiz_app_enrollment' in sql.lower():
+                inserted.append(1)
+                with connection.cursor() as cursor:
+                    cursor.execute('INSERT INTO "Quiz_App_enrollment" (classroom_id, student_id, status, joined_at) '
+                                   'VALUES (%s, %s, %s, %s)',
+                                   [self.classroom.pk, self.students[1].pk, 'active', timezone.now()])
+            return result
+
+        with connection.execute_wrapper(enroll_concurrently):
+            report = import_roster(self.classroom, io.StringIO("student0\nstudent1\n"))
+        self.assertEqual(inserted, [1])
+        self.assertEqual((report['enrolled'], report['already_enrolled']), (1, 1))
+        self.assertEqual(Enrollment.objects.filter(classroom=self.classroom).count(), 2)
+
+    def test_tsv_upload_through_view(self):
+        self.client.force_login(self.teacher)
+        upload = SimpleUploadedFile('roster.tsv', b"student2\tB\nstudent3\tB\n")
+        response = self.client.post(reverse('import_roster', args=[self.classroom.id]), {'roster': upload})
+        self.assertEqual(response.json()['enrolled'], 2)
+
+    def test_only_class_teacher_can_import(self):
+        self.client.force_login(self.students[0])
+        upload = SimpleUploadedFile('roster.csv', b"student2\n")
+        response = self.client.post(reverse('import_roster', args=[self.classroom.id]), {'roster': upload})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SignupTests(TestCase):
+    def data(self, username='newbie', email='newbie@example.com'):
+        return {'first_name': 'New', 'last_name': 'User', 'username': username, 'email': email, 'role': 'student',
+                'password': 'pass12345', 'reenter_password': 'pass12345'}
+
+    def test_signup_creates_user_and_profile_without_lookups(self):
+        form = SignupForm(self.data())
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+        response = self.client.post(reverse('signup'), self.data())
+        self.assertRedirects(response, reverse('login'))
+        self.assertEqual(User.objects.get(username='newbie').profile.role, 'student')
+
+    def test_taken_username_and_email_are_form_errors(self):
+        make_user('taken', 'student')
+        response = self.client.post(reverse('signup'), self.data(username='taken'))
+        self.assertContains(response, 'This username is already taken.')
+        response = self.client.post(reverse('signup'), self.data(email='TAKEN@Example.com'))
+        self.assertContains(response, 'This email address is already in use.')
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Profile.objects.count(), 1)
+
+    def test_race_lost_after_validation_creates_nothing(self):
+        form = SignupForm(self.data())
+        self.assertTrue(form.is_valid())
+        make_user('rival', 'student')
+        User.objects.filter(username='rival').update(email='Newbie@example.com')  # signed up meanwhile
+        form.save()
+        self.assertEqual(list(form.errors), ['email'])
+        self.assertFalse(User.objects.filter(username='newbie').exists())
+
+    def test_email_index_is_case_insensitive_but_allows_blanks(self):
+        User.objects.create(username='a', email='Same@example.com')
+        User.objects.create(username='b')
+        User.objects.create(username='c')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(username='d', email='same@EXAMPLE.com')
+
+    def test_only_the_unique_indexes_become_form_errors(self):
+        form = SignupForm(self.data())
+        add_unique_error(form, IntegrityError("UNIQUE constraint failed: index 'quiz_auth_user_email_lower_unique'"))
+        self.assertEqual(list(form.errors), ['email'])
+        with self.assertRaises(IntegrityError):
+            add_unique_error(form, IntegrityError('NOT NULL constraint failed: auth_user.email'))
+
+    def test_migration_lists_duplicate_emails(self):
+        migration = importlib.import_module('Quiz_App.migrations.0019_auth_user_email_lower_unique')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX quiz_auth_user_email_lower_unique')  # as before the migration
+        User.objects.create(username='first', email='Dup@example.com')
+        User.objects.create(username='second', email='dup@EXAMPLE.com')
+        User.objects.create(username='blank')
+        User.objects.create(username='blank2')
+        with self.assertRaisesMessage(RuntimeError, 'dup@example.com: first (id'):
+            migration.check_duplicate_emails(django_apps, None)
+
+    def test_profile_update_to_a_taken_email_is_a_form_error(self):
+        make_user('other', 'student')
+        user = make_user('me', 'student')
+        self.client.force_login(user)
+        self.client.post(reverse('account_management'), {
+            'update_profile': '1', 'first_name': 'Me', 'last_name': 'Me', 'username': 'me',
+            'email': 'OTHER@example.com'})
+        user.refresh_from_db()
+        self.assertEqual(user.email, 'me@example.com')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TestCase):
+    ACCOUNTS = (
+        "username,email,first_name,last_name,role,password\n"
+        "ann,ann@example.com,Ann,Lee,student,pass-ann\n"
+        "ben,ben@example.com,Ben,Ong,Teacher,pass-ben\n"
+        "cat,cat@example.com,Cat,Tan,student,\n"
+        "ann,ann2@example.com,Ann,Again,student,x\n"
+        "dan,taken@example.com,Dan,Cruz,student,pass-dan\n"
+        "eve,eve@example.com,Eve,Sy,admin,pass-eve\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        make_user('taken', 'student')
+
+    def test_accounts_are_created_in_chunks_and_reruns_resume(self):
+        reports = []
+        # Two hashing processes, so the pool itself is exercised
+        report = provision_accounts(io.StringIO(self.ACCOUNTS), workers=2, chunk_size=2,
+                                    progress=lambda r: reports.append(r['created']))
+        self.assertEqual((report['rows'], report['created'], report['existing']), (6, 3, 0))
+        self.assertEqual(
+            [(p['row'], p['error']) for p in report['problems']],
+            [(5, 'Listed more than once.'), (6, 'Email address already in use.'),
+             (7, 'Role must be one of: student, teacher.')],
+        )
+        self.assertEqual(reports, [2, 3, 3])
+        self.assertEqual(authenticate(username='ann', password='pass-ann'), User.objects.get(username='ann'))
+        self.assertEqual(User.objects.get(username='ben').profile.role, 'teacher')
+        self.assertFalse(User.objects.get(username='cat').has_usable_password())
+
+        rerun = provision_accounts(io.StringIO(self.ACCOUNTS), workers=1)
+        self.assertEqual((rerun['created'], rerun['existing']), (0, 3))
+
+    def test_chunk_is_retried_without_names_taken_meanwhile(self):
+        real_taken = provisioning._taken
+
+        def signup_right_after_the_check(rows):
+            taken = real_taken(rows)
+            if not User.objects.filter(username='ann').exists():
+                make_user('ann', 'student')
+            return taken
+
+        with mock.patch.object(provisioning, '_taken', side_effect=signup_right_after_the_check):
+            report = provision_accounts(io.StringIO(self.ACCOUNTS), workers=1)
+        self.assertEqual((report['created'], report['existing']), (2, 1))
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'taken', 'ann', 'ben', 'cat'})
+        self.assertEqual(User.objects.get(username='ann').first_name, '')
+
+    def test_admin_upload(self):
+        admin_user = User.objects.create_superuser('root', 'root@example.com', 'pass')
+        self.client.force_login(admin_user)
+        self.assertContains(self.client.get(reverse('admin:auth_user_changelist')), 'Provision accounts')
+        upload = SimpleUploadedFile('accounts.csv', self.ACCOUNTS.encode())
+        response = self.client.post(reverse('admin:auth_user_provision'), {'accounts': upload}, follow=True)
+        self.assertContains(response, 'Created 3 accounts')
+        self.assertContains(response, 'Email address already in use.')
+
+        response = self.client.post(reverse('admin:auth_user_provision'),
+                                    {'accounts': SimpleUploadedFile('bad.csv', b"name\nx\n")}, follow=True)
+        self.assertContains(response, 'missing the email, role, username column(s)')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmailOrUsernameBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('Alice', 'student', password='pass12345')
+
+    def test_login_with_username_or_email_any_case(self):
+        for identifier in ('Alice', 'alice', 'ALICE@example.com'):
+            self.assertEqual(authenticate(username=identifier, password='pass12345'), self.user)
+
+    def test_lookup_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            authenticate(username='alice@example.com', password='wrong')
+
+    def test_failed_login_hashes_once(self):
+        with mock.patch('django.contrib.auth.base_user.check_password', return_value=False) as check, \
+                mock.patch('django.contrib.auth.base_user.make_password', return_value='!') as make:
+            authenticate(username='alice', password='wrong')
+            authenticate(username='nobody', password='wrong')
+        self.assertEqual(check.call_count + make.call_count, 2)
+
+    def test_unknown_identifier_is_cached_until_account_exists(self):
+        authenticate(username='bob', password='pass12345')
+        with self.assertNumQueries(0):
+            authenticate(username='bob', password='pass12345')
+        bob = make_user('bob', 'student', password='pass12345')
+        self.assertEqual(authenticate(username='bob', password='pass12345'), bob)
+
+
+class LoginRequiredMiddlewareTests(TestCase):
+    def test_anonymous_user_is_redirected_to_login(self):
+        self.assertRedirects(self.client.get(reverse('landing')), reverse('login'))
+
+    def test_public_pages_are_open(self):
+        self.assertEqual(self.client.get(reverse('signup')).status_code, 200)
+
+    def test_exempt_paths_skip_session(self):
+        with mock.patch('django.contrib.sessions.backends.db.SessionStore.load') as load:
+            response = self.client.get(reverse('health'), HTTP_COOKIE='sessionid=abc')
+        self.assertEqual(response.content, b'ok')
+        load.assert_not_called()
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        teacher = make_user('teacher', 'teacher')
+        classroom = create_classroom(teacher=teacher, class_name='Math')
+        self.quiz = Quiz.objects.create(classroom=classroom, title='Quiz 1')
+        self.questions = [Question.objects.create(quiz=self.quiz, text=f'Q{n}', order=n, points=n + 1)
+                          for n in range(3)]
+        self.right = [Choice.objects.create(question=q, text='right', is_correct=True) for q in self.questions]
+        self.wrong = [Choice.objects.create(question=q, text='wrong') for q in self.questions]
+
+    def submit(self, username, choices):
+        attempt = Attempt.objects.create(quiz=self.quiz, student=make_user(username, 'student'),
+                                         submitted_at=timezone.now())
+        for question, choice in zip(self.questions, choices):
+            Response.objects.create(attempt=attempt, question=question, choice=choice)
+        return attempt
+
+    def test_scores_are_weighted_by_points(self):
+        perfect = self.submit('a', self.right)
+        partial = self.submit('b', [self.right[0], self.wrong[1], None])
+        blank = Attempt.objects.create(quiz=self.quiz, student=make_user('c', 'student'),
+                                       submitted_at=timezone.now())
+        self.assertEqual(grade_quiz(self.quiz), 3)
+        scores = dict(Attempt.objects.values_list('id', 'score'))
+        self.assertEqual(scores, {perfect.id: 6.0, partial.id: 1.0, blank.id: 0.0})
+        self.assertEqual(Attempt.objects.get(pk=perfect.pk).max_score, 6.0)
+
+    def test_regrade_after_answer_key_fix(self):
+        attempt = self.submit('a', [self.wrong[0], self.right[1], self.right[2]])
+        grade_quiz(self.quiz)
+        Choice.objects.filter(pk=self.wrong[0].pk).update(is_correct=True)
+        grade_quiz(self.quiz)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 6.0)
+
+    def test_a_correct_choice_only_scores_its_own_question(self):
+        attempt = self.submit('a', [self.right[0]] * 3)
+        other = Quiz.objects.create(classroom=self.quiz.classroom, title='Quiz 2')
+        stray = Question.objects.create(quiz=other, text='elsewhere', points=10)
+        Response.objects.create(attempt=attempt, question=stray,
+                                choice=Choice.objects.create(question=stray, text='x', is_correct=True))
+        grade_quiz(self.quiz)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 1.0)
+
+    def test_unsubmitted_attempts_are_not_graded(self):
+        Attempt.objects.create(quiz=self.quiz, student=make_user('a', 'student'))
+        self.assertEqual(grade_quiz(self.quiz), 0)
+
+
+class RandomizationTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        classroom = create_classroom(teacher=teacher, class_name='Math')
+        enroll_student(classroom, self.student)
+        self.quiz = Quiz.objects.create(classroom=classroom, title='Q', is_published=True)
+        for n in range(8):
+            question = Question.objects.create(quiz=self.quiz, text=f'{n} + {n}?', order=n)
+            for answer in range(4):
+                Choice.objects.create(question=question, text=str(2 * n + answer), is_correct=answer == 0)
+
+    def test_order_is_seeded_by_quiz_student_and_attempt(self):
+        first = randomization.shuffle(self.quiz.pk, self.student.pk, 1)
+        self.assertEqual(first, randomization.shuffle(self.quiz.pk, self.student.pk, 1))
+        self.assertNotEqual(first, randomization.shuffle(self.quiz.pk, self.student.pk, 2))
+        self.assertNotEqual(first, randomization.shuffle(self.quiz.pk, self.student.pk + 1, 1))
+
+        attempt = Attempt(question_order=first[0], choice_order=first[1])
+        order = randomization.display_order(attempt)
+        owners = dict(Choice.objects.values_list('id', 'question_id'))
+        self.assertEqual(sorted(q for q, _ in order), sorted(Question.objects.values_list('id', flat=True)))
+        for question_id, choice_ids in order:
+            self.assertEqual({owners[c] for c in choice_ids}, {question_id})
+            self.assertEqual(len(choice_ids), 4)
+
+    def test_resuming_reads_the_stored_order(self):
+        attempt = randomization.start_attempt(self.quiz, self.student)
+        with self.assertNumQueries(1):
+            self.assertEqual(randomization.start_attempt(self.quiz, self.student), attempt)
+        attempt.submitted_at = timezone.now()
+        attempt.save()
+        self.assertEqual(randomization.start_attempt(self.quiz, self.student).number, 2)
+
+    def test_positional_answers_are_unpermuted_and_graded(self):
+        self.client.force_login(self.student)
+        started = self.client.post(reverse('start_quiz', args=[self.quiz.pk])).json()
+        self.assertEqual(self.client.post(reverse('start_quiz', args=[self.quiz.pk])).json(), started)
+        # The right answer to "n + n?" is 2n; leave the last question blank
+        positions = [question['choices'].index(str(2 * int(question['text'].split()[0])))
+                     for question in started['questions']]
+        positions[-1] = None
+        response = self.client.post(reverse('submit_attempt', args=[started['attempt']]),
+                                    {'token': 'tok', 'positions': positions}, content_type='application/json')
+        self.assertEqual(response.json()['status'], 'submitted')
+        attempt = Attempt.objects.get(pk=started['attempt'])
+        self.assertEqual((attempt.score, attempt.max_score), (7.0, 8.0))
+        self.assertEqual(attempt.responses.filter(choice__isnull=True).count(), 1)
+
+    def test_unpermute_ignores_out_of_range_positions(self):
+        attempt = randomization.start_attempt(self.quiz, self.student)
+        layout = (attempt.question_order, attempt.choice_order)
+        answers = randomization.unpermute([layout, (None, None)], [[0, 9, -1], [1]])
+        self.assertEqual(len(answers[0]), 8)
+        self.assertEqual(sum(choice is not None for choice in answers[0].values()), 1)
+        self.assertEqual(answers[1], {})
+
+
+class DeadlineSchedulerTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        teacher = make_user('teacher', 'teacher')
+        self.quiz = Quiz.objects.create(classroom=create_classroom(teacher=teacher, class_name='Math'),
+                                        title='Timed', time_limit_minutes=30)
+        Choice.objects.create(question=Question.objects.create(quiz=self.quiz, text='1 + 1?'), text='2',
+                              is_correct=True)
+
+    def test_deadline_is_the_time_limit_capped_by_the_due_date(self):
+        start = timezone.now()
+        self.assertEqual(attempt_deadline(self.quiz, start), start + timedelta(minutes=30))
+        self.quiz.due_at = start + timedelta(minutes=10)
+        self.assertEqual(attempt_deadline(self.quiz, start), self.quiz.due_at)
+        self.assertIsNone(attempt_deadline(Quiz(title='Untimed'), start))
+        attempt = randomization.start_attempt(self.quiz, make_user('student', 'student'))
+        self.assertEqual(attempt.deadline, self.quiz.due_at)
+
+    async def test_due_attempts_are_submitted_and_graded(self):
+        def seed():
+            now = timezone.now()
+            return [Attempt.objects.create(quiz=self.quiz, student=make_user(name, 'student'), deadline=now + offset)
+                    for name, offset in (('late', timedelta(seconds=-5)), ('later', timedelta(hours=1)),
+                                         ('done', timedelta(seconds=-5)))]
+        late, later, done = await sync_to_async(seed)()
+        await Attempt.objects.filter(pk=done.pk).aupdate(submitted_at=timezone.now(), score=1)
+
+        scheduler = DeadlineScheduler()
+        scheduler.start()
+        try:
+            for _ in range(100):
+                if scheduler.submitted:
+                    break
+                await asyncio.sleep(0.02)
+            # Scheduled while sleeping until the hour-long deadline
+            soon = await Attempt.objects.acreate(quiz=self.quiz, student=await sync_to_async(make_user)('soon', 'student'),
+                                                 deadline=timezone.now() + timedelta(milliseconds=50))
+            scheduler.schedule(soon.pk, soon.deadline)
+            for _ in range(100):
+                if scheduler.submitted == 2:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await scheduler.stop()
+
+        closed = {a.pk: a async for a in Attempt.objects.filter(submitted_at__isnull=False)}
+        self.assertEqual(set(closed), {late.pk, soon.pk, done.pk})
+        self.assertEqual(closed[late.pk].score, 0.0)
+        self.assertEqual(closed[done.pk].score, 1)
+        metrics = scheduler.metrics()
+        self.assertEqual((metrics['submitted'], metrics['pending']), (2, 1))
+        self.assertGreaterEqual(metrics['lag_max_ms'], 0)
+
+
+class SubmissionTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        teacher = make_user('teacher', 'teacher')
+        quiz = Quiz.objects.create(classroom=create_classroom(teacher=teacher, class_name='Math'), title='Q')
+        self.question = Question.objects.create(quiz=quiz, text='1 + 1?')
+        self.choice = Choice.objects.create(question=self.question, text='2', is_correct=True)
+        self.student = make_user('student', 'student')
+        self.attempt = Attempt.objects.create(quiz=quiz, student=self.student)
+
+    def submission(self, token='t1', student=None):
+        return Submission(self.attempt.pk, (student or self.student).pk, token,
+                          {self.question.pk: self.choice.pk})
+
+    def test_batch_write_grades_and_ignores_retries(self):
+        self.assertEqual(write_submissions([self.submission(), self.submission()]), [self.attempt.pk])
+        self.assertEqual(write_submissions([self.submission()]), [])
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.score, self.attempt.submission_token), (1.0, 't1'))
+        self.assertEqual(Response.objects.count(), 1)
+
+    def test_other_students_cannot_submit(self):
+        intruder = make_user('intruder', 'student')
+        self.assertEqual(write_submissions([self.submission(student=intruder)]), [])
+
+    def test_answers_outside_the_quiz_are_dropped(self):
+        other = Question.objects.create(quiz=Quiz.objects.create(classroom=self.attempt.quiz.classroom, title='R'),
+                                        text='elsewhere')
+        second = Question.objects.create(quiz=self.attempt.quiz, text='2 + 2?')
+        peer = Attempt.objects.create(quiz=self.attempt.quiz, student=make_user('peer', 'student'))
+        stray = Submission(self.attempt.pk, self.student.pk, 't1',
+                           {self.question.pk: self.choice.pk, other.pk: None, 999999: None, second.pk: self.choice.pk})
+        written = write_submissions([stray, Submission(peer.pk, peer.student_id, 't2', {self.question.pk: None})])
+        self.assertEqual(sorted(written), sorted([self.attempt.pk, peer.pk]))
+        self.assertEqual(set(Response.objects.filter(attempt=self.attempt).values_list('question_id', 'choice_id')),
+                         {(self.question.pk, self.choice.pk)})
+
+    def test_answers_after_the_deadline_are_discarded(self):
+        deadline = timezone.now() - timedelta(minutes=1)
+        Attempt.objects.filter(pk=self.attempt.pk).update(deadline=deadline)
+        self.assertEqual(write_submissions([self.submission()]), [self.attempt.pk])
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.submitted_at, self.attempt.score), (deadline, 0.0))
+        self.assertFalse(Response.objects.exists())
+
+    def test_submission_in_time_wins_over_auto_submit(self):
+        submission = self.submission()  # received, then queued past the deadline
+        Attempt.objects.filter(pk=self.attempt.pk).update(deadline=submission.received_at)
+        self.assertEqual(auto_submit([self.attempt.pk]), [self.attempt.pk])
+        self.assertEqual(write_submissions([submission]), [self.attempt.pk])
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.score, self.attempt.submitted_at), (1.0, submission.received_at))
+        # A late one can't replace an auto-submit
+        other = Attempt.objects.create(quiz=self.attempt.quiz, student=self.student, number=2,
+                                       deadline=timezone.now() - timedelta(minutes=1))
+        auto_submit([other.pk])
+        self.assertEqual(write_submissions([Submission(other.pk, self.student.pk, 't2', {})]), [])
+
+    async def test_failed_batch_is_retried_one_by_one(self):
+        queue = SubmissionQueue(flush_interval=0.01)
+        peer = await sync_to_async(make_user)('peer', 'student')
+        peer_attempt = await Attempt.objects.acreate(quiz_id=self.attempt.quiz_id, student=peer)
+
+        def flaky(batch):
+            if any(s.token == 'bad' for s in batch):
+                raise IntegrityError('boom')
+            return write_submissions(batch)
+
+        with mock.patch('Quiz_App.submissions.write_submissions', side_effect=flaky), \
+                self.assertLogs('Quiz_App.submissions', 'ERROR'):
+            await queue.put(self.submission(token='bad'))
+            await queue.put(Submission(peer_attempt.pk, peer.pk, 'good', {self.question.pk: self.choice.pk}))
+            await queue.drain()
+        self.assertIsNotNone((await Attempt.objects.aget(pk=peer_attempt.pk)).submitted_at)
+        self.assertIsNone((await Attempt.objects.aget(pk=self.attempt.pk)).submitted_at)
+        # Only the committed token answers retries
+        self.assertTrue(queue.seen('good'))
+        self.assertFalse(queue.seen('bad'))
+        self.assertTrue(await queue.put(self.submission(token='bad')))
+        await queue.drain()
+        self.assertIsNotNone((await Attempt.objects.aget(pk=self.attempt.pk)).submitted_at)
+
+    def test_view_requires_token(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('submit_attempt', args=[self.attempt.pk]),
+                                    {'answers': {}}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_view_says_why_answers_were_not_taken(self):
+        url = reverse('submit_attempt', args=[self.attempt.pk])
+
+        def submit(token='tok'):
+            response = self.client.post(url, {'token': token, 'answers': {str(self.question.pk): self.choice.pk}},
+                                        content_type='application/json')
+            return response.status_code, response.json()['status']
+
+        self.client.force_login(make_user('intruder', 'student'))
+        self.assertEqual(submit(), (403, 'rejected'))
+        self.client.force_login(self.student)
+        self.assertEqual(submit(), (200, 'submitted'))
+        self.assertEqual(submit(), (200, 'duplicate'))
+        self.assertEqual(submit('other'), (409, 'closed'))
+
+        self.attempt = Attempt.objects.create(quiz=self.attempt.quiz, student=self.student, number=2,
+                                              deadline=timezone.now() - timedelta(minutes=1))
+        url = reverse('submit_attempt', args=[self.attempt.pk])
+        self.assertEqual(submit('late'), (409, 'late'))
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.submitted_at, self.attempt.score), (self.attempt.deadline, 0.0))
+
+    async def test_asgi_rejections_are_not_acknowledged(self):
+        client = AsyncClient()
+        await client.aforce_login(await sync_to_async(make_user)('intruder', 'student'))
+        url = reverse('submit_attempt', args=[self.attempt.pk])
+        response = await client.post(url, json.dumps({'token': 'x', 'answers': {}}), content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['status']), (403, 'rejected'))
+        self.assertFalse(submission_queue.seen('x'))
+
+    def test_view_rejects_out_of_range_answers(self):
+        self.client.force_login(self.student)
+        url = reverse('submit_attempt', args=[self.attempt.pk])
+        for payload in ({'positions': [2 ** 40]}, {'positions': [-2]}, {'positions': [0] * 1001},
+                        {'answers': {str(self.question.pk): 2 ** 64}}, {'answers': {str(2 ** 64): None}}):
+            with self.subTest(payload=payload):
+                response = self.client.post(url, {'token': 'tok', **payload}, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Attempt.objects.get(pk=self.attempt.pk).submitted_at)
+
+    async def test_asgi_submission_is_queued(self):
+        client = AsyncClient()
+        await client.aforce_login(self.student)
+        url = reverse('submit_attempt', args=[self.attempt.pk])
+        body = json.dumps({'token': 'abc', 'answers': {str(self.question.pk): self.choice.pk}})
+        first = await client.post(url, body, content_type='application/json')
+        retry = await client.post(url, body, content_type='application/json')
+        await submission_queue.drain()
+        self.assertEqual((first.status_code, retry.json()['status']), (202, 'duplicate'))
+        attempt = await Attempt.objects.aget(pk=self.attempt.pk)
+        self.assertEqual(attempt.score, 1.0)
+
+
+@override_settings(TELEMETRY_FLUSH_INTERVAL=3600)
+class TelemetryTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        telemetry._buffer.clear()
+        telemetry._failed_flushes = 0
+        self.teacher = make_user('teacher', 'teacher')
+        self.student = make_user('student', 'student')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        self.quiz = Quiz.objects.create(classroom=self.classroom, title='Q')
+        self.attempt = Attempt.objects.create(quiz=self.quiz, student=self.student)
+
+    def beacon(self, events, start=None, attempt=None):
+        start = start if start is not None else timezone.now().timestamp() * 1000 - 60000
+        return self.client.post(reverse('attempt_telemetry', args=[(attempt or self.attempt).pk]),
+                                {'b': json.dumps({'t': start, 'e': events})})
+
+    def test_batches_are_buffered_then_rolled_up(self):
+        self.client.force_login(self.student)
+        response = self.beacon([[AttemptEvent.TAB_HIDDEN, 0], [AttemptEvent.PASTE, 500], [99, 600]])
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(AttemptEvent.objects.exists())
+        self.beacon([[AttemptEvent.TAB_HIDDEN, 0]])
+        self.assertEqual(telemetry.flush(), 3)
+        self.beacon([[AttemptEvent.COPY, 0]], start=(timezone.now().timestamp() + 3600) * 1000)
+        telemetry.flush()
+
+        self.assertEqual(AttemptEvent.objects.count(), 4)
+        self.assertLessEqual(AttemptEvent.objects.latest('occurred_at').occurred_at, timezone.now())
+        suspicion = AttemptSuspicion.objects.get(attempt=self.attempt)
+        self.assertEqual((suspicion.tab_hidden, suspicion.pastes, suspicion.copies, suspicion.total), (2, 1, 1, 4))
+        self.assertLess(suspicion.first_event_at, suspicion.last_event_at)
+
+    def test_events_for_other_students_attempts_are_dropped(self):
+        self.client.force_login(make_user('other', 'student'))
+        self.beacon([[AttemptEvent.COPY, 0]])
+        self.assertEqual(telemetry.flush(), 0)
+        self.assertFalse(AttemptSuspicion.objects.exists())
+
+    def test_malformed_batch(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('attempt_telemetry', args=[self.attempt.pk]), {'b': '{"e": 1}'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_grades_tab_counts_flagged_attempts(self):
+        self.client.force_login(self.student)
+        self.beacon([[AttemptEvent.FOCUS_LOST, 0]])
+        telemetry.flush()
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('classroom_tab', args=[self.classroom.pk, 'grades']))
+        self.assertContains(response, '1 flagged')
+
+    def test_failed_flushes_retry_then_drop_the_batch(self):
+        self.client.force_login(self.student)
+        self.beacon([[AttemptEvent.COPY, 0]])
+        with mock.patch.object(telemetry, '_rollup_sql', side_effect=RuntimeError), \
+                self.assertLogs('Quiz_App.telemetry', 'ERROR'):
+            for _ in range(telemetry.MAX_FLUSH_ATTEMPTS - 1):
+                self.assertEqual(telemetry.flush(), 0)
+                self.assertEqual(len(telemetry._buffer), 1)
+            self.assertEqual(telemetry.flush(), 0)
+        self.assertEqual(telemetry._buffer, [])
+        self.assertFalse(AttemptEvent.objects.exists())
+
+    def test_buffer_keeps_the_newest_events(self):
+        events = [(AttemptEvent.COPY, timezone.now())] * 3
+        with mock.patch.object(telemetry, 'MAX_BUFFERED_EVENTS', 5), \
+                mock.patch.object(telemetry, '_maybe_flush'), self.assertLogs('Quiz_App.telemetry', 'WARNING'):
+            telemetry.record(self.student.pk, self.attempt.pk, events)
+            telemetry.record(self.student.pk, 'newest', events)
+        self.assertEqual([event[1] for event in telemetry._buffer], [self.attempt.pk] * 2 + ['newest'] * 3)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-sessions'}},
+    SESSION_WRITE_BEHIND_INTERVAL=3600,
+)
+class WriteBehindSessionTests(TestCase):
+    def setUp(self):
+        sessions._pending.clear()
+
+    def test_saves_reach_the_database_on_flush(self):
+        store = sessions.SessionStore()
+        store['has_logged_in'] = True
+        store.save()
+        self.assertFalse(Session.objects.exists())
+        self.assertTrue(sessions.SessionStore(store.session_key)['has_logged_in'])
+        self.assertEqual(sessions.flush_pending(), 1)
+        self.assertEqual(Session.objects.get().get_decoded(), {'has_logged_in': True})
+
+    def test_unchanged_session_is_not_saved_again(self):
+        store = sessions.SessionStore()
+        store['has_logged_in'] = True
+        store.save()
+        sessions.flush_pending()
+        reloaded = sessions.SessionStore(store.session_key)
+        reloaded['has_logged_in'] = True
+        reloaded.save()
+        self.assertEqual(sessions._pending, {})
+
+    def test_session_deleted_by_another_worker_stays_deleted(self):
+        store = sessions.SessionStore()
+        store['has_logged_in'] = True
+        store.save()
+        held = dict(sessions._pending)  # this worker's deferred copy
+        sessions.SessionStore(store.session_key).delete()  # logout handled by another worker
+        sessions._pending.update(held)
+        reloaded = sessions.SessionStore(store.session_key)
+        self.assertNotIn('has_logged_in', reloaded)
+        sessions._pending.update(held)
+        self.assertEqual(sessions.flush_pending(), 0)
+        self.assertFalse(Session.objects.exists())
+
+    def test_clear_expired_deletes_in_chunks(self):
+        expired = timezone.now() - timezone.timedelta(days=1)
+        Session.objects.bulk_create([Session(session_key=f'old{n}', session_data='', expire_date=expired)
+                                     for n in range(25)])
+        Session.objects.create(session_key='live', session_data='',
+                               expire_date=timezone.now() + timezone.timedelta(days=1))
+        with self.assertNumQueries(7):  # three chunks of select + delete, then an empty select
+            self.assertEqual(sessions.SessionStore.clear_expired(chunk_size=10), 25)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', None)
+        self.teacher = make_user('teacher', 'teacher')
+
+    def changelist_queries(self, url):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def add_classes(self, count):
+        classrooms = bulk_create_classrooms(self.teacher, [{'class_name': f'C{n}'} for n in range(count)])
+        student = make_user(f'student{Classroom.objects.count()}', 'student')
+        Enrollment.objects.bulk_create([Enrollment(classroom=c, student=student) for c in classrooms])
+
+    def test_classroom_changelist_queries_are_constant(self):
+        url = reverse('admin:Quiz_App_classroom_changelist')
+        self.add_classes(2)
+        baseline = self.changelist_queries(url)
+        self.add_classes(30)
+        cache.clear()
+        self.assertEqual(self.changelist_queries(url), baseline)
+
+    def test_user_changelist_queries_are_constant(self):
+        url = reverse('admin:auth_user_changelist') + '?role=student'
+        make_user('s1', 'student')
+        baseline = self.changelist_queries(url)
+        for n in range(30):
+            make_user(f'more{n}', 'student')
+        cache.clear()
+        self.assertEqual(self.changelist_queries(url), baseline)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        self.teacher = make_user('teacher', 'teacher')
+        self.classroom = create_classroom(teacher=self.teacher, class_name='Math')
+        self.quizzes = [Quiz.objects.create(classroom=self.classroom, title=f'Quiz {n}') for n in range(2)]
+        self.students = [make_user(f'student{n}', 'student') for n in range(3)]
+        for student in self.students:
+            enroll_student(self.classroom, student)
+        now = timezone.now()
+        Attempt.objects.create(quiz=self.quizzes[0], student=self.students[0], submitted_at=now, score=3)
+        Attempt.objects.create(quiz=self.quizzes[0], student=self.students[0], number=2, submitted_at=now, score=5)
+        Attempt.objects.create(quiz=self.quizzes[1], student=self.students[2], submitted_at=now, score=1)
+        self.client.force_login(self.teacher)
+
+    def test_gradebook_csv_has_best_score_per_quiz(self):
+        response = self.client.get(reverse('export_gradebook', args=[self.classroom.id, 'csv']))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, [
+            'Username,First name,Last name,Quiz 0,Quiz 1',
+            'student0,,,5.0,',
+            'student1,,,,',
+            'student2,,,,1.0',
+        ])
+
+    def test_roster_xlsx_is_a_valid_workbook(self):
+        response = self.client.get(reverse('export_roster', args=[self.classroom.id, 'xlsx']))
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('xl/workbook.xml', workbook.namelist())
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('<t>student2</t>', sheet)
+
+    def test_formulas_are_neutralized(self):
+        self.students[1].first_name = '=HYPERLINK("http://evil.example")'
+        self.students[1].last_name = '-2+3'
+        self.students[1].save()
+        response = self.client.get(reverse('export_gradebook', args=[self.classroom.id, 'csv']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[2], 'student1,"\'=HYPERLINK(""http://evil.example"")",\'-2+3,,')
+        response = self.client.get(reverse('export_roster', args=[self.classroom.id, 'xlsx']))
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn("<t>'-2+3</t>", workbook.read('xl/worksheets/sheet1.xml').decode())
+
+    async def test_streams_asynchronously_under_asgi(self):
+        client = AsyncClient()
+        await client.aforce_login(self.teacher)
+        response = await client.get(reverse('export_gradebook', args=[self.classroom.id, 'csv']))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+
+    def test_other_teachers_cannot_export(self):
+        self.client.force_login(make_user('other', 'teacher'))
+        response = self.client.get(reverse('export_gradebook', args=[self.classroom.id, 'csv']))
+        self.assertEqual(response.status_code, 404)
+
+
+class ScoreStatsTests(TestCase):
+    def setUp(self):
+        allocator.clear()
+        classroom = create_classroom(teacher=make_user('teacher', 'teacher'), class_name='Math')
+        self.quiz = Quiz.objects.create(classroom=classroom, title='Quiz')
+        self.questions = [Question.objects.create(quiz=self.quiz, text=f'Q{n}') for n in range(4)]
+        self.right = [Choice.objects.create(question=q, text='right', is_correct=True) for q in self.questions]
+        self.wrong = [Choice.objects.create(question=q, text='wrong') for q in self.questions]
+        now = timezone.now()
+        for n in range(12):
+            attempt = Attempt.objects.create(quiz=self.quiz, student=make_user(f's{n}', 'student'), submitted_at=now)
+            Response.objects.bulk_create([
+                Response(attempt=attempt, question=q, choice=self.right[i] if i < n % 5 else self.wrong[i])
+                for i, q in enumerate(self.questions)])
+
+    def test_grading_keeps_statistics_consistent(self):
+        grade_quiz(self.quiz)
+        quiz_stats = QuizStats.objects.get(quiz=self.quiz)
+        self.assertEqual((quiz_stats.count, quiz_stats.completed), (12, 12))
+        self.assertEqual(sum(quiz_stats.histogram), 12)
+        self.assertEqual(len(quiz_stats.top), stats.TOP_K)
+        self.assertEqual(quiz_stats.top[0][0], 100.0)
+        self.assertEqual(stats.check(), [])
+
+        # Fixing the answer key re-grades everyone; the running totals follow
+        Choice.objects.filter(pk=self.wrong[3].pk).update(is_correct=True)
+        grade_quiz(self.quiz)
+        self.assertEqual(QuizStats.objects.get(quiz=self.quiz).count, 12)
+        self.assertEqual(stats.check(), [])
+
+    def test_grading_the_same_attempts_twice_counts_them_once(self):
+        grade_quiz(self.quiz)
+        before = stats.Aggregate(QuizStats.objects.get(quiz=self.quiz)).as_tuple()
+        with mock.patch('Quiz_App.grading.record_grades', wraps=stats.record_grades) as record:
+            grade_quiz(self.quiz)
+        self.assertEqual(record.call_args.args[2], [])  # no score changed
+        self.assertEqual(stats.Aggregate(QuizStats.objects.get(quiz=self.quiz)).as_tuple(), before)
+
+    def test_check_detects_and_rebuild_repairs(self):
+        grade_quiz(self.quiz)
+        ClassroomStats.objects.update(count=0)
+        self.assertEqual(stats.check(), [('classroom', self.quiz.classroom_id)])
+        stats.rebuild()
+        self.assertEqual(stats.check(), [])
+
+
+@override_settings(INSTRUMENTATION_DIR=None)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.staff = make_user('staff', 'teacher')
+        self.staff.is_staff = True
+        self.staff.save()
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.force_login(make_user('student', 'student'))
+        with override_settings(INSTRUMENTATION_SLOW_MS=0):
+            self.client.get(reverse('landing'))
+        self.client.get(reverse('landing'))
+        self.client.get('/no-such-page/')
+
+        rows, slow = instrumentation.collect()
+        landing = next(row for row in rows if row['view'] == 'landing')
+        self.assertEqual(landing['count'], 2)
+        self.assertEqual(sum(landing['histogram']), 2)
+        self.assertGreater(landing['queries'], 0)
+        self.assertGreater(landing['template_ms'], 0)
+        self.assertIn(instrumentation.UNRESOLVED, [row['view'] for row in rows])
+        self.assertEqual([entry['view'] for entry in slow], ['landing'])
+        self.assertTrue(any('quiz_app_classroom' in sql.lower() for sql, _ in slow[0]['sql']))
+
+    def test_snapshots_of_other_workers_are_merged(self):
+        self.client.force_login(self.staff)
+        with tempfile.TemporaryDirectory() as directory, override_settings(INSTRUMENTATION_DIR=directory):
+            self.client.get(reverse('landing'))
+            instrumentation.dump()
+            with open(os.path.join(directory, f'{os.getpid()}.json')) as snapshot:
+                other = json.load(snapshot)
+            other['pid'] += 1
+            with open(os.path.join(directory, 'other.json'), 'w') as snapshot:
+                json.dump(other, snapshot)
+
+            response = self.client.get(reverse('performance'), {'format': 'json'})
+            landing = next(row for row in response.json()['views'] if row['view'] == 'landing')
+            self.assertEqual(landing['count'], 2)
+
+            out = io.StringIO()
+            call_command('hot_paths', stdout=out)
+            self.assertIn('landing', out.getvalue())
+            self.assertContains(self.client.get(reverse('performance')), 'Hot paths')
+
+        self.client.force_login(make_user('student', 'student'))
+        self.assertEqual(self.client.get(reverse('performance')).status_code, 302)
+
+
+class StaticAssetTests(TestCase):
+    def test_pages_link_only_the_local_assets_they_use(self):
+        self.client.force_login(make_user('student', 'student'))
+        response = self.client.get(reverse('landing'))
+        self.assertContains(response, '/static/Quiz_App/css/landing.css')
+        self.assertContains(response, '/static/vendor/sweetalert2/sweetalert2.min.js')
+        self.assertNotContains(response, 'cdn.')
+        self.assertNotContains(response, 'jquery')
+        self.client.logout()
+        response = self.client.get(reverse('login'))
+        self.assertContains(response, '/static/vendor/bootstrap/bootstrap.min.css')
+        self.assertNotContains(response, 'sweetalert2')
+
+    def test_collectstatic_fails_without_the_vendored_files(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root), \
+                mock.patch.dict(assets.VENDOR_FILES, {'vendor/never-fetched.js': ''}, clear=True), \
+                self.assertRaisesMessage(ImproperlyConfigured, 'vendor/never-fetched.js'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_builds_hashed_compressed_bundles(self):
+        page_bundles = {'landing.css': ['Quiz_App/css/landing.css'], 'landing.js': ['Quiz_App/js/landing.js']}
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root), \
+                mock.patch.dict(assets.BUNDLES, page_bundles, clear=True), \
+                mock.patch.dict(assets.VENDOR_FILES, clear=True):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.hashed_files['bundles/landing.css']
+            self.assertRegex(hashed, r'^bundles/landing\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(root, hashed + '.gz')))
+
+            middleware = StaticAssetMiddleware(lambda request: HttpResponse(status=404))
+            request = RequestFactory().get('/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            response = middleware(request)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            response.close()
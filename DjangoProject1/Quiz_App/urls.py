@@ -1,6 +1,6 @@
 # Quiz_App/urls.py
 from django.urls import path
-from .views import signup_view, login_view, home_view, landing_page, logout_view, profile_view, join_class, create_class, account_management
+from .views import signup_view, login_view, home_view, landing_page, logout_view, profile_view, join_class, create_class, account_management, import_roster_view, health_view, deadline_metrics, performance_view, start_quiz, submit_attempt, attempt_telemetry, export_gradebook, export_roster, export_term, api_classrooms, api_roster, api_quizzes, api_question_search, classroom_tab
 
 
 urlpatterns = [
@@ -13,4 +13,19 @@ urlpatterns = [
     path('join-class/', join_class, name='join_class'),
     path('create-class/', create_class, name='create_class'),  # Add the new route
     path('account_management/', account_management, name='account_management'),
+    path('health/', health_view, name='health'),
+    path('ops/deadlines/', deadline_metrics, name='deadline_metrics'),
+    path('ops/performance/', performance_view, name='performance'),
+    path('classroom/<int:classroom_id>/roster/import/', import_roster_view, name='import_roster'),
+    path('quiz/<int:quiz_id>/start/', start_quiz, name='start_quiz'),
+    path('attempt/<int:attempt_id>/submit/', submit_attempt, name='submit_attempt'),
+    path('attempt/<int:attempt_id>/telemetry/', attempt_telemetry, name='attempt_telemetry'),
+    path('classroom/<int:classroom_id>/gradebook.<str:fmt>', export_gradebook, name='export_gradebook'),
+    path('classroom/<int:classroom_id>/roster.<str:fmt>', export_roster, name='export_roster'),
+    path('exports/enrollments.<str:fmt>', export_term, name='export_term'),
+    path('classroom/<int:classroom_id>/tabs/<slug:tab>/', classroom_tab, name='classroom_tab'),
+    path('api/classrooms/', api_classrooms, name='api_classrooms'),
+    path('api/classrooms/<int:classroom_id>/roster/', api_roster, name='api_roster'),
+    path('api/classrooms/<int:classroom_id>/quizzes/', api_quizzes, name='api_quizzes'),
+    path('api/questions/search/', api_question_search, name='api_question_search'),
 ]
@@ -0,0 +1,114 @@
+import base64
+import json
+import logging
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    # Counts the queries run on the default connection while it is installed
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def query_budget(limit):
+    """Cap the number of database queries a view may run.
+
+    Going over the budget raises ``QueryBudgetExceeded`` while ``DEBUG`` (or
+    ``QUERY_BUDGET_STRICT``) is on, so an N+1 shows up in development and in
+    the tests; in production it is only logged.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = view_func(request, *args, **kwargs)
+                # Lazy TemplateResponses would render outside the wrapper
+                if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                    response.render()
+            if counter.count > limit:
+                message = f"{view_func.__name__} ran {counter.count} queries (budget {limit})"
+                if getattr(settings, 'QUERY_BUDGET_STRICT', settings.DEBUG):
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+def encode_cursor(values):
+    # Opaque to clients; datetimes keep their microseconds
+    data = json.dumps(values, default=lambda value: value.isoformat()).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _cursor_value(value):
+    # JSON scalars the database can compare; bools, nulls, NaN and 64-bit overflows can't be
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return False
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def decode_cursor(cursor, model, fields):
+    """The ``fields`` values held by a cursor from encode_cursor().
+
+    Each value is converted to the model field's type where the name is one.
+    Raises ValueError for anything else, which the views answer with a 400.
+    """
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    if not isinstance(values, list) or len(values) != len(fields) or not all(map(_cursor_value, values)):
+        raise ValueError("Malformed cursor")
+    try:
+        for position, name in enumerate(fields):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # an annotation; compared as it is
+            values[position] = field.to_python(values[position])
+    except ValidationError:
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def keyset_page(queryset, ordering, cursor=None, limit=50):
+    """Return (rows, next cursor) for one page of a values() queryset.
+
+    Pages are keyed on the ``ordering`` columns, e.g. ('-created_at', '-id'),
+    whose last column must be unique. Each page starts with a WHERE on those
+    columns, so with a matching index it costs the same however deep it is,
+    unlike OFFSET. Raises ValueError for a cursor that doesn't fit.
+    """
+    fields = [name.lstrip('-') for name in ordering]
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, fields)
+        # (a, b) after (x, y)  =>  a > x OR (a = x AND b > y)
+        after = Q()
+        for position, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {field: value for field, value in zip(fields[:position], values)}
+            after |= Q(**{f'{fields[position]}__{lookup}': values[position]}, **equal)
+        queryset = queryset.filter(after)
+    rows = list(queryset.order_by(*ordering)[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1][field] for field in fields])
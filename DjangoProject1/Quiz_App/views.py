@@ -1,19 +1,41 @@
-import random
-import string
+import hashlib
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
+from django.db.models import Count, Exists, ExpressionWrapper, F, FloatField, Max, OuterRef, Q, Sum
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date, urlencode
 from django.contrib.auth import login, update_session_auth_hash
-from .forms import CustomAuthenticationForm, SignupForm, JoinClassForm, CreateClassForm, ProfileForm, PasswordChangeForm
+from .forms import CustomAuthenticationForm, SignupForm, JoinClassForm, CreateClassForm, ProfileForm, PasswordChangeForm, RosterImportForm
 from django.contrib.auth import logout
 from django.contrib import messages
-from .models import Classroom
+from .models import Attempt, Choice, Classroom, Enrollment, Profile, Question, Quiz
+from .card_cache import render_classroom_cards
+from .class_codes import create_classroom, normalize_class_code
+from .deadlines import deadline_scheduler
+from .enrollment import enroll_student, import_roster
+from . import instrumentation
+from .exports import FORMATS, async_stream, gradebook_rows, roster_rows, term_rows
+from .randomization import display_order, start_attempt
+from .search import SEARCH_LIMIT, search_questions
+from .submissions import Submission, submission_queue, write_submissions
+from . import telemetry
+from .utils import keyset_page, query_budget
 
 def home_view(request):
     classrooms = []
     if request.user.is_authenticated:
         # Check user role
-        print(request.user.profile.role)  # Debugging line
         if request.user.profile.role == 'teacher':
             classrooms = Classroom.objects.filter(teacher=request.user)
     return render(request, 'Quiz_App/landing_page.html', {'classrooms': classrooms})
@@ -23,7 +45,8 @@ def signup_view(request):
     if request.method == 'POST':
         form = SignupForm(request.POST)
         if form.is_valid():
-            user = form.save()  # Save the user to the database
+            form.save()  # one short transaction for the user and profile
+        if form.is_valid():  # still, unless the username or email turned out to be taken
             messages.success(request, "Signup successful!")  # Add a success message
             return redirect('login')  # Redirect to the login page
     else:
@@ -68,6 +91,7 @@ def account_management(request):
             profile_form = ProfileForm(request.POST, instance=user)
             if profile_form.is_valid():
                 profile_form.save()
+            if profile_form.is_valid():  # a taken email is only found by the save
                 messages.success(request, 'Profile updated successfully!')
                 return redirect('landing')
             else:
@@ -97,26 +121,24 @@ def account_management(request):
         'profile_form': profile_form,
         'password_form': password_form,
     }
-    return render(request, 'landing_page.html', context)
+    return render(request, 'Quiz_App/landing_page.html', context)
 
 
 def join_class(request):
     if request.method == 'POST':
         form = JoinClassForm(request.POST)
         if form.is_valid():
-            class_code = form.cleaned_data['class_code']
+            class_code = normalize_class_code(form.cleaned_data['class_code'])
 
             try:
                 # Try to get the Classroom object based on the class_code
-                classroom = Classroom.objects.get(class_code=class_code)
+                classroom = Classroom.objects.only('id', 'class_name').get(class_code=class_code)
 
-                # Check if the user is already enrolled in the classroom
-                if request.user in classroom.students.all():
+                # The unique (classroom, student) index decides whether this is a new enrollment
+                if not enroll_student(classroom, request.user):
                     messages.error(request, "You are already enrolled in this classroom.")
                     return redirect('landing')  # Redirect back to the landing page (or wherever you want)
 
-                # Add the user to the students list
-                classroom.students.add(request.user)
                 messages.success(request,
                                  f"You have successfully joined the class: {classroom.class_name}")  # Use class_name instead of class_code
                 return redirect('landing')  # Redirect to the desired page
@@ -132,10 +154,6 @@ def join_class(request):
     return render(request, 'landing_page.html', {'form': form})
 
 
-def generate_class_code(length=7):
-    characters = string.ascii_letters + string.digits  # Letters (both uppercase and lowercase) and digits
-    return ''.join(random.choice(characters) for _ in range(length))
-
 @login_required
 def create_class(request):
     if request.method == 'POST':
@@ -147,18 +165,15 @@ def create_class(request):
             subject = form.cleaned_data['subject']
             room = form.cleaned_data['room']
 
-            # Generate a random class code
-            class_code = generate_class_code()
-
-            # Create new class and save to the database
-            classroom = Classroom.objects.create(
+            # Create new class with a code taken from the pre-generated pool
+            classroom = create_classroom(
                 teacher=request.user,  # Automatically uses the primary key (user.id)
                 class_name=class_name,
                 section=section,
                 subject=subject,
                 room=room,
-                class_code=class_code  # Save the generated class code
             )
+            class_code = classroom.class_code
 
             messages.success(request, f"Class '{class_name}' created successfully with code: {class_code}!")
             return redirect('landing')  # Redirect to your landing page or dashboard
@@ -171,6 +186,345 @@ def create_class(request):
 
 
 
+# Bulk enrollment from a roster file uploaded by the class teacher
+@login_required
+def import_roster_view(request, classroom_id):
+    classroom = get_object_or_404(Classroom, pk=classroom_id, teacher=request.user)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST a roster file.'}, status=405)
+
+    form = RosterImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Please choose a roster file to upload.'}, status=400)
+
+    # Decode the upload as a stream instead of reading it into memory
+    roster = io.TextIOWrapper(form.cleaned_data['roster'].file, encoding='utf-8-sig', newline='')
+    try:
+        report = import_roster(classroom, roster)
+    except UnicodeDecodeError:
+        return JsonResponse({'error': 'The roster must be a UTF-8 text file.'}, status=400)
+    return JsonResponse(report)
+
+
+# Starting a quiz. The student's question and choice order is fixed when the
+# attempt is created, so resuming or reloading just reads it back. Choice ids
+# are left out; answers come back as display positions.
+@login_required
+def start_quiz(request, quiz_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST to start the quiz.'}, status=405)
+    quiz = get_object_or_404(Quiz, pk=quiz_id, is_published=True, classroom__enrollments__student=request.user,
+                             classroom__enrollments__status='active')
+    attempt = start_attempt(quiz, request.user)
+    order = display_order(attempt)
+    questions = dict(Question.objects.filter(pk__in=[q for q, _ in order]).values_list('id', 'text'))
+    choices = dict(Choice.objects.filter(pk__in=[c for _, group in order for c in group]).values_list('id', 'text'))
+    return JsonResponse({
+        'attempt': attempt.pk,
+        'number': attempt.number,
+        'questions': [{'text': questions[question_id], 'choices': [choices[choice_id] for choice_id in group]}
+                      for question_id, group in order],
+    })
+
+
+# Quiz submission. Under ASGI the answers are acknowledged immediately and
+# written in batches by the submission queue; the client token makes retries safe.
+# Ids must fit the database's 64-bit integers and positions the 32-bit ones
+# the shuffled layouts are matched against; no quiz has more answers than this.
+MAX_SUBMITTED_ANSWERS = 1000
+MAX_ID = 2 ** 63 - 1
+MAX_POSITION = 2 ** 31 - 1
+
+
+@login_required
+async def submit_attempt(request, attempt_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST the answers.'}, status=405)
+    try:
+        payload = json.loads(request.body)
+        token = str(payload.get('token') or request.headers.get('Idempotency-Key') or '')
+        answers = {
+            int(question_id): int(choice_id) if choice_id is not None else None
+            for question_id, choice_id in payload.get('answers', {}).items()
+        }
+        # Shuffled attempts send the chosen display position of each question instead
+        positions = payload.get('positions')
+        if positions is not None:
+            positions = [int(position) if position is not None else -1 for position in positions]
+        if (len(answers) > MAX_SUBMITTED_ANSWERS or len(positions or ()) > MAX_SUBMITTED_ANSWERS
+                or not all(0 < question_id <= MAX_ID and (choice_id is None or 0 < choice_id <= MAX_ID)
+                           for question_id, choice_id in answers.items())
+                or not all(-1 <= position <= MAX_POSITION for position in positions or ())):
+            raise ValueError
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Malformed submission.'}, status=400)
+    if not token or len(token) > 64:
+        return JsonResponse({'error': 'A submission token of up to 64 characters is required.'}, status=400)
+
+    user = await request.auser()
+    submission = Submission(attempt_id, user.pk, token, answers, positions)
+    if isinstance(request, ASGIRequest) and submission_queue.seen(token):
+        return JsonResponse({'status': 'duplicate', 'token': token})  # a retry; answered from memory
+    # Nothing is acknowledged that the writer would throw away
+    rejection = submission_rejection(await submission_attempt(attempt_id), submission)
+    if rejection is not None and rejection[0] != 'late':
+        return JsonResponse({'status': rejection[0], 'token': token}, status=rejection[1])
+    # A late submission is still written: it closes the attempt, without its answers
+    if isinstance(request, ASGIRequest):
+        accepted = await submission_queue.put(submission)
+        if rejection is None:
+            return JsonResponse({'status': 'accepted' if accepted else 'duplicate', 'token': token},
+                                status=202 if accepted else 200)
+    else:
+        # Under WSGI there is no long-lived event loop for the writer; write now
+        written = await sync_to_async(write_submissions)([submission])
+        if written and rejection is None:
+            return JsonResponse({'status': 'submitted', 'token': token})
+        if rejection is None:
+            # Lost a race with another writer; say why from the attempt as it is now
+            rejection = submission_rejection(await submission_attempt(attempt_id), submission) or ('closed', 409)
+    return JsonResponse({'status': rejection[0], 'token': token}, status=rejection[1])
+
+
+def submission_attempt(attempt_id):
+    return Attempt.objects.filter(pk=attempt_id).only(
+        'student_id', 'submitted_at', 'submission_token', 'deadline').afirst()
+
+
+def submission_rejection(attempt, submission):
+    """Why write_submissions won't store these answers, as (status, HTTP status); None if it will.
+
+    'duplicate' is kept for a token that was already written; 'rejected'
+    means someone else's attempt, 'closed' an attempt already submitted and
+    'late' answers received after the deadline.
+    """
+    if attempt is None or attempt.student_id != submission.student_id:
+        return 'rejected', 403
+    if attempt.submission_token == submission.token:
+        return 'duplicate', 200
+    late = attempt.deadline is not None and submission.received_at > attempt.deadline
+    if attempt.submitted_at is not None:
+        auto_submitted = attempt.submission_token is None and attempt.deadline is not None \
+            and attempt.submitted_at >= attempt.deadline
+        # An auto-submit can still be replaced by answers received in time
+        return None if auto_submitted and not late else ('closed', 409)
+    return ('late', 409) if late else None
+
+
+# Anti-cheating telemetry beacons (static/Quiz_App/js/telemetry.js). Nothing
+# is written here: events are buffered and checked against the attempt's
+# owner when telemetry.py flushes them in bulk.
+@login_required
+def attempt_telemetry(request, attempt_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST the events.'}, status=405)
+    try:
+        events = telemetry.parse_batch(request.POST.get('b', ''), timezone.now())
+    except ValueError:
+        return JsonResponse({'error': 'Malformed telemetry batch.'}, status=400)
+    telemetry.record(request.user.pk, attempt_id, events)
+    return HttpResponse(status=204)
+
+
+def streaming_export(request, rows, filename, fmt):
+    if fmt not in FORMATS:
+        raise Http404("Unknown export format.")
+    writer, content_type = FORMATS[fmt]
+    chunks = writer(rows)
+    if isinstance(request, ASGIRequest):
+        chunks = async_stream(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+# Exports stream rows as they are read, so large classes start downloading at once
+@login_required
+def export_gradebook(request, classroom_id, fmt):
+    classroom = get_object_or_404(Classroom, pk=classroom_id, teacher=request.user)
+    return streaming_export(request, gradebook_rows(classroom), f'gradebook-{classroom.class_code}', fmt)
+
+
+@login_required
+def export_roster(request, classroom_id, fmt):
+    classroom = get_object_or_404(Classroom, pk=classroom_id, teacher=request.user)
+    return streaming_export(request, roster_rows(classroom), f'roster-{classroom.class_code}', fmt)
+
+
+@staff_member_required
+def export_term(request, fmt):
+    return streaming_export(request, term_rows(), 'enrollments', fmt)
+
+
+# Read API for the mobile wrapper and dashboards. Responses carry an ETag built
+# from Classroom.version, so a poll that finds nothing new gets an empty 304.
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_QUERY_BUDGET = 3
+
+
+def api_page(request, queryset, ordering, version, last_modified):
+    # ``version`` identifies the state of everything the response shows
+    etag = '"%s"' % hashlib.sha1(repr((version, request.GET.urlencode())).encode()).hexdigest()[:20]
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        try:
+            limit = int(request.GET.get('limit', API_PAGE_SIZE))
+            if not 1 <= limit <= API_MAX_PAGE_SIZE:
+                raise ValueError
+            rows, next_cursor = keyset_page(queryset, ordering, request.GET.get('cursor'), limit)
+        except (ValueError, ValidationError):
+            return JsonResponse({'error': 'Invalid cursor or limit.'}, status=400)
+        response = JsonResponse({'results': rows, 'next_cursor': next_cursor})
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    # Per-user data: browsers may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def classroom_access(request, classroom_id):
+    # The classroom's version, provided the user teaches or attends it
+    enrolled = Enrollment.objects.filter(classroom=OuterRef('pk'), student=request.user, status='active')
+    classroom = (Classroom.objects.filter(pk=classroom_id)
+                 .annotate(enrolled=Exists(enrolled))
+                 .values('teacher_id', 'version', 'updated_at', 'enrolled')
+                 .first())
+    if classroom is None or not (classroom['teacher_id'] == request.user.pk or classroom['enrolled']):
+        raise Http404("No such classroom.")
+    classroom['is_teacher'] = classroom['teacher_id'] == request.user.pk
+    return classroom
+
+
+@login_required
+@query_budget(API_QUERY_BUDGET)
+def api_classrooms(request):
+    role = Profile.objects.filter(user=request.user).values_list('role', flat=True).first()
+    if role == 'teacher':
+        classrooms = Classroom.objects.filter(teacher=request.user)
+    else:
+        classrooms = Classroom.objects.filter(enrollments__student=request.user, enrollments__status='active')
+    # Joining, leaving or editing any of the classes changes one of these
+    state = classrooms.aggregate(count=Count('id'), versions=Sum('version'), updated_at=Max('updated_at'))
+    classrooms = classrooms.values('id', 'class_name', 'section', 'subject', 'room', 'class_code', 'version',
+                                   teacher_first_name=F('teacher__first_name'),
+                                   teacher_last_name=F('teacher__last_name'))
+    return api_page(request, classrooms, ('id',), ('classrooms', request.user.pk, role, state), state['updated_at'])
+
+
+@login_required
+@query_budget(API_QUERY_BUDGET)
+def api_roster(request, classroom_id):
+    classroom = classroom_access(request, classroom_id)
+    roster = Enrollment.objects.filter(classroom_id=classroom_id)
+    if not classroom['is_teacher']:
+        roster = roster.filter(status='active')
+    roster = roster.values('student_id', 'status', 'joined_at',
+                           username=F('student__username'),
+                           first_name=F('student__first_name'),
+                           last_name=F('student__last_name'))
+    # Keyed on the (classroom, student) unique index
+    return api_page(request, roster, ('student_id',),
+                    ('roster', classroom_id, classroom['version'], classroom['is_teacher']), classroom['updated_at'])
+
+
+@login_required
+@query_budget(API_QUERY_BUDGET)
+def api_quizzes(request, classroom_id):
+    classroom = classroom_access(request, classroom_id)
+    quizzes = Quiz.objects.filter(classroom_id=classroom_id)
+    if not classroom['is_teacher']:
+        quizzes = quizzes.filter(is_published=True)
+    quizzes = quizzes.values('id', 'title', 'created_at', 'due_at', 'time_limit_minutes', 'is_published')
+    # Newest first, keyed on the (classroom, -created_at) index
+    return api_page(request, quizzes, ('-created_at', '-id'),
+                    ('quizzes', classroom_id, classroom['version'], classroom['is_teacher']), classroom['updated_at'])
+
+
+@login_required
+def api_question_search(request):
+    # Teachers search their own questions and every published quiz when building quizzes
+    if not Profile.objects.filter(user=request.user, role='teacher').exists():
+        return JsonResponse({'error': 'Only teachers can search the question bank.'}, status=403)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', SEARCH_LIMIT)), API_MAX_PAGE_SIZE))
+        teacher = int(request.GET['teacher']) if request.GET.get('teacher') else None
+        classroom = int(request.GET['classroom']) if request.GET.get('classroom') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit, teacher and classroom must be numbers.'}, status=400)
+    results = search_questions(request.GET.get('q', ''), subject=request.GET.get('subject') or None,
+                               teacher=teacher, classroom=classroom, viewer=request.user, limit=limit)
+    return JsonResponse({'results': results})
+
+
+# Classroom detail tabs. The landing page only has empty panes; each tab is
+# fetched as an HTML fragment the first time it is opened, one page at a time.
+TAB_PAGE_SIZE = 20
+TAB_QUERY_BUDGET = 3
+
+
+def quizzes_tab(request, classroom_id, classroom):
+    quizzes = Quiz.objects.filter(classroom_id=classroom_id)
+    if not classroom['is_teacher']:
+        quizzes = quizzes.filter(is_published=True)
+    return quizzes.values('id', 'title', 'created_at', 'due_at', 'is_published'), ('-created_at', '-id'), {}
+
+
+def grades_tab(request, classroom_id, classroom):
+    quizzes = Quiz.objects.filter(classroom_id=classroom_id)
+    if classroom['is_teacher']:
+        # Class averages straight from the running statistics, and how many
+        # attempts have anti-cheating events from the per-attempt counters
+        quizzes = (quizzes.values('id', 'title', 'created_at', graded=F('stats__count'), completed=F('stats__completed'),
+                                  mean=ExpressionWrapper(F('stats__total') / F('stats__count'), output_field=FloatField()))
+                   .annotate(flagged=Count('attempts__suspicion')))
+    else:
+        mine = Q(attempts__student=request.user)
+        quizzes = (quizzes.filter(is_published=True)
+                   .annotate(best=Max('attempts__score', filter=mine), out_of=Max('attempts__max_score', filter=mine))
+                   .values('id', 'title', 'created_at', 'best', 'out_of'))
+    return quizzes, ('-created_at', '-id'), {}
+
+
+def people_tab(request, classroom_id, classroom):
+    context = {}
+    if not request.GET.get('cursor'):
+        context['teacher'] = User.objects.filter(pk=classroom['teacher_id']).values(
+            'username', 'first_name', 'last_name').first()
+    students = (Enrollment.objects.filter(classroom_id=classroom_id, status='active')
+                .values('student_id', username=F('student__username'),
+                        first_name=F('student__first_name'), last_name=F('student__last_name')))
+    return students, ('student_id',), context
+
+
+CLASSROOM_TABS = {
+    'quizzes': quizzes_tab,
+    'grades': grades_tab,
+    'people': people_tab,
+}
+
+
+@login_required
+@query_budget(TAB_QUERY_BUDGET)
+def classroom_tab(request, classroom_id, tab):
+    if tab not in CLASSROOM_TABS:
+        raise Http404("No such tab.")
+    classroom = classroom_access(request, classroom_id)
+    rows, ordering, context = CLASSROOM_TABS[tab](request, classroom_id, classroom)
+    try:
+        rows, next_cursor = keyset_page(rows, ordering, request.GET.get('cursor'), TAB_PAGE_SIZE)
+    except (ValueError, ValidationError):
+        return HttpResponse('Invalid cursor.', status=400)
+    context.update({
+        'rows': rows,
+        'is_teacher': classroom['is_teacher'],
+        'next_url': f'{request.path}?{urlencode({"cursor": next_cursor})}' if next_cursor else None,
+    })
+    return render(request, f'Quiz_App/_tab_{tab}.html', context)
+
+
 def home(request):
     # Check if the user is logged in
     if request.user.is_authenticated:
@@ -182,24 +536,33 @@ def home(request):
 
 
 # Landing page view
+# Queries the landing page may run, independent of how many classes are shown:
+# the profile and the classroom list.
+LANDING_QUERY_BUDGET = 3
+
+
 @login_required
+@query_budget(LANDING_QUERY_BUDGET)
 def landing_page(request):
-    classrooms = []
-    if request.user.is_authenticated:
-        if request.user.profile.role == 'teacher':
-            classrooms = Classroom.objects.filter(teacher=request.user)
-        elif request.user.profile.role == 'student':
-            classrooms = request.user.classrooms.all()  # Many-to-Many relationship
+    # Resolve the role once; the template reads it from the context
+    role = Profile.objects.filter(user=request.user).values_list('role', flat=True).first()
+
+    # Cached per user; only rendered (and queried) after the class list changed
+    classroom_cards, classroom_count = render_classroom_cards(request.user, role)
 
     join_form = JoinClassForm()
     create_form = CreateClassForm()
     profile_form = ProfileForm(instance=request.user)
     password_form = PasswordChangeForm()
+    roster_form = RosterImportForm()
 
     return render(request, 'Quiz_App/landing_page.html', {
-        'classrooms': classrooms,
+        'role': role,
+        'classroom_cards': classroom_cards,
+        'classroom_count': classroom_count,
         'join_form': join_form,
         'create_form': create_form,
+        'roster_form': roster_form,
         'profile_form': profile_form,
         'password_form': password_form,
     })
@@ -215,5 +578,30 @@ def logout_view(request):
     response['Cache-Control'] = 'no-store'  # Prevent caching of the page
     return response
 
+# Liveness probe for load balancers; touches neither the session nor the database
+def health_view(request):
+    return HttpResponse('ok', content_type='text/plain')
+
+
+# Auto-submit scheduler instrumentation for this worker process
+@staff_member_required
+def deadline_metrics(request):
+    return JsonResponse(deadline_scheduler.metrics())
+
+
+# Hot paths and slow requests across all worker processes
+@staff_member_required
+def performance_view(request):
+    rows, slow = instrumentation.collect()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'views': rows, 'slow': slow})
+    return render(request, 'Quiz_App/performance.html', {
+        'rows': rows,
+        'slow': slow,
+        'bounds': instrumentation.HISTOGRAM_BOUNDS,
+        'slow_ms': getattr(settings, 'INSTRUMENTATION_SLOW_MS', 500),
+        'title': 'Performance',
+    })
+
 def profile_view(request):
     return render(request, 'Quiz_App/profile_management.html')